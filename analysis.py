@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Shared analysis core for the extraction result scripts
+
+Posts and results are loaded once and indexed by id, so every join is a
+dict lookup instead of a `next(post for post in posts if ...)` scan:
+- rank_pain_points: results joined to their posts, sorted by score
+- category_rollup: one pass over pain points using an inverted
+  post_id -> category map
+- diff_versions: v1 vs v2 added/removed/score changes via id maps
+
+Each of these is timed into the analysis_seconds histogram (metrics.py).
+
+Used by analyze_hn_extraction.py and reddit-signals-spike/analyze_*.py.
+"""
+import os
+
+import metrics
+from columnar import ColumnStore
+from records import load
+
+
+@metrics.timed("analysis_seconds", step="load")
+def load_records(path, record_type=None, columns=None):
+    """Load posts/results from a JSON array file or a columnar store directory
+
+    For "x.json", a converted "x.columnar/" store (see columnar.py) is read
+    instead when it is newer than the JSON file. columns limits a columnar
+    read to the fields actually needed. With a record_type (records.Post,
+    records.ExtractionResult) every row comes back as that record.
+    """
+    if os.path.isdir(path):
+        rows = ColumnStore(path).rows(columns)
+    else:
+        converted = os.path.join(os.path.splitext(path)[0] + ".columnar", "schema.json")
+        if os.path.exists(converted) and (
+                not os.path.exists(path) or os.path.getmtime(converted) >= os.path.getmtime(path)):
+            rows = ColumnStore(os.path.dirname(converted)).rows(columns)
+        else:
+            return load(path, record_type)
+    if record_type is None:
+        return list(rows)
+    return [record_type.from_dict(row) for row in rows]
+
+
+def index_by(records, key):
+    """Map record[key] -> record (last one wins on duplicates)"""
+    return {record[key]: record for record in records}
+
+
+def split_pain_points(results):
+    """Partition results into (with pain point, without) in one pass"""
+    pain, no_pain = [], []
+    for result in results:
+        (pain if result.get('has_pain_point') else no_pain).append(result)
+    return pain, no_pain
+
+
+@metrics.timed("analysis_seconds", step="rank")
+def rank_pain_points(pain_points, posts_by_id, limit=None):
+    """Pain points by composite score, highest first, each joined to its post
+
+    Returns a list of (result, post or None).
+    """
+    ranked = sorted(pain_points, key=lambda p: p['composite_score'], reverse=True)
+    if limit is not None:
+        ranked = ranked[:limit]
+    return [(p, posts_by_id.get(p['post_id'])) for p in ranked]
+
+
+@metrics.timed("analysis_seconds", step="rollup")
+def category_rollup(pain_points, categories):
+    """Group pain points into categories ({name: [post ids]}) in a single pass
+
+    Returns {name: {'items': [...], 'count': n, 'avg_score': x}} for every
+    category that matched at least one pain point, in categories order.
+    """
+    category_of = {}
+    for name, post_ids in categories.items():
+        for post_id in post_ids:
+            category_of.setdefault(post_id, []).append(name)
+
+    grouped = {name: [] for name in categories}
+    for p in pain_points:
+        for name in category_of.get(p['post_id'], ()):
+            grouped[name].append(p)
+
+    rollup = {}
+    for name, items in grouped.items():
+        if items:
+            rollup[name] = {
+                'items': items,
+                'count': len(items),
+                'avg_score': sum(p['composite_score'] for p in items) / len(items),
+            }
+    return rollup
+
+
+@metrics.timed("analysis_seconds", step="diff")
+def diff_versions(v1_results, v2_results):
+    """Compare two extraction runs over the same posts
+
+    Returns a dict with:
+    - added / removed: post ids that gained / lost a pain point in v2
+    - score_changes: [(post_id, v1_score, v2_score)] for pain points in both
+    - v2_by_id: v2 results indexed by post_id (for looking up reasons)
+    """
+    pain_v1 = {p['post_id']: p for p in v1_results if p.get('has_pain_point')}
+    pain_v2 = {p['post_id']: p for p in v2_results if p.get('has_pain_point')}
+
+    return {
+        'added': [pid for pid in pain_v2 if pid not in pain_v1],
+        'removed': [pid for pid in pain_v1 if pid not in pain_v2],
+        'score_changes': [
+            (pid, pain_v1[pid]['composite_score'], p2['composite_score'])
+            for pid, p2 in pain_v2.items()
+            if pid in pain_v1
+        ],
+        'v2_by_id': index_by(v2_results, 'post_id'),
+    }
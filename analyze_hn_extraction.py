@@ -1,16 +1,15 @@
 #!/usr/bin/env python3
-import json
+from analysis import category_rollup, index_by, load_records, rank_pain_points, split_pain_points
+from cluster import category_map, cluster_pain_points
+from records import ExtractionResult, Post
 
 # Load HN extraction results
-with open('hn_extraction_results.json', 'r') as f:
-    results = json.load(f)
-
-with open('hackernews_posts_test.json', 'r') as f:
-    posts = json.load(f)
+results = load_records('hn_extraction_results.json', ExtractionResult)
+posts = load_records('hackernews_posts_test.json', Post)
+posts_by_id = index_by(posts, 'id')
 
 # Analyze
-pain_points = [r for r in results if r.get('has_pain_point')]
-no_pain = [r for r in results if not r.get('has_pain_point')]
+pain_points, no_pain = split_pain_points(results)
 
 accuracy = (len(pain_points) / len(results)) * 100
 
@@ -35,10 +34,7 @@ print("\n" + "=" * 70)
 print("Top 10 Pain Points by Composite Score:")
 print("=" * 70)
 
-sorted_points = sorted(pain_points, key=lambda x: x['composite_score'], reverse=True)
-
-for i, p in enumerate(sorted_points, 1):
-    post = next((post for post in posts if post['id'] == p['post_id']), None)
+for i, (p, post) in enumerate(rank_pain_points(pain_points, posts_by_id), 1):
     print(f"\n{i}. [Score: {p['composite_score']:.1f}] {p['pain_point']}")
     if post:
         print(f"   📝 Post: \"{post['title'][:70]}...\"")
@@ -52,24 +48,13 @@ print("\n" + "=" * 70)
 print("Pain Point Categories")
 print("=" * 70)
 
-categories = {
-    "AI Tool Quality": [46958774, 46926262, 46935628, 46922527],  # Codex issues, Opus ignoring, string bug, probabilistic
-    "Platform Access": [46909060],  # Meta API waitlist
-    "Business Dysfunction": [46905476],  # Bloated businesses
-    "Decision Paralysis": [46946464, 46941146],  # Patents vs shipping, analytics choice
-    "Legacy Software": [46949048],  # Medical imaging lag
-    "Labor Market": [46935171],  # Mid-level squeeze
-    "Content Curation": [46919016],  # HN AI saturation
-    "Model Degradation": [46958617]  # LLM quality concerns
-}
-
-for category, post_ids in categories.items():
-    matching = [p for p in pain_points if p['post_id'] in post_ids]
-    if matching:
-        avg_score = sum(p['composite_score'] for p in matching) / len(matching)
-        print(f"\n{category}: {len(matching)} signals (avg score: {avg_score:.1f})")
-        for p in matching:
-            print(f"  - {p['pain_point'][:65]}...")
+# Themes come from the pain points themselves (see cluster.py)
+categories = category_map(cluster_pain_points(pain_points))
+
+for category, group in category_rollup(pain_points, categories).items():
+    print(f"\n{category}: {group['count']} signals (avg score: {group['avg_score']:.1f})")
+    for p in group['items']:
+        print(f"  - {p['pain_point'][:65]}...")
 
 print("\n" + "=" * 70)
 print("📝 Key Insights")
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Scaling benchmark: per-result linear scans vs the indexed analysis core
+
+For each size, builds synthetic posts + v1/v2 results and times the old
+analyze_*.py pattern (next(...) scan per result, rescan per category)
+against analysis.py (id maps, single-pass rollup). The legacy path is
+quadratic, so it is skipped past LEGACY_LIMIT records.
+
+Usage: python bench_analysis.py [max_records]
+"""
+import random
+import sys
+import time
+
+from analysis import category_rollup, diff_versions, index_by, rank_pain_points, split_pain_points
+
+SIZES = [20, 100, 1000, 10000, 100000]
+LEGACY_LIMIT = 10000
+CATEGORY_COUNT = 8
+
+
+def synthetic(count, seed=0):
+    rng = random.Random(seed)
+    posts = [{'id': i, 'title': f"Post {i}", 'url': f"https://example.com/{i}"} for i in range(count)]
+
+    def run():
+        results = []
+        for i in range(count):
+            if rng.random() < 0.5:
+                results.append({'post_id': i, 'has_pain_point': True, 'pain_point': f"pain {i}",
+                                'composite_score': rng.uniform(30, 95)})
+            else:
+                results.append({'post_id': i, 'has_pain_point': False, 'reason': "none"})
+        return results
+
+    categories = {f"Category {c}": [i for i in range(c, count, CATEGORY_COUNT * 2)] for c in range(CATEGORY_COUNT)}
+    return posts, run(), run(), categories
+
+
+def legacy(posts, results, results_v2, categories):
+    pain_points = [r for r in results if r.get('has_pain_point')]
+    for p in sorted(pain_points, key=lambda x: x['composite_score'], reverse=True):
+        next((post for post in posts if post['id'] == p['post_id']), None)
+    for post_ids in categories.values():
+        matching = [p for p in pain_points if p['post_id'] in post_ids]
+        if matching:
+            sum(p['composite_score'] for p in matching) / len(matching)
+    pain_v2 = [r for r in results_v2 if r.get('has_pain_point')]
+    for p2 in pain_v2:
+        p1 = next((p for p in pain_points if p['post_id'] == p2['post_id']), None)
+        if p1:
+            next(p for p in posts if p['id'] == p2['post_id'])
+
+
+def indexed(posts, results, results_v2, categories):
+    posts_by_id = index_by(posts, 'id')
+    pain_points, _ = split_pain_points(results)
+    rank_pain_points(pain_points, posts_by_id)
+    category_rollup(pain_points, categories)
+    diff = diff_versions(results, results_v2)
+    for post_id, _, _ in diff['score_changes']:
+        posts_by_id[post_id]
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    max_records = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+
+    print("=" * 70)
+    print("⏱️  Analysis scaling: linear scans vs indexed core")
+    print("=" * 70)
+    print(f"\n{'records':>8}  {'legacy':>10}  {'indexed':>10}  {'speedup':>8}")
+
+    for size in [s for s in SIZES if s <= max_records]:
+        data = synthetic(size)
+        fast = timed(indexed, *data)
+        if size <= LEGACY_LIMIT:
+            slow = timed(legacy, *data)
+            print(f"{size:>8}  {slow * 1000:>8.1f}ms  {fast * 1000:>8.1f}ms  {slow / fast:>7.0f}x")
+        else:
+            print(f"{size:>8}  {'(skipped)':>10}  {fast * 1000:>8.1f}ms")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
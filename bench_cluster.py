@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark: offline pain point clustering at scale
+
+Generates synthetic pain points from a handful of known themes (each one
+a few paraphrases plus shared filler words) and times cluster.py at
+growing sizes, reporting the cluster count and purity (share of points
+whose cluster's majority theme is their own theme).
+
+Usage: python bench_cluster.py [max_points]
+"""
+import random
+import sys
+import time
+from collections import Counter
+
+from cluster import cluster_pain_points
+
+SIZES = [1000, 10000, 30000, 50000]
+
+THEMES = {
+    'payment fees': ["stripe fees", "payment processor fees", "transaction fees eat margins",
+                     "chargebacks", "fees on low ticket subscriptions"],
+    'customer acquisition': ["finding first customers", "getting initial users", "customer acquisition cost",
+                             "cold outreach gets no replies", "no signups after launch"],
+    'bookkeeping': ["bookkeeping for taxes", "reconciling bank statements", "quickbooks is confusing",
+                    "categorizing expenses manually", "accountant too expensive"],
+    'ai tools': ["ai coding assistant ignores instructions", "llm output inconsistent", "codex breaks code style",
+                 "model quality degrades", "ai agent hallucinates apis"],
+    'burnout': ["solo founder burnout", "working weekends alone", "no time for family",
+                "handling support sales and dev alone", "exhausted from context switching"],
+    'hiring': ["hiring engineers is slow", "recruiters spam", "interview process takes months",
+               "candidates ghost offers", "contractors miss deadlines"],
+}
+FILLER = "honestly every week again this month our team my clients we tried spreadsheets tools nothing works it takes hours".split()
+
+
+def synthetic_pain_points(count, seed=0):
+    """Pain point results plus the theme each was generated from"""
+    rng = random.Random(seed)
+    names = list(THEMES)
+    results, themes = [], []
+    for i in range(count):
+        theme = rng.choice(names)
+        phrase, other = rng.choice(THEMES[theme]), rng.choice(THEMES[theme])
+        results.append({
+            'post_id': i,
+            'has_pain_point': True,
+            'pain_point': f"{phrase} {' '.join(rng.sample(FILLER, 3))}",
+            'supporting_quote': f"{other}, {' '.join(rng.sample(FILLER, 6))} {phrase}",
+            'composite_score': round(rng.uniform(40, 95), 1),
+        })
+        themes.append(theme)
+    return results, themes
+
+
+def main():
+    max_points = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+
+    print("=" * 70)
+    print(f"⏱️  Offline clustering: {len(THEMES)} generated themes")
+    print("=" * 70)
+    print(f"\n{'points':>8}  {'time':>8}  {'clusters':>8}  {'purity':>7}  largest theme")
+
+    for size in [s for s in SIZES if s <= max_points]:
+        results, themes = synthetic_pain_points(size)
+        start = time.perf_counter()
+        clusters = cluster_pain_points(results)
+        elapsed = time.perf_counter() - start
+        majority = sum(Counter(themes[p['post_id']] for p in c['members']).most_common(1)[0][1] for c in clusters)
+        print(f"{size:>8}  {elapsed:>7.2f}s  {len(clusters):>8}  {majority / size:>7.3f}  {clusters[0]['theme']}")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pretty-printed JSON vs the columnar store
+
+Writes a synthetic month-scale corpus of extraction results both ways and
+times:
+- json.load of the whole file
+- opening the columnar store and summing two numeric columns (mmap)
+- reading full records back from the columnar store
+plus the on-disk size of each.
+
+Usage: python bench_columnar.py [record_count]
+"""
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from columnar import ColumnStore
+
+
+def synthetic_results(count, seed=0):
+    rng = random.Random(seed)
+    results = []
+    for i in range(count):
+        if rng.random() < 0.45:
+            intensity, specificity, frequency = (rng.randint(30, 95) for _ in range(3))
+            results.append({
+                'post_id': 46900000 + i,
+                'has_pain_point': True,
+                'pain_point': f"Recurring workflow pain number {i % 5000} around invoicing and reconciliation",
+                'intensity': intensity,
+                'specificity': specificity,
+                'frequency': frequency,
+                'composite_score': round((intensity + specificity + frequency) / 3, 1),
+                'supporting_quote': "I spend hours every week copying numbers between spreadsheets by hand.",
+                'source': rng.choice(['hackernews', 'reddit', 'devto']),
+            })
+        else:
+            results.append({'post_id': 46900000 + i, 'has_pain_point': False,
+                            'reason': "Survey/discussion thread - no specific pain expressed",
+                            'source': rng.choice(['hackernews', 'reddit', 'devto'])})
+    return results
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    workdir = tempfile.mkdtemp()
+    json_path = os.path.join(workdir, "results.json")
+    store_path = os.path.join(workdir, "results.columnar")
+
+    results = synthetic_results(count)
+    with open(json_path, 'w') as f:
+        json.dump(results, f, indent=2)
+    store = ColumnStore(store_path)
+    for start in range(0, count, 50000):
+        store.append(results[start:start + 50000])
+    del results
+
+    print("=" * 70)
+    print(f"⏱️  Storage benchmark: {count} extraction results")
+    print("=" * 70)
+    print(f"\nOn disk: JSON {os.path.getsize(json_path) / 1e6:.1f} MB, "
+          f"columnar {dir_size(store_path) / 1e6:.1f} MB")
+
+    def load_json():
+        with open(json_path, 'r') as f:
+            records = json.load(f)
+        return sum(r.get('intensity', 0) for r in records)
+
+    def scan_columns():
+        columns = ColumnStore(store_path).read(['intensity', 'has_pain_point'])
+        intensity, has_pain = columns['intensity'], columns['has_pain_point']
+        total = sum(value for value, flag in zip(intensity.values, has_pain.values) if flag)
+        for column in columns.values():
+            column.close()
+        return total
+
+    def load_rows():
+        return sum(1 for _ in ColumnStore(store_path).rows())
+
+    json_time, json_total = timed(load_json)
+    scan_time, scan_total = timed(scan_columns)
+    rows_time, _ = timed(load_rows)
+    assert json_total == scan_total
+
+    print(f"\njson.load + sum(intensity):        {json_time * 1000:8.1f}ms")
+    print(f"columnar: 2 columns via mmap + sum: {scan_time * 1000:8.1f}ms  ({json_time / scan_time:.0f}x)")
+    print(f"columnar: all rows as dicts:        {rows_time * 1000:8.1f}ms")
+    print()
+
+    shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
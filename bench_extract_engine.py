@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark + behaviour check for the chunked extraction engine
+
+Runs against a local mock Messages endpoint whose response time grows with
+the number of posts in the prompt:
+1. one big prompt (the old spike_extract.py shape) vs concurrent chunks
+2. injected 429s are retried transparently
+3. a chunk that keeps failing is reported, and a rerun with a checkpoint
+   only sends that chunk
+
+Usage: python bench_extract_engine.py [post_count]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from extract_engine import ExtractionEngine
+from standin_server import serve_messages
+
+
+def synthetic_posts(count):
+    return [
+        {
+            'id': i,
+            'title': f"Post {i}: invoicing keeps eating my weekends",
+            'content': "Every month I spend hours reconciling invoices by hand. " * 8,
+            'url': f"https://reddit.com/r/Entrepreneur/comments/mock{i}",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def run(engine, posts):
+    start = time.perf_counter()
+    results, report = engine.extract(posts)
+    return time.perf_counter() - start, results, report
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    posts = synthetic_posts(count)
+    checkpoint_path = os.path.join(tempfile.mkdtemp(), "checkpoint.jsonl")
+
+    print("=" * 70)
+    print(f"⏱️  Extraction engine benchmark: {count} posts (mock Messages API)")
+    print("=" * 70)
+
+    with serve_messages(latency=0.2, per_post_latency=0.02) as server:
+        url = f"{server.base_url}/v1/messages"
+
+        single = ExtractionEngine(api_key="test", url=url, max_workers=1, requests_per_minute=6000,
+                                  max_input_tokens=10 ** 9, max_posts_per_chunk=count)
+        single_time, results, report = run(single, posts)
+        assert len(results) == count
+        print(f"\nOne prompt, all posts:      {single_time:6.2f}s  ({report['chunks']} request)")
+
+        chunked = ExtractionEngine(api_key="test", url=url, max_workers=8, requests_per_minute=6000)
+        chunked_time, results, report = run(chunked, posts)
+        assert len(results) == count and [r['post_id'] for r in results] == [p['id'] for p in posts]
+        print(f"Chunked, 8 concurrent:      {chunked_time:6.2f}s  ({report['chunks']} requests, "
+              f"{single_time / chunked_time:.1f}x)")
+
+    with serve_messages(latency=0.05, error_rate=0.3) as server:
+        engine = ExtractionEngine(api_key="test", url=f"{server.base_url}/v1/messages", max_workers=8,
+                                  requests_per_minute=6000, backoff=0.01, retries=8)
+        _, results, report = run(engine, posts)
+        print(f"30% injected 429s:          {len(results)}/{count} results after "
+              f"{server.total_hits} requests for {report['chunks']} chunks")
+        assert len(results) == count
+
+    with serve_messages(latency=0.05, fail_ids=[posts[-1]['id']]) as server:
+        engine = ExtractionEngine(api_key="test", url=f"{server.base_url}/v1/messages", max_workers=8,
+                                  requests_per_minute=6000, backoff=0.01, retries=1,
+                                  checkpoint_path=checkpoint_path)
+        _, results, report = run(engine, posts)
+        print(f"One chunk always failing:   {len(results)}/{count} results, "
+              f"{report['failed_chunks']} chunk failed ({len(report['failed_posts'])} posts)")
+
+        server.fail_ids.clear()
+        hits_before = server.total_hits
+        engine = ExtractionEngine(api_key="test", url=f"{server.base_url}/v1/messages", max_workers=8,
+                                  requests_per_minute=6000, checkpoint_path=checkpoint_path)
+        _, results, report = run(engine, posts)
+        print(f"Rerun from checkpoint:      {len(results)}/{count} results, "
+              f"{server.total_hits - hits_before} request sent, {report['from_checkpoint']} chunks reused")
+        assert len(results) == count and report['sent'] == 1
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
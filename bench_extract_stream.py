@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark + behaviour check for streamed extraction responses
+
+1. Against the mock Messages endpoint (answer time grows with the posts in
+   the prompt): time to the first usable result, buffered vs streamed
+2. Against recorded SSE streams replayed by a local server:
+   - a response with one malformed element: the other results survive and
+     the bad element is reported with its post id
+   - a response cut off mid-array: completed results are kept, the rest
+     are reported as failed, and a rerun through the cache only sends those
+   - the old greedy-regex parse of the same responses, for comparison
+
+Usage: python bench_extract_stream.py [post_count]
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from extract_cache import ExtractionCache
+from extract_engine import ExtractionEngine
+from standin_server import message_stream, mock_extraction, serve_messages, serve_replay
+
+
+def synthetic_posts(count):
+    return [
+        {
+            'id': i,
+            'title': f"Post {i}: invoicing keeps eating my weekends",
+            'content': "Every month I spend hours reconciling invoices by hand. " * 8,
+            'url': f"https://reddit.com/r/Entrepreneur/comments/mock{i}",
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def legacy_parse(text):
+    """The old spike_extract.py parse: greedy regex, all or nothing"""
+    try:
+        return json.loads(re.search(r'\[[\s\S]*\]', text).group(0))
+    except (AttributeError, ValueError):
+        return []
+
+
+def first_result_time(url, posts, stream):
+    engine = ExtractionEngine(api_key="standin", url=url, stream=stream, max_posts_per_chunk=len(posts),
+                              max_input_tokens=10 ** 6)
+    times = []
+    start = time.perf_counter()
+    results, _ = engine.extract(posts, on_result=lambda result: times.append(time.perf_counter() - start))
+    return times[0], time.perf_counter() - start, len(results)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    posts = synthetic_posts(count)
+
+    print("=" * 70)
+    print(f"⏱️  Streamed extraction: {count} posts in one prompt")
+    print("=" * 70)
+
+    with serve_messages(latency=0.2, per_post_latency=0.05) as server:
+        url = f"{server.base_url}/v1/messages"
+        print(f"\n{'':<10}  {'first result':>12}  {'all results':>11}")
+        for label, stream in (("buffered", False), ("streamed", True)):
+            first, total, got = first_result_time(url, posts, stream)
+            assert got == count
+            print(f"{label:<10}  {first * 1000:>10.0f}ms  {total * 1000:>9.0f}ms")
+
+    text = json.dumps([mock_extraction(post['id']) for post in posts], indent=2)
+    malformed = text.replace('"post_id": 3,', '"post_id": 3,,', 1)
+    cut_at = len(text) * 2 // 3
+
+    print("\nRecorded streams:")
+    with serve_replay([message_stream(malformed)]) as server:
+        engine = ExtractionEngine(api_key="standin", url=f"{server.base_url}/v1/messages", max_workers=1,
+                                  max_posts_per_chunk=count, max_input_tokens=10 ** 6)
+        results, report = engine.extract(posts)
+        assert report['failed_posts'] == [3] and len(results) == count - 1
+        print(f"   malformed element: {len(results)}/{count} results kept, "
+              f"post {report['malformed'][0]['post_id']} reported "
+              f"(greedy regex parse keeps {len(legacy_parse(malformed))})")
+
+    with tempfile.TemporaryDirectory() as workdir, \
+            ExtractionCache(os.path.join(workdir, "cache.sqlite3")) as cache, \
+            serve_replay([message_stream(text, cut_at=cut_at), message_stream(text)]) as server:
+        engine = ExtractionEngine(api_key="standin", url=f"{server.base_url}/v1/messages", max_workers=1,
+                                  max_posts_per_chunk=count, max_input_tokens=10 ** 6, cache=cache)
+        results, report = engine.extract(posts)
+        kept = len(results)
+        assert report['partial_chunks'] == 1 and len(report['failed_posts']) == count - kept
+        print(f"   truncated stream:  {kept}/{count} results kept, {len(report['failed_posts'])} reported failed "
+              f"(greedy regex parse keeps {len(legacy_parse(text[:cut_at]))})")
+
+        results, report = engine.extract(posts)
+        assert len(results) == count and report['from_cache'] == kept
+        print(f"   rerun:             {report['from_cache']} from cache, "
+              f"{count - report['from_cache']} re-sent, {len(results)}/{count} results")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ET.fromstring + .// searches vs streaming iter_feed_entries
+
+Builds large synthetic Reddit-style Atom and RSS 2.0 feeds and parses each
+with both approaches, reporting time and peak traced memory.
+
+Usage: python bench_feed_parser.py [entry_count]
+"""
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from html import escape
+
+from feed_parser import iter_feed_entries
+
+CHUNK_SIZE = 64 * 1024
+BODY = escape("<div class=\"md\"><p>" + "I keep running into the same problem with invoicing. " * 20 + "</p></div>")
+
+
+def synthetic_atom(count):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>'
+             '<feed xmlns="http://www.w3.org/2005/Atom"><title>r/Entrepreneur</title>']
+    for i in range(count):
+        parts.append(
+            f'<entry><author><name>/u/founder{i % 500}</name><uri>https://www.reddit.com/user/founder{i % 500}</uri></author>'
+            f'<category term="Entrepreneur" label="r/Entrepreneur"/>'
+            f'<content type="html">{BODY}</content><id>t3_{i:x}</id>'
+            f'<link href="https://www.reddit.com/r/Entrepreneur/comments/{i:x}/post_{i}/"/>'
+            f'<updated>2026-02-09T10:30:00+00:00</updated><published>2026-02-09T10:30:00+00:00</published>'
+            f'<title>Post number {i} about a recurring pain</title></entry>'
+        )
+    parts.append('</feed>')
+    return "".join(parts).encode("utf-8")
+
+
+def synthetic_rss(count):
+    parts = ['<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>r/Entrepreneur</title>']
+    for i in range(count):
+        parts.append(
+            f'<item><title>Post number {i} about a recurring pain</title>'
+            f'<link>https://www.reddit.com/r/Entrepreneur/comments/{i:x}/post_{i}/</link>'
+            f'<pubDate>Mon, 09 Feb 2026 10:30:00 +0000</pubDate>'
+            f'<description>{BODY}</description><author>founder{i % 500}</author></item>'
+        )
+    parts.append('</channel></rss>')
+    return "".join(parts).encode("utf-8")
+
+
+def legacy_parse(body):
+    """The original test_reddit_rss approach"""
+    root = ET.fromstring(body)
+    namespace = {'atom': 'http://www.w3.org/2005/Atom'}
+    entries = root.findall('.//atom:entry', namespace) or root.findall('.//item')
+    out = []
+    for entry in entries:
+        title_elem = entry.find('.//atom:title', namespace) or entry.find('title')
+        link_elem = entry.find('.//atom:link', namespace) or entry.find('link')
+        published_elem = entry.find('.//atom:published', namespace) or entry.find('pubDate')
+        content_elem = entry.find('.//atom:content', namespace) or entry.find('description')
+        author_elem = entry.find('.//atom:author', namespace) or entry.find('author')
+        out.append((title_elem, link_elem, published_elem, content_elem, author_elem))
+    return len(out)
+
+
+def streaming_parse(body):
+    chunks = (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+    return sum(1 for _ in iter_feed_entries(chunks))
+
+
+def measure(fn, body):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = fn(body)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+    print("=" * 70)
+    print(f"⏱️  Feed parsing benchmark: {count} entries")
+    print("=" * 70)
+
+    for name, build in (("Atom", synthetic_atom), ("RSS", synthetic_rss)):
+        body = build(count)
+        print(f"\n{name} feed ({len(body) / 1e6:.1f} MB):")
+        for label, fn in (("ET.fromstring + .// finds", legacy_parse), ("iter_feed_entries", streaming_parse)):
+            parsed, elapsed, peak = measure(fn, body)
+            print(f"   {label:<27} {elapsed:6.2f}s  peak {peak / 1e6:7.1f} MB  ({parsed} entries)")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one request per comment vs the breadth-first comment crawler
+
+Walks a synthetic ~1000-comment Ask HN thread on a local HN stand-in with
+injected per-request latency:
+- serial: depth-first, one /item request after another over a pooled
+  session (the recursive get-the-kids approach)
+- crawler: hn_comments.iter_comments, one concurrent batch per level
+
+and checks both found the same comments. A second crawler run with a
+per-thread budget shows the cost of a bounded crawl.
+
+Usage: python bench_hn_comments.py [comments] [latency_ms]
+"""
+import sys
+import time
+
+from hn_comments import iter_comments
+from hn_fetch import get_json, item_url, make_session
+from standin_server import serve_hn, synthetic_hn_thread
+
+STORY_ID = 41000000
+BUDGET = 200
+
+
+def serial_walk(session, item, base_url, depth=1, max_depth=6):
+    """Depth-first, one request at a time; yields comment ids"""
+    if depth > max_depth:
+        return
+    for kid in item.get('kids') or []:
+        comment = get_json(session, item_url(kid, base_url))
+        if not comment or comment.get('dead'):
+            continue
+        if not comment.get('deleted'):
+            yield comment['id']
+        yield from serial_walk(session, comment, base_url, depth + 1, max_depth)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    items, story_id = synthetic_hn_thread(STORY_ID, count)
+    depth = 0
+    for item in items.values():
+        level, parent = 0, item
+        while parent.get('parent'):
+            parent, level = items[parent['parent']], level + 1
+        depth = max(depth, level)
+
+    print("=" * 70)
+    print(f"⏱️  Comment crawl: {len(items) - 1} comments, {depth} levels deep, {latency_ms:.0f}ms injected latency")
+    print("=" * 70)
+
+    with serve_hn(items, latency=latency_ms / 1000) as server:
+        base_url = f"{server.base_url}/v0"
+        session = make_session()
+        story = get_json(session, item_url(story_id, base_url))
+
+        start = time.perf_counter()
+        serial = list(serial_walk(session, story, base_url))
+        serial_time = time.perf_counter() - start
+
+        hits = server.total_hits
+        stats = {}
+        start = time.perf_counter()
+        crawled = [comment['id'] for comment in iter_comments([story], session=session, base_url=base_url,
+                                                             max_comments=len(items), stats=stats)]
+        crawl_time = time.perf_counter() - start
+        crawl_requests = server.total_hits - hits
+        assert sorted(crawled) == sorted(serial), "crawler and serial walk found different comments"
+
+        hits = server.total_hits
+        start = time.perf_counter()
+        bounded = list(iter_comments([story], session=session, base_url=base_url, max_comments=BUDGET))
+        bounded_time = time.perf_counter() - start
+        bounded_requests = server.total_hits - hits
+        session.close()
+
+    print(f"\n{'':<24} {'comments':>9} {'requests':>9} {'time':>9}")
+    print(f"{'serial (depth-first)':<24} {len(serial):>9} {len(serial):>9} {serial_time:>8.2f}s")
+    print(f"{'crawler (per level)':<24} {len(crawled):>9} {crawl_requests:>9} {crawl_time:>8.2f}s   "
+          f"({stats['levels']} levels, {serial_time / crawl_time:.0f}x)")
+    print(f"{f'crawler, {BUDGET} budget':<24} {len(bounded):>9} {bounded_requests:>9} {bounded_time:>8.2f}s   "
+          f"(depths {sorted({comment['depth'] for comment in bounded})})")
+    print()
+
+
+if __name__ == "__main__":
+    main()
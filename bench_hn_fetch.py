@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: serial get_hn_story loop vs pooled fetch_items
+
+Runs both against a local HN stand-in server with injected per-request
+latency, so the numbers reflect connection reuse and concurrency rather
+than the live API's mood.
+
+Usage: python bench_hn_fetch.py [item_count] [latency_ms]
+"""
+import sys
+import time
+
+from hn_fetch import fetch_items, set_host_limit
+from standin_server import serve_hn, synthetic_hn_items
+from test_hackernews import get_hn_story
+
+
+def bench_serial(ids, base_url):
+    start = time.perf_counter()
+    stories = [get_hn_story(story_id, base_url=base_url) for story_id in ids]
+    return time.perf_counter() - start, stories
+
+
+def bench_pooled(ids, base_url, max_workers):
+    set_host_limit(base_url, max_workers)
+    start = time.perf_counter()
+    stories = fetch_items(ids, max_workers=max_workers, base_url=base_url)
+    return time.perf_counter() - start, stories
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    items = synthetic_hn_items(count)
+    ids = sorted(items)
+
+    print("=" * 70)
+    print(f"⏱️  HN fetch benchmark: {count} items, {latency_ms:.0f}ms injected latency")
+    print("=" * 70)
+
+    with serve_hn(items, latency=latency_ms / 1000) as server:
+        base_url = f"{server.base_url}/v0"
+
+        serial_time, serial = bench_serial(ids, base_url)
+        assert all(serial), "serial fetch dropped items"
+        print(f"\nSerial (fresh connection each):  {serial_time:7.2f}s  {count / serial_time:8.1f} items/s")
+
+        for workers in (8, 32, 64):
+            pooled_time, pooled = bench_pooled(ids, base_url, workers)
+            assert pooled == serial, "pooled fetch returned different items"
+            print(f"Pooled ({workers:>2} workers):             {pooled_time:7.2f}s  {count / pooled_time:8.1f} items/s"
+                  f"  ({serial_time / pooled_time:.1f}x)")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
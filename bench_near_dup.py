@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: near-duplicate detection as the index grows
+
+Builds a synthetic post stream in which ~15% of posts are reworded copies
+of an earlier post (a few words swapped, a cross-post tag added) and times:
+- NearDuplicateIndex.add_many (MinHash + LSH bucket lookups in SQLite),
+  reported per post at each checkpoint so flat = sub-linear per post
+- a linear scan comparing each signature with every stored one (the naive
+  way to find near-duplicates), only up to LINEAR_LIMIT posts
+
+and checks detected duplicates against the ground truth.
+
+Usage: python bench_near_dup.py [post_count]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+from near_dup import NearDuplicateIndex, post_text, signature, similarity
+
+CHECKPOINTS = [1000, 10000, 50000, 100000, 200000, 500000]
+LINEAR_LIMIT = 1000
+DUPLICATE_RATE = 0.15
+BATCH = 500
+
+
+def synthetic_posts(count, seed=0):
+    """Posts plus {index: original index} for the reworded copies"""
+    rng = random.Random(seed)
+    vocabulary = [f"w{n}" for n in range(5000)]
+    posts, originals = [], {}
+    for i in range(count):
+        if i > 10 and rng.random() < DUPLICATE_RATE:
+            source = rng.randrange(i)
+            source = originals.get(source, source)
+            words = posts[source]['content'].split()
+            for _ in range(rng.randint(1, 3)):
+                words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            title = posts[source]['title'] + rng.choice(["", " [x-post]", " (repost)"])
+            originals[i] = source
+        else:
+            words = rng.choices(vocabulary, k=rng.randint(60, 160))
+            title = " ".join(rng.choices(vocabulary, k=8))
+        posts.append({'id': i, 'url': f"https://example.com/p/{i}", 'title': title, 'content': " ".join(words)})
+    return posts, originals
+
+
+def linear_scan(posts):
+    stored = []
+    for post in posts:
+        sig = signature(post_text(post))
+        if not any(similarity(sig, other) >= 0.6 for other in stored):
+            stored.append(sig)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    posts, originals = synthetic_posts(count)
+    workdir = tempfile.mkdtemp()
+
+    print("=" * 70)
+    print(f"⏱️  Near-duplicate index: {count} posts, {len(originals)} reworded copies")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    linear_scan(posts[:LINEAR_LIMIT])
+    linear = (time.perf_counter() - start) / min(count, LINEAR_LIMIT)
+    print(f"\nlinear scan over {min(count, LINEAR_LIMIT)} posts: {linear * 1e6:8.0f}µs/post (and growing with the corpus)")
+
+    print(f"\n{'posts':>8}  {'µs/post (last segment)':>24}")
+    found = {}
+    with NearDuplicateIndex(os.path.join(workdir, "near_dup.sqlite3")) as index:
+        done = 0
+        for checkpoint in [c for c in CHECKPOINTS if c < count] + [count]:
+            segment, segment_start = checkpoint - done, time.perf_counter()
+            while done < checkpoint:
+                batch = posts[done:done + BATCH]
+                for post, (canonical, duplicate) in zip(batch, index.add_many(batch)):
+                    if duplicate:
+                        found[post['id']] = canonical
+                done += len(batch)
+            elapsed = time.perf_counter() - segment_start
+            print(f"{checkpoint:>8}  {elapsed / segment * 1e6:>24.0f}")
+        stats = index.stats()
+
+    true_positive = sum(1 for i in found if i in originals)
+    print(f"\n{stats['posts']} posts -> {stats['canonical']} canonical")
+    print(f"duplicates: {len(found)} flagged, {true_positive}/{len(originals)} true "
+          f"(precision {true_positive / max(1, len(found)):.3f}, recall {true_positive / max(1, len(originals)):.3f})")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: adaptive polling vs fixed-interval polling
+
+Local stand-ins where one HN list and one subreddit keep gaining posts
+(newstories every BUSY_EVERY seconds, r/busy every FEED_EVERY seconds)
+while the other lists and QUIET_FEEDS subreddits stay unchanged. The same
+sources are polled for DURATION seconds:
+- fixed: every source at its minimum interval (what a tight cron loop does)
+- adaptive: poller.py's rate-driven intervals
+
+Reports HTTP requests made and how long new posts took to be picked up
+(appearance -> emitted), and checks both modes picked up every post.
+
+Usage: python bench_poller.py [duration_seconds]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from hn_cache import ItemCache
+from poller import Poller, build_sources
+from rss_fetch import FeedStateStore
+from standin_server import serve_hn, serve_rss, synthetic_atom_feed, synthetic_hn_items
+
+DURATION = 60.0
+SCALE = 1 / 60              # default cadences in seconds -> benchmark seconds
+BUSY_EVERY = 0.25
+FEED_EVERY = 1.0
+QUIET_FEEDS = 8
+HN_KINDS = ["newstories", "askstories", "topstories"]
+
+
+class Activity:
+    """Adds posts to the stand-ins in the background, remembering when each appeared"""
+
+    def __init__(self, hn, rss):
+        self.hn = hn
+        self.rss = rss
+        self.appeared = {}
+        self.feed_entries = 20
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        next_item, next_entry = time.time(), time.time() + FEED_EVERY
+        while not self._stop.wait(0.01):
+            now = time.time()
+            if now >= next_item:
+                item_id = max(self.hn.items) + 1
+                items = dict(self.hn.items)  # swapped, not mutated: the server iterates it for maxitem
+                items[item_id] = dict(items[item_id - 1], id=item_id, time=int(now))
+                self.hn.items = items
+                self.hn.lists["newstories"] = [item_id] + self.hn.lists["newstories"][:499]
+                self.appeared[item_id] = ("hn:newstories", now)
+                next_item += BUSY_EVERY
+            if now >= next_entry:
+                self.feed_entries += 1
+                self.rss.feeds["busy"] = synthetic_atom_feed("busy", self.feed_entries)
+                self.appeared[f"t3_{self.feed_entries - 1:x}"] = ("reddit:busy", now)
+                next_entry += FEED_EVERY
+
+
+def run_mode(adaptive, duration):
+    workdir = tempfile.mkdtemp()
+    items = synthetic_hn_items(200)
+    ids = sorted(items, reverse=True)
+    lists = {"newstories": list(ids), "askstories": ids[::2], "topstories": ids[::3],
+             "updates": {"items": [], "profiles": []}}
+    subreddits = ["busy"] + [f"quiet{n}" for n in range(QUIET_FEEDS)]
+    feeds = {sub: synthetic_atom_feed(sub, 20, start=1000 * n) for n, sub in enumerate(subreddits)}
+
+    with serve_hn(items, lists=lists) as hn, serve_rss(feeds) as rss:
+        sources = build_sources(HN_KINDS, subreddits, SCALE)
+        if not adaptive:
+            for source in sources:
+                source.max_interval = source.min_interval
+        emitted = {}
+
+        def sink(source, posts):
+            now = time.time()
+            for post in posts:
+                emitted.setdefault(post['id'], now)
+
+        with ItemCache(os.path.join(workdir, "hn_cache.sqlite3")) as cache, Activity(hn, rss) as activity:
+            poller = Poller(sources, sink=sink, budget=8, state_path=None, cache=cache,
+                            feed_state=FeedStateStore(os.path.join(workdir, "feed_state.json")),
+                            hn_base_url=f"{hn.base_url}/v0", reddit_base_url=rss.base_url, log=lambda line: None)
+            asyncio.run(poller.run(run_for=duration))
+        requests_made = hn.total_hits + rss.total_hits
+
+    # Posts that appeared within their source's last interval may not have been polled yet
+    end = time.time()
+    intervals = {source.name: source.interval for source in sources}
+    due = {key: at for key, (name, at) in activity.appeared.items() if at < end - intervals[name] - 1}
+    delays = [emitted[key] - at for key, at in due.items() if key in emitted]
+    return {'requests': requests_made, 'due': len(due), 'found': len(delays),
+            'mean_delay': statistics.mean(delays) if delays else 0.0,
+            'p95_delay': statistics.quantiles(delays, n=20)[-1] if len(delays) > 1 else 0.0,
+            'intervals': intervals}
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else DURATION
+    print("=" * 70)
+    print(f"⏱️  Polling {len(HN_KINDS)} HN lists + {QUIET_FEEDS + 1} feeds for {duration:.0f}s: "
+          f"1 busy list, 1 busy feed, the rest quiet")
+    print("=" * 70)
+
+    fixed = run_mode(False, duration)
+    adaptive = run_mode(True, duration)
+    for result in (fixed, adaptive):
+        assert result['found'] == result['due'], f"missed {result['due'] - result['found']} posts"
+
+    print(f"\n{'':<10} {'requests':>9} {'posts':>7} {'mean delay':>11} {'p95 delay':>10}")
+    for name, result in (("fixed", fixed), ("adaptive", adaptive)):
+        print(f"{name:<10} {result['requests']:>9} {result['found']:>7} {result['mean_delay']:>10.2f}s "
+              f"{result['p95_delay']:>9.2f}s")
+    print(f"\n{fixed['requests'] / adaptive['requests']:.1f}x fewer requests")
+    print("\nadaptive intervals at the end:")
+    for name, interval in adaptive['intervals'].items():
+        print(f"   {name:<20} {interval:>6.2f}s")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Benchmark: windowed queries, flat JSON history vs the day-partitioned store
+
+Builds months of synthetic history (HN posts with epoch times, Reddit
+entries with ISO 8601 or RFC 2822 dates) and answers "last 7 days,
+score >= MIN_SCORE, source in {hn, reddit}" plus a run of sliding daily
+windows:
+- ad hoc: json.load the whole history, parse each post's date with the
+  old try-ISO-then-RFC-2822 fallback, filter
+- store: PostStore.window(), which opens only the partitions the manifest
+  says can match
+
+and checks both return the same posts.
+
+Usage: python bench_post_store.py [days] [posts_per_day]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from post_store import PostStore
+from timestamps import DAY
+
+MIN_SCORE = 50
+WINDOW_DAYS = 7
+SLIDING_WINDOWS = 30
+
+
+def synthetic_history(days, per_day, now, seed=0):
+    rng = random.Random(seed)
+    posts = []
+    for n in range(days * per_day):
+        created = now - rng.randrange(days * DAY)
+        post = {'title': f"Post {n}", 'content': "I keep running into the same invoicing problem. " * 4,
+                'author': f"user{n % 500}", 'score': int(rng.paretovariate(1.2)) % 400}
+        if n % 2:
+            post.update(id=n, source="hn", url=f"https://news.ycombinator.com/item?id={n}", time=created)
+        else:
+            when = datetime.fromtimestamp(created, timezone.utc)
+            post.update(id=f"t3_{n:x}", source="reddit", link=f"https://www.reddit.com/comments/{n:x}/",
+                        feed="https://www.reddit.com/r/SaaS/.rss",
+                        published=when.isoformat() if n % 4 else format_datetime(when))
+        posts.append(post)
+    return posts
+
+
+def legacy_date(post):
+    """The old per-entry fallback chain (naive UTC datetimes)"""
+    if 'time' in post:
+        return datetime.utcfromtimestamp(post['time'])
+    published = post['published']
+    try:
+        return datetime.fromisoformat(published.replace('Z', '+00:00').replace('+00:00', ''))
+    except ValueError:
+        try:
+            return parsedate_to_datetime(published).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return None
+
+
+def legacy_query(path, since, until, min_score, sources):
+    with open(path) as f:
+        posts = json.load(f)
+    start, end = datetime.utcfromtimestamp(since), datetime.utcfromtimestamp(until)
+    keys = []
+    for post in posts:
+        if post['source'] not in sources or post['score'] < min_score:
+            continue
+        when = legacy_date(post)
+        if when is not None and start <= when < end:
+            keys.append(f"{post['source']}:{post['id']}")
+    return keys
+
+
+def store_query(store, since, until, min_score, sources):
+    return [p['key'] for p in store.query(since=since, until=until, min_score=min_score, sources=sources,
+                                          columns=['key'])]
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 120
+    per_day = int(sys.argv[2]) if len(sys.argv) > 2 else 800
+    now = int(time.time())
+    posts = synthetic_history(days, per_day, now)
+    workdir = tempfile.mkdtemp()
+    history_path = os.path.join(workdir, "history.json")
+    with open(history_path, "w") as f:
+        json.dump(posts, f)
+
+    print("=" * 70)
+    print(f"⏱️  Post store: {len(posts)} posts over {days} days, query: last {WINDOW_DAYS} days, "
+          f"score >= {MIN_SCORE}, hn + reddit")
+    print("=" * 70)
+
+    start = time.perf_counter()
+    store = PostStore(os.path.join(workdir, "posts.store"))
+    for i in range(0, len(posts), 5000):
+        store.append(posts[i:i + 5000])
+    print(f"\ningest into {len(store.partitions())} day partitions: {time.perf_counter() - start:.2f}s "
+          f"(one-off, then incremental)")
+
+    sources = {"hn", "reddit"}
+    since, until = now - WINDOW_DAYS * DAY, now + 1
+    start = time.perf_counter()
+    legacy = legacy_query(history_path, since, until, MIN_SCORE, sources)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    partitioned = store_query(PostStore(store.path), since, until, MIN_SCORE, sources)
+    store_time = time.perf_counter() - start
+    touched = len(store.candidate_partitions(since, until, MIN_SCORE, sources))
+
+    assert sorted(legacy) == sorted(partitioned), "store and ad hoc filter disagree"
+    print(f"\n{'':<30} {'time':>10}")
+    print(f"{'ad hoc (load + parse all)':<30} {legacy_time * 1000:>8.1f}ms")
+    print(f"{'store window':<30} {store_time * 1000:>8.1f}ms   ({touched}/{len(store.partitions())} partitions, "
+          f"{len(partitioned)} posts, {legacy_time / store_time:.0f}x)")
+
+    start = time.perf_counter()
+    for day in range(SLIDING_WINDOWS):
+        end = now - day * DAY
+        legacy_query(history_path, end - WINDOW_DAYS * DAY, end, MIN_SCORE, sources)
+    legacy_sliding = time.perf_counter() - start
+    start = time.perf_counter()
+    for day in range(SLIDING_WINDOWS):
+        end = now - day * DAY
+        store_query(store, end - WINDOW_DAYS * DAY, end, MIN_SCORE, sources)
+    store_sliding = time.perf_counter() - start
+    print(f"\n{SLIDING_WINDOWS} sliding {WINDOW_DAYS}-day windows: ad hoc {legacy_sliding:.2f}s, "
+          f"store {store_sliding:.2f}s ({legacy_sliding / store_sliding:.0f}x)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
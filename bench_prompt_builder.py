@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: input tokens of compact, budgeted prompts vs whole-post prompts
+
+On the bundled corpora (hackernews_posts_test.json with its labelled
+results in hn_extraction_results.json, and the spike's mock_posts.json):
+- whole: every post's full content plus its URL line, as before
+- compact: prompt_builder at several per-post budgets
+
+reports estimated input tokens per chunk and in total, and checks that the
+evidence for every labelled pain point survives: the supporting quote is
+matched (longest common run of words) against the post before and after
+compaction, and a post whose match got shorter counts as lost.
+
+Usage: python bench_prompt_builder.py [budget ...]
+"""
+import json
+import re
+import sys
+import time
+from difflib import SequenceMatcher
+
+from extract_engine import PROMPT_TEMPLATE
+from prompt_builder import PromptBuilder, compact_text, estimate_tokens
+
+HN_POSTS = "hackernews_posts_test.json"
+HN_RESULTS = "hn_extraction_results.json"
+REDDIT_POSTS = "reddit-signals-spike/mock_posts.json"
+BUDGETS = [600, 400, 250]
+_WORDS = re.compile(r"\w+")
+
+
+def whole_prompt_tokens(posts):
+    """The old rendering: full content and URL per post, separated by ---"""
+    rendered = "\n---\n\n".join(f"POST {post['id']}: {post['title']}\nContent: {post['content']}\nURL: {post['url']}\n"
+                                for post in posts)
+    return estimate_tokens(PROMPT_TEMPLATE.format(posts=rendered))
+
+
+def quote_coverage(quote, text):
+    """Share of the quote's words found as one contiguous run in text"""
+    quote_words = _WORDS.findall(quote.lower())
+    text_words = _WORDS.findall(text.lower())
+    match = SequenceMatcher(None, quote_words, text_words, autojunk=False).find_longest_match(
+        0, len(quote_words), 0, len(text_words))
+    return match.size / len(quote_words) if quote_words else 1.0
+
+
+def compare(name, posts, builder, pain):
+    start = time.perf_counter()
+    chunks = builder.chunk(posts)
+    prompts = [builder.build(chunk) for chunk in chunks]
+    elapsed = time.perf_counter() - start
+    whole = sum(whole_prompt_tokens(chunk) for chunk in chunks)
+    compact = sum(prompt.tokens for prompt in prompts)
+    trimmed = sum(post['trimmed'] for prompt in prompts for post in prompt.posts)
+
+    lost = []
+    rendered = {post_id: text for prompt in prompts for post_id, text in
+                zip((p['id'] for p in prompt.posts), prompt.text.split("\nPOST ")[1:])}
+    by_id = {post['id']: post for post in posts}
+    for post_id, quote in pain.items():
+        before = quote_coverage(quote, compact_text(by_id[post_id]['content']))
+        after = quote_coverage(quote, rendered.get(post_id, ""))
+        if after < before:
+            lost.append((post_id, round(before, 2), round(after, 2)))
+
+    budget = builder.max_post_tokens or "none"
+    print(f"{name:<8} {budget:>6} {len(chunks):>7} {whole:>8} {compact:>8} {(1 - compact / whole) * 100:>7.1f}% "
+          f"{trimmed:>8} {len(pain) - len(lost):>4}/{len(pain):<4} {elapsed * 1000:>6.1f}ms")
+    return lost
+
+
+def main():
+    budgets = [int(arg) for arg in sys.argv[1:]] or BUDGETS
+    with open(HN_POSTS) as f:
+        hn_posts = json.load(f)
+    with open(HN_RESULTS) as f:
+        hn_pain = {r['post_id']: r['supporting_quote'] for r in json.load(f) if r.get('has_pain_point')}
+    with open(REDDIT_POSTS) as f:
+        reddit_posts = json.load(f)
+
+    print("=" * 70)
+    print(f"⏱️  Prompt tokens: {len(hn_posts)} HN posts ({len(hn_pain)} labelled pain points), "
+          f"{len(reddit_posts)} Reddit posts")
+    print("=" * 70)
+    print(f"\n{'corpus':<8} {'budget':>6} {'chunks':>7} {'whole':>8} {'compact':>8} {'saved':>8} "
+          f"{'trimmed':>8} {'evidence':>9} {'build':>8}")
+
+    failures = []
+    for budget in [None] + budgets:
+        builder = PromptBuilder(PROMPT_TEMPLATE, max_post_tokens=budget)
+        failures += [(budget, *loss) for loss in compare("hn", hn_posts, builder, hn_pain)]
+        compare("reddit", reddit_posts, builder, {})
+    for budget, post_id, before, after in failures:
+        print(f"⚠️  budget {budget}: post {post_id} quote coverage {before} -> {after}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: several ingest processes against a rate-limited feed host
+
+A Reddit stand-in allows SERVER_RATE requests/s (burst SERVER_BURST),
+answers anything over that with 429 + Retry-After, and after BAN_AFTER
+429s in a row serves only HTML block pages for BAN_SECONDS. PROCESSES
+worker processes, THREADS threads each, poll its feeds for DURATION
+seconds with rss_fetch.fetch_feed:
+- none: no client-side limit (every worker as fast as it can)
+- per-process: each process its own in-memory bucket at CLIENT_RATE
+- shared: every process on one ratelimit.py file at CLIENT_RATE
+
+and reports feeds actually served per second next to the 429s and block
+pages each approach ran into.
+
+Usage: python bench_ratelimit.py [duration_seconds]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+SERVER_RATE, SERVER_BURST = 20.0, 10
+BAN_AFTER, BAN_SECONDS = 20, 3.0
+CLIENT_RATE, CLIENT_BURST = 0.9 * SERVER_RATE, 5
+PROCESSES, THREADS = 4, 2
+FEEDS = 20
+
+
+def worker(mode, base_url, path, start_at, until):
+    import ratelimit
+    from hn_fetch import make_session
+    from rss_fetch import feed_url, fetch_feed
+
+    host = ratelimit.host_of(base_url)
+    if mode != "none":
+        ratelimit.shared(path if mode == "shared" else None, limits={host: (CLIENT_RATE, CLIENT_BURST)})
+    session = make_session(THREADS)
+    counts = {"ok": 0, "throttled": 0, "blocked": 0, "other": 0}
+    lock = threading.Lock()
+
+    def run(offset):
+        n = offset
+        while time.time() < until:
+            result = fetch_feed(session, feed_url(f"sub{n % FEEDS}", base_url))
+            n += THREADS
+            if result['status'] == 429:
+                outcome = "throttled"
+            elif result['error'] and result['error'].startswith("blocked"):
+                outcome = "blocked"
+            elif result['error']:
+                outcome = "other"
+            else:
+                outcome = "ok"
+            with lock:
+                counts[outcome] += 1
+
+    time.sleep(max(0.0, start_at - time.time()))
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    limiter = ratelimit.current()
+    counts["waited"] = limiter.stats()["waited_seconds"] if limiter else 0.0
+    return counts
+
+
+def run_mode(mode, duration):
+    from standin_server import serve_rss, synthetic_atom_feed
+
+    feeds = {f"sub{i}": synthetic_atom_feed(f"sub{i}", 25, start=i * 100) for i in range(FEEDS)}
+    path = os.path.join(tempfile.mkdtemp(), "ratelimit.sqlite3")
+    with serve_rss(feeds, rate_limit=(SERVER_RATE, SERVER_BURST), ban_after=BAN_AFTER,
+                   ban_seconds=BAN_SECONDS) as server:
+        context = multiprocessing.get_context("spawn")
+        start_at = time.time() + 3.0  # time for the workers to start and import
+        with context.Pool(PROCESSES) as pool:
+            totals = pool.starmap(worker, [(mode, server.base_url, path, start_at, start_at + duration)] * PROCESSES)
+        verdicts = dict(server.verdicts)
+    counts = {key: sum(total[key] for total in totals) for key in totals[0]}
+    return counts, verdicts
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+
+    print("=" * 70)
+    print(f"⏱️  {PROCESSES} processes x {THREADS} threads polling feeds for {duration:.0f}s; host allows "
+          f"{SERVER_RATE:.0f}/s, bans for {BAN_SECONDS:.0f}s after {BAN_AFTER} straight 429s")
+    print("=" * 70)
+    print(f"\n{'client limit':<14} {'requests':>9} {'served/s':>9} {'429s':>7} {'blocked':>8} {'waiting':>9}")
+    for mode in ("none", "per-process", "shared"):
+        counts, verdicts = run_mode(mode, duration)
+        requests = sum(verdicts.values())
+        print(f"{mode:<14} {requests:>9} {counts['ok'] / duration:>9.1f} {counts['throttled']:>7} "
+              f"{counts['blocked']:>8} {counts['waited']:>8.1f}s")
+    print(f"\nserver limit {SERVER_RATE:.1f}/s, client buckets {CLIENT_RATE:.1f}/s each\n")
+
+
+if __name__ == "__main__":
+    main()
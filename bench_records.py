@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: plain dicts vs records.Post / records.ExtractionResult
+
+Builds a synthetic corpus (posts shaped like format_post_for_extraction's,
+a few thousand recurring authors; results shaped like the model's, half
+with a pain point) and, for each kind, compares:
+- load: JSON text -> json.loads dicts, orjson.loads dicts (when
+  installed), records.loads records
+- dump: the same objects back to JSON text
+- memory: what the loaded objects hold (tracemalloc, in a separate pass
+  so tracing doesn't skew the timings)
+
+and checks the records round-trip to the same data as the dicts.
+
+Usage: python bench_records.py [record_count]
+"""
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from bench_columnar import synthetic_results
+from records import ExtractionResult, Post, dumps, loads, orjson
+
+AUTHORS = 5000
+WORDS = ("invoice spreadsheet manual export client report hours every week copy paste reconcile "
+         "deadline tool broken sync again billing stripe dashboard csv upload").split()
+
+
+def synthetic_posts(count, seed=0):
+    rng = random.Random(seed)
+    authors = [f"user{n}" for n in range(AUTHORS)]
+    start = 1770000000
+    posts = []
+    for i in range(count):
+        created = start + i * 3
+        source = "hn" if rng.random() < 0.7 else "reddit"
+        posts.append({
+            'id': 46900000 + i,
+            'title': " ".join(rng.choices(WORDS, k=rng.randint(5, 12))),
+            'content': " ".join(rng.choices(WORDS, k=rng.randint(10, 30))),
+            'url': f"https://news.ycombinator.com/item?id={46900000 + i}",
+            'score': rng.randrange(500),
+            'comments': rng.randrange(200),
+            'author': rng.choice(authors),
+            'published': time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(created)),
+            'source': source,
+            'created_utc': created,
+        })
+    return posts
+
+
+def timed(fn):
+    gc.collect()
+    start = time.perf_counter()
+    value = fn()
+    return time.perf_counter() - start, value
+
+
+def traced_size(fn):
+    """Bytes still allocated by what fn returns"""
+    gc.collect()
+    tracemalloc.start()
+    value = fn()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return size
+
+
+def compare(name, record_type, raw, count):
+    text = json.dumps(raw, separators=(",", ":")).encode("utf-8")
+    del raw
+    ways = [("dict", "json", lambda: json.loads(text), lambda value: json.dumps(value))]
+    if orjson is not None:
+        ways.append(("dict", "orjson", lambda: orjson.loads(text), lambda value: orjson.dumps(value)))
+    ways.append((record_type.__name__, "records", lambda: loads(text, record_type), dumps))
+
+    print(f"\n{name}: {count} records, {len(text) / 1e6:.0f}MB of JSON")
+    print(f"{'objects':<18} {'codec':<8} {'load':>8} {'dump':>8} {'memory':>9} {'per record':>11}")
+    baseline = None
+    for kind, codec, load, dump in ways:
+        load_time, value = timed(load)
+        dump_time, _ = timed(lambda: dump(value))
+        if kind != "dict":
+            sample = json.loads(text[:200000].rsplit(b"},{", 1)[0] + b"}]")
+            assert [record.to_dict() for record in value[:len(sample)]] == sample, "records don't round-trip"
+        del value
+        size = traced_size(load)
+        baseline = baseline or size
+        print(f"{kind:<18} {codec:<8} {load_time:>7.2f}s {dump_time:>7.2f}s {size / 1e6:>7.0f}MB "
+              f"{size / count:>9.0f}B  ({size / baseline:.2f}x)")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    print("=" * 70)
+    print(f"⏱️  Records benchmark: {count} posts and {count} extraction results "
+          f"({'orjson' if orjson is not None else 'json'} codec)")
+    print("=" * 70)
+    compare("posts", Post, synthetic_posts(count), count)
+    compare("extraction results", ExtractionResult, synthetic_results(count), count)
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tail latency and a dead host, with and without resilience.py
+
+Tail: an HN stand-in answers in LATENCY, but STALL_RATE of requests (at
+random) hang for STALL_SECONDS. BATCHES batches of BATCH items each go
+through hn_fetch.fetch_items three ways:
+- plain: no hedging, no deadline (a batch waits for its slowest item)
+- hedged: a duplicate GET once a call passes the endpoint's p95
+- hedged + deadline: hedged, and the batch ends after DEADLINE seconds
+  (anything unfinished comes back as None)
+
+and reports p50 / p99 / max batch time, batches over a second, items
+missing, hedges sent and hedges skipped because the host had no free
+in-flight slot (its own or from the hedge reserve) or rate-limit token.
+
+Dead host: every request to the stand-in fails with a 503. One batch
+goes out with the host's breaker disabled (every item retried) and one
+with it enabled (fail fast once it opens); then the host recovers and,
+after the breaker's reset timeout, a half-open probe closes it again.
+
+Usage: python bench_resilience.py [batches] [stall_rate]
+"""
+import sys
+import time
+
+import resilience
+from hn_fetch import fetch_items
+from standin_server import serve_hn, synthetic_hn_items
+
+BATCH = 100
+LATENCY = 0.01
+STALL_SECONDS = 2.0
+DEADLINE = 0.5
+WORKERS = 32
+RESET_TIMEOUT = 1.0
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def run_batches(server, ids, batches, hedge, deadline):
+    base_url = f"{server.base_url}/v0"
+    resilience.reset()
+    fetch_items(ids[:BATCH], max_workers=WORKERS, per_host=WORKERS, base_url=base_url, hedge=hedge)  # warm-up
+    before = resilience.hedge_stats()
+    times, missing = [], 0
+    for n in range(batches):
+        batch = ids[(n % (len(ids) // BATCH)) * BATCH:][:BATCH]
+        start = time.perf_counter()
+        items = fetch_items(batch, max_workers=WORKERS, per_host=WORKERS, base_url=base_url, hedge=hedge,
+                            deadline=resilience.Deadline(deadline) if deadline else None)
+        times.append(time.perf_counter() - start)
+        missing += sum(1 for item in items if item is None)
+    after = resilience.hedge_stats()
+    return times, missing, after['hedges'] - before['hedges'], after['skipped'] - before['skipped']
+
+
+def bench_tail(batches, stall_rate):
+    items = synthetic_hn_items(BATCH * 10)
+    ids = sorted(items)
+    print(f"\n🐢 Tail: {batches} batches of {BATCH} items, {LATENCY * 1000:.0f}ms responses, "
+          f"{stall_rate:.0%} stall for {STALL_SECONDS:.0f}s")
+    print(f"{'mode':<24} {'p50':>7} {'p99':>7} {'max':>7} {'>1s':>5} {'missing':>8} {'hedges':>7} {'skipped':>8}")
+    with serve_hn(items, latency=LATENCY, stall_rate=stall_rate, stall_seconds=STALL_SECONDS) as server:
+        for mode, hedge, deadline in (("plain", False, None), ("hedged", True, None),
+                                      (f"hedged + {DEADLINE}s deadline", True, DEADLINE)):
+            times, missing, hedges, skipped = run_batches(server, ids, batches, hedge, deadline)
+            slow = sum(1 for elapsed in times if elapsed > 1.0)
+            print(f"{mode:<24} {percentile(times, 0.5):>6.2f}s {percentile(times, 0.99):>6.2f}s "
+                  f"{max(times):>6.2f}s {slow:>5} {missing:>8} {hedges:>7} {skipped:>8}")
+
+
+def fetch_dead(server, ids, breaker_enabled):
+    base_url = f"{server.base_url}/v0"
+    resilience.reset()
+    breaker = resilience.host_breaker(base_url)
+    breaker.reset_timeout = RESET_TIMEOUT
+    if not breaker_enabled:
+        breaker.failure_threshold = float("inf")
+    hits = server.total_hits
+    start = time.perf_counter()
+    items = fetch_items(ids, max_workers=WORKERS, per_host=WORKERS, base_url=base_url, backoff=0.05)
+    elapsed = time.perf_counter() - start
+    return elapsed, server.total_hits - hits, sum(1 for item in items if item is not None), breaker
+
+
+def bench_dead_host():
+    items = synthetic_hn_items(BATCH * 2)
+    ids = sorted(items)
+    print(f"\n💀 Dead host: {len(ids)} items, every request a 503 (3 retries each)")
+    print(f"{'breaker':<24} {'time':>8} {'requests':>9} {'fetched':>8} {'state':>10}")
+    with serve_hn(items, latency=LATENCY, error_rate=1.0) as server:
+        for label, enabled in (("disabled", False), ("enabled", True)):
+            elapsed, requests, fetched, breaker = fetch_dead(server, ids, enabled)
+            print(f"{label:<24} {elapsed:>7.2f}s {requests:>9} {fetched:>8} {breaker.state:>10}")
+
+        server.error_rate = 0.0
+        base_url = f"{server.base_url}/v0"
+        early = fetch_items(ids[:10], max_workers=WORKERS, base_url=base_url)
+        time.sleep(RESET_TIMEOUT)
+        start = time.perf_counter()
+        recovered = fetch_items(ids, max_workers=WORKERS, per_host=WORKERS, base_url=base_url)
+        elapsed = time.perf_counter() - start
+        print(f"{'host back, open':<24} {'':>8} {'':>9} {sum(1 for item in early if item):>8} "
+              f"{'open':>10}")
+        print(f"{'after half-open':<24} {elapsed:>7.2f}s {'':>9} {sum(1 for item in recovered if item):>8} "
+              f"{breaker.state:>10}")
+
+
+def main():
+    batches = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    stall_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.02
+
+    print("=" * 70)
+    print("⏱️  Resilience benchmark: hedged requests, deadlines, circuit breakers")
+    print("=" * 70)
+    bench_tail(batches, stall_rate)
+    bench_dead_host()
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark + behaviour check for the multi-subreddit RSS fetcher
+
+Runs rss_fetch against a local Reddit stand-in with overlapping feeds
+(cross-posts), a couple of slow feeds and one HTML block page:
+1. cold poll: serial test_reddit_rss-style loop vs concurrent fetch
+2. warm poll: every unchanged feed should come back 304 with no body
+3. one feed changes: only that feed is re-downloaded
+
+Usage: python bench_rss_fetch.py [feed_count] [latency_ms]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import requests
+
+from rss_fetch import HEADERS, FeedStateStore, feed_url, fetch_subreddits
+from standin_server import serve_rss, synthetic_atom_feed
+
+
+def serial_poll(subreddits, base_url):
+    """One plain GET per feed, in sequence (the old test_reddit_rss loop)"""
+    bodies = []
+    for name in subreddits:
+        response = requests.get(feed_url(name, base_url), headers=HEADERS, timeout=10)
+        bodies.append(response.content)
+    return bodies
+
+
+def main():
+    feed_count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    subreddits = [f"sub{i}" for i in range(feed_count)]
+    # Neighbouring feeds share half their entries, like cross-posts
+    feeds = {name: synthetic_atom_feed(name, 25, start=i * 12) for i, name in enumerate(subreddits)}
+    slow = {subreddits[0]: 0.5, subreddits[1]: 0.5}
+    blocked = [subreddits[-1]]
+    expected_unique = len({f"t3_{n:x}" for i in range(feed_count - 1) for n in range(i * 12, i * 12 + 25)})
+
+    state_path = os.path.join(tempfile.mkdtemp(), "rss_state.json")
+
+    print("=" * 70)
+    print(f"⏱️  RSS fetch benchmark: {feed_count} feeds, {latency_ms:.0f}ms latency, "
+          f"{len(slow)} slow, {len(blocked)} blocked")
+    print("=" * 70)
+
+    with serve_rss(feeds, slow=slow, blocked=blocked, latency=latency_ms / 1000) as server:
+        base_url = server.base_url
+
+        start = time.perf_counter()
+        serial_poll(subreddits, base_url)
+        serial_time = time.perf_counter() - start
+        print(f"\nSerial cold poll:      {serial_time:6.2f}s")
+
+        store = FeedStateStore(state_path)
+        start = time.perf_counter()
+        entries, results = fetch_subreddits(subreddits, store=store, base_url=base_url)
+        store.save()
+        cold_time = time.perf_counter() - start
+        errors = [r for r in results if r['error']]
+        print(f"Concurrent cold poll:  {cold_time:6.2f}s  ({serial_time / cold_time:.1f}x)  "
+              f"{len(entries)} unique entries, {len(errors)} blocked")
+        assert len(entries) == expected_unique, (len(entries), expected_unique)
+        assert [r['url'] for r in errors] == [feed_url(blocked[0], base_url)]
+
+        store = FeedStateStore(state_path)
+        start = time.perf_counter()
+        entries, results = fetch_subreddits(subreddits, store=store, base_url=base_url)
+        warm_time = time.perf_counter() - start
+        not_modified = sum(1 for r in results if r['not_modified'])
+        print(f"Conditional warm poll: {warm_time:6.2f}s  {not_modified}/{feed_count} feeds 304, "
+              f"{len(entries)} entries downloaded")
+        assert not_modified == feed_count - 1 and not entries
+
+        feeds[subreddits[5]] = synthetic_atom_feed(subreddits[5], 25, start=10000)
+        entries, results = fetch_subreddits(subreddits, store=store, base_url=base_url)
+        changed = [r['url'] for r in results if r['status'] == 200 and not r['error']]
+        print(f"After one feed changed: {len(changed)} feed re-downloaded, {len(entries)} new entries")
+        assert changed == [feed_url(subreddits[5], base_url)] and len(entries) == 25
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
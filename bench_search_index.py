@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: keyword search, scanning every post vs the BM25 index
+
+Synthetic history with a Zipf-distributed vocabulary (a few words very
+common, most rare) and a few pain phrases planted in some posts. Times:
+- scan: lowercase every post and check the query words (or the quoted
+  phrase) as substrings, like test_hackernews_api's keyword check; no
+  ranking
+- index: SearchIndex.search(), ranked, top LIMIT
+
+for plain, prefix and phrase queries; checks that every phrase hit of the
+index also passes the scan. Also reports build time and size on disk
+against the raw JSON.
+
+Usage: python bench_search_index.py [post_count]
+"""
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from near_dup import post_text
+from search_index import SearchIndex
+
+VOCABULARY = 20000
+LIMIT = 50
+BATCH = 5000
+PHRASES = ["manual data entry", "invoice reconciliation", "churn dashboard", "api rate limits"]
+QUERIES = ["invoice", "invoic*", "reconciliation spreadsheet", '"manual data entry"',
+           '"invoice reconciliation" stripe*']
+
+
+def synthetic_posts(count, seed=0):
+    rng = random.Random(seed)
+    words = [f"w{n}" for n in range(VOCABULARY)] + ["invoice", "invoices", "invoicing", "stripe", "stripes",
+                                                    "spreadsheet", "reconciliation"]
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    posts = []
+    for i in range(count):
+        body = rng.choices(words, weights, k=rng.randint(40, 200))
+        if rng.random() < 0.05:
+            phrase = rng.choice(PHRASES).split()
+            at = rng.randrange(len(body))
+            body[at:at] = phrase
+        posts.append({'id': i, 'source': "hn", 'url': f"https://news.ycombinator.com/item?id={i}",
+                      'title': " ".join(rng.choices(words, weights, k=8)), 'content': " ".join(body),
+                      'score': rng.randrange(300), 'created_utc': 1770000000 + i})
+    return posts
+
+
+def scan(posts, query):
+    """Every post containing the quoted phrase, else every query word, as substrings; unranked"""
+    needles = [query.split('"')[1]] if '"' in query else [word.rstrip("*") for word in query.split()]
+    return [post for post in posts if all(needle in post_text(post).lower() for needle in needles)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    posts = synthetic_posts(count)
+    workdir = tempfile.mkdtemp()
+    raw_path = os.path.join(workdir, "posts.json")
+    with open(raw_path, "w") as f:
+        json.dump(posts, f)
+
+    print("=" * 70)
+    print(f"⏱️  Keyword search over {count} posts ({os.path.getsize(raw_path) / 1e6:.0f}MB of JSON)")
+    print("=" * 70)
+
+    path = os.path.join(workdir, "search_index.sqlite3")
+    start = time.perf_counter()
+    with SearchIndex(path) as index:
+        for i in range(0, count, BATCH):
+            index.add_many(posts[i:i + BATCH])
+        index.compact()
+        stats = index.stats()
+    print(f"\nbuild: {time.perf_counter() - start:.1f}s, {stats['terms']} terms, "
+          f"postings {stats['postings_bytes'] / 1e6:.1f}MB, file {stats['file_bytes'] / 1e6:.1f}MB")
+
+    print(f"\n{'query':<36} {'scan':>9} {'index':>9} {'matches':>8}")
+    with SearchIndex(path) as index:
+        for query in QUERIES:
+            start = time.perf_counter()
+            scanned = scan(posts, query)
+            scan_time = time.perf_counter() - start
+            start = time.perf_counter()
+            hits = index.search(query, limit=LIMIT)
+            index_time = time.perf_counter() - start
+            if '"' in query:
+                scanned_keys = {f"hn:{post['id']}" for post in scanned}
+                assert all(hit['key'] in scanned_keys for hit in hits), f"phrase hit missing from scan: {query}"
+            print(f"{query:<36} {scan_time * 1000:>7.0f}ms {index_time * 1000:>7.1f}ms {len(scanned):>8}   "
+                  f"({scan_time / index_time:.0f}x)")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Offline benchmark suite: end-to-end and per-stage throughput across commits
+
+Network-bound benchmarks replay cassettes (cassette.py) instead of hitting
+HN, Reddit or the Messages API, so two runs see byte-identical traffic;
+--latency adds a fixed delay per replayed request to model a real network.
+Missing cassettes are recorded once from the local stand-in servers, with
+their URLs aliased to the real endpoints; a cassette recorded from live
+traffic (python cassette.py record ...) can be dropped into --cassettes
+in its place. CPU-bound stages use the seeded generators of the matching
+bench_*.py script.
+
+Each benchmark runs --repeat times; the median time, items/s and the
+per-stage totals collected by metrics.py during the last run are appended
+to a history file keyed by git commit. --compare prints each benchmark
+against the most recent run of an earlier commit, asv-style.
+
+Usage: python bench_suite.py [--cassettes bench_cassettes] [--repeat 3] [--latency 0]
+                             [--only hn_ingest extract ...] [--history bench_history.jsonl] [--compare]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import metrics
+from analysis import index_by, rank_pain_points, split_pain_points
+from bench_cluster import synthetic_pain_points
+from bench_near_dup import synthetic_posts
+from cassette import Cassette
+from cluster import cluster_pain_points
+from extract_engine import MESSAGES_URL, PROMPT_TEMPLATE, ExtractionEngine
+from hn_fetch import HN_API, fetch_items, fetch_story_ids
+from hn_pipeline import (drain, format_posts, hn_source, metered, only_stories, pipeline, recent, triaged,
+                         with_content)
+from near_dup import NearDuplicateIndex
+from prompt_builder import PromptBuilder
+from rss_fetch import REDDIT_BASE, fetch_subreddits
+from standin_server import (serve_hn, serve_messages, serve_rss, synthetic_atom_feed, synthetic_hn_items)
+from triage import Triage
+
+DEFAULT_CASSETTE_DIR = "bench_cassettes"
+DEFAULT_HISTORY = "bench_history.jsonl"
+HN_ITEMS = 500
+SUBREDDITS = [f"sub{n}" for n in range(8)]
+FEED_ENTRIES = 100
+EXTRACT_POSTS = 100
+CPU_POSTS = 5000
+
+BENCHMARKS = {}
+
+
+def benchmark(name, setup=None):
+    """Register fn(context, data) -> items processed; setup(context) -> data runs once, untimed"""
+    def register(fn):
+        BENCHMARKS[name] = (fn, setup)
+        return fn
+    return register
+
+
+def cassette_path(context, name):
+    return os.path.join(context['cassettes'], f"{name}.jsonl.gz")
+
+
+def replay(context, name):
+    return Cassette(cassette_path(context, name), latency=context['latency'])
+
+
+def ingest_stages():
+    return [
+        metered(only_stories),
+        metered(format_posts),
+        metered(with_content(20), "with_content"),
+        metered(recent(float("inf")), "recent"),  # cassette items only get older
+        metered(triaged(Triage(threshold=0)), "triaged"),
+    ]
+
+
+def extraction_posts(context):
+    """The posts the messages cassette was recorded for: ingest output by id, first EXTRACT_POSTS
+
+    Sorted because items arrive in completion order and the first
+    EXTRACT_POSTS must be the same posts every run.
+    """
+    with replay(context, "hn"):
+        ids = fetch_story_ids("askstories")
+        posts = list(pipeline(hn_source(ids), *ingest_stages()))
+    return sorted(posts, key=lambda post: post['id'])[:EXTRACT_POSTS]
+
+
+def messages_cassette():
+    """Cassette name for the current prompt (template and builder settings); prompts are what it matches on"""
+    return f"messages-{PromptBuilder(PROMPT_TEMPLATE).version}"
+
+
+def cpu_posts(context):
+    return synthetic_posts(CPU_POSTS)[0]
+
+
+def cpu_pain_points(context):
+    return synthetic_pain_points(CPU_POSTS)[0]
+
+
+def ensure_cassettes(context):
+    """Record any missing cassette from the stand-in servers"""
+    path = cassette_path(context, "hn")
+    if not os.path.exists(path):
+        with serve_hn(synthetic_hn_items(HN_ITEMS)) as server:
+            base_url = f"{server.base_url}/v0"
+            with Cassette(path, mode="record", aliases={base_url: HN_API}):
+                fetch_items(fetch_story_ids("askstories", base_url=base_url), base_url=base_url)
+        print(f"📼 recorded {path}")
+
+    path = cassette_path(context, "rss")
+    if not os.path.exists(path):
+        feeds = {sub: synthetic_atom_feed(sub, FEED_ENTRIES, start=n * FEED_ENTRIES)
+                 for n, sub in enumerate(SUBREDDITS)}
+        with serve_rss(feeds) as server:
+            with Cassette(path, mode="record", aliases={server.base_url: REDDIT_BASE}):
+                fetch_subreddits(SUBREDDITS, base_url=server.base_url)
+        print(f"📼 recorded {path}")
+
+    path = cassette_path(context, messages_cassette())
+    if not os.path.exists(path):
+        posts = extraction_posts(context)
+        with serve_messages(latency=0.05, per_post_latency=0.01) as server:
+            url = f"{server.base_url}/v1/messages"
+            with Cassette(path, mode="record", aliases={url: MESSAGES_URL}):
+                ExtractionEngine(api_key="bench", url=url, requests_per_minute=10000).extract(posts)
+        print(f"📼 recorded {path}")
+
+
+@benchmark("hn_ingest")
+def bench_hn_ingest(context, data):
+    """Id list + item fetches + format/filter stages, end to end"""
+    with replay(context, "hn"):
+        ids = fetch_story_ids("askstories")
+        return drain(pipeline(hn_source(ids), *ingest_stages()))
+
+
+@benchmark("rss_ingest")
+def bench_rss_ingest(context, data):
+    """Concurrent feed fetches, streaming parse and merge"""
+    with replay(context, "rss"):
+        entries, _ = fetch_subreddits(SUBREDDITS)
+    return len(entries)
+
+
+@benchmark("extract", setup=extraction_posts)
+def bench_extract(context, posts):
+    """Chunking, streamed responses and incremental parsing (no cache, no checkpoint)"""
+    with replay(context, messages_cassette()):
+        results, _ = ExtractionEngine(api_key="bench", requests_per_minute=10000).extract(posts)
+    return len(results)
+
+
+@benchmark("near_dup", setup=cpu_posts)
+def bench_near_dup(context, posts):
+    with NearDuplicateIndex(os.path.join(tempfile.mkdtemp(), "near_dup.sqlite3")) as index:
+        with metrics.timer("stage_seconds", stage="near_dup"):
+            index.add_many(posts)
+    return len(posts)
+
+
+@benchmark("triage", setup=cpu_posts)
+def bench_triage(context, posts):
+    with metrics.timer("stage_seconds", stage="triage"):
+        Triage().split(posts)
+    return len(posts)
+
+
+@benchmark("analyze", setup=cpu_pain_points)
+def bench_analyze(context, pain_points):
+    """Clustering + ranking of extracted pain points"""
+    pain, _ = split_pain_points(pain_points)
+    cluster_pain_points(pain)
+    rank_pain_points(pain, index_by(pain, 'post_id'))
+    return len(pain_points)
+
+
+def stage_totals(registry=metrics.REGISTRY):
+    """{histogram[first label]: total seconds} from the metrics of the last run
+
+    Totals are summed over threads, so concurrent stages can exceed wall time.
+    """
+    totals = {}
+    for record in registry.records():
+        if record['type'] != "histogram":
+            continue
+        labels = [v for k, v in sorted(record['labels'].items()) if k != "status"]
+        name = f"{record['name']}[{labels[0]}]" if labels else record['name']
+        totals[name] = round(totals.get(name, 0.0) + record['sum'], 6)
+    return totals
+
+
+def git_commit():
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=repo, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo,
+                                    capture_output=True, text=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown", False
+    return commit, dirty
+
+
+def run(name, context, repeat):
+    fn, setup = BENCHMARKS[name]
+    data = None
+    if setup is not None:
+        if setup.__name__ not in context:  # shared by benchmarks with the same setup
+            context[setup.__name__] = setup(context)
+        data = context[setup.__name__]
+    times = []
+    for _ in range(repeat):
+        metrics.REGISTRY.reset()
+        start = time.perf_counter()
+        items = fn(context, data)
+        times.append(time.perf_counter() - start)
+    seconds = statistics.median(times)
+    return {'benchmark': name, 'items': items, 'seconds': round(seconds, 6), 'best': round(min(times), 6),
+            'items_per_s': round(items / seconds, 1) if seconds else None, 'stages': stage_totals()}
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def previous_run(history, record):
+    """Most recent run of the same benchmark and settings at a different commit"""
+    for old in reversed(history):
+        if (old['benchmark'] == record['benchmark'] and old['latency_ms'] == record['latency_ms']
+                and old['commit'] != record['commit']):
+            return old
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark suite")
+    parser.add_argument("--cassettes", default=DEFAULT_CASSETTE_DIR)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every replayed request")
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="run just these benchmarks")
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--compare", action="store_true", help="show change against the previous commit's run")
+    args = parser.parse_args()
+
+    context = {'cassettes': args.cassettes, 'latency': args.latency / 1000}
+    ensure_cassettes(context)
+    commit, dirty = git_commit()
+    history = load_history(args.history)
+
+    print("=" * 70)
+    print(f"⏱️  Benchmark suite @ {commit}{' (dirty)' if dirty else ''}, "
+          f"{args.repeat} runs each, {args.latency:.0f}ms replay latency")
+    print("=" * 70)
+    print(f"\n{'benchmark':<12} {'items':>6} {'median':>9} {'items/s':>10}  {'vs previous':>12}  top stages")
+
+    with open(args.history, "a") as out:
+        for name in args.only or BENCHMARKS:
+            record = {'commit': commit, 'dirty': dirty, 'ts': time.time(), 'latency_ms': args.latency,
+                      'python': sys.version.split()[0], **run(name, context, args.repeat)}
+            out.write(json.dumps(record) + "\n")
+
+            change = ""
+            old = previous_run(history, record) if args.compare else None
+            if old and old['seconds']:
+                change = f"{(record['seconds'] / old['seconds'] - 1) * 100:+.1f}% {old['commit']}"
+            top = sorted(record['stages'].items(), key=lambda item: -item[1])[:3]
+            stages = ", ".join(f"{stage} {total:.3f}s" for stage, total in top)
+            print(f"{name:<12} {record['items']:>6} {record['seconds']:>8.3f}s {record['items_per_s']:>10} "
+                  f" {change:>12}  {stages}")
+    print(f"\n💾 Appended to {args.history}")
+
+
+if __name__ == "__main__":
+    main()
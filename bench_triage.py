@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Benchmark: the original keyword check vs the triage matcher
+
+On the saved HN corpus (hackernews_posts_test.json) replicated up to a
+working-set size, times:
+- the old test_hackernews.py check: lower() + `any(k in text ...)` per
+  keyword list (17 terms, yes/no, substring so "hard" hits "hardware")
+- the same any() check over the positive terms of the triage lexicon
+- the same substring loop scoring every term of the triage lexicon
+- the previous matcher: the lexicon as one word-bounded regex alternation
+  factored into a prefix trie, one findall per post
+- triage.Triage.worth_extracting: one split and one set intersection per
+  post
+
+Each row is printed relative to the matcher. The any() checks stop at the
+first substring hit and only answer yes/no, so they stay the cheapest; of
+the rows that score every term, the matcher is the fastest, and its cost
+does not grow with the lexicon. Below that, precision / recall against the
+extraction labels in hn_extraction_results.json: how many posts each
+threshold would send to the model. These are the posts the lexicon was
+first written against, so treat them as a sanity check, not a held-out
+score; terms that only matched this sample were dropped.
+
+Usage: python bench_triage.py [post_count]
+"""
+import json
+import re
+import sys
+import time
+
+from triage import LEXICON, Triage, precision_recall
+
+PAIN_KEYWORDS = ['problem', 'issue', 'struggle', 'frustrated', 'difficult', 'hard', 'challenge', 'pain', 'annoying', 'hate']
+QUESTION_KEYWORDS = ['how do', 'how can', 'how to', 'what do', 'anyone know', 'advice', 'help']
+THRESHOLDS = [-1.0, 0.0, 1.0, 2.0, 3.0]
+
+
+def legacy(posts):
+    flagged = 0
+    for post in posts:
+        content_lower = (post['title'] + ' ' + post['content']).lower()
+        pain = any(keyword in content_lower for keyword in PAIN_KEYWORDS)
+        question = any(keyword in content_lower for keyword in QUESTION_KEYWORDS)
+        flagged += pain or question
+    return flagged
+
+
+def lexicon_any(posts):
+    terms = [term.rstrip('*') for term, (_, weight) in LEXICON.items() if weight > 0]
+    flagged = 0
+    for post in posts:
+        content_lower = (post['title'] + ' ' + post['content']).lower()
+        flagged += any(term in content_lower for term in terms)
+    return flagged
+
+
+def per_term_substring(posts):
+    total = 0.0
+    for post in posts:
+        content_lower = (post['title'] + ' ' + post['content']).lower()
+        total += sum(weight for term, (_, weight) in LEXICON.items() if term.rstrip('*') in content_lower)
+    return total
+
+
+def trie_pattern(terms):
+    """The previous matcher's regex: terms factored into a prefix trie"""
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        alternatives = [r'\w*' if char == '*' else re.escape(char) + build(child)
+                        for char, child in sorted(node.items()) if char]
+        if '' in node:
+            alternatives.append(r'\b')
+        return alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+
+    return re.compile(r'\b' + build(trie))
+
+
+def regex_matcher(posts, pattern):
+    return sum(len(set(pattern.findall((post['title'] + '\n' + post['content']).lower()))) for post in posts)
+
+
+def compiled(posts, triage):
+    return sum(1 for post in posts if triage.worth_extracting(post))
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    value = fn(*args)
+    return time.perf_counter() - start, value
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with open('hackernews_posts_test.json', 'r') as f:
+        posts = json.load(f)
+    with open('hn_extraction_results.json', 'r') as f:
+        results = json.load(f)
+
+    corpus = (posts * (count // len(posts) + 1))[:count]
+    triage = Triage()
+
+    print("=" * 70)
+    print(f"⏱️  Triage benchmark: {len(corpus)} posts")
+    print("=" * 70)
+
+    rows = [
+        (f"any() keyword loops ({len(PAIN_KEYWORDS) + len(QUESTION_KEYWORDS)} terms)", timed(legacy, corpus)[0]),
+        (f"any() over the lexicon ({sum(w > 0 for _, w in LEXICON.values())} terms)", timed(lexicon_any, corpus)[0]),
+        (f"per-term substring ({len(LEXICON)} terms)", timed(per_term_substring, corpus)[0]),
+        (f"previous trie regex ({len(LEXICON)} terms)", timed(regex_matcher, corpus, trie_pattern(LEXICON))[0]),
+        (f"token-set matcher ({len(triage.lexicon)} terms)", timed(compiled, corpus, triage)[0]),
+    ]
+    print()
+    for label, elapsed in rows:
+        print(f"{label:<34} {elapsed / len(corpus) * 1e6:7.1f}µs/post  ({elapsed / rows[-1][1]:.1f}x the matcher)")
+
+    print(f"\nAgainst {len(results)} labelled extraction results:")
+    print(f"{'threshold':>10}  {'sent':>6}  {'precision':>9}  {'recall':>7}")
+    for threshold in THRESHOLDS:
+        triage.threshold = threshold
+        stats = precision_recall(triage, posts, results)
+        labelled = stats['tp'] + stats['fp'] + stats['fn'] + stats['tn']
+        print(f"{threshold:>10.1f}  {stats['kept']:>3}/{labelled:<3}  "
+              f"{stats['precision']:>9.2f}  {stats['recall']:>7.2f}")
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: HN item fetching from a shared work queue, 1 vs many processes
+
+ITEMS fetch_item jobs go on a workqueue.py SQLite queue; worker processes
+(spawned, each a Worker running hn_fetch.item_handler with THREADS
+threads) drain it against an HN stand-in with injected latency:
+- 1 process
+- PROCESSES processes
+- PROCESSES processes, one of which dies (os._exit) after fetching its
+  first batch and before completing it: its leases run out after
+  VISIBILITY seconds and the survivors pick the jobs up
+
+and reports wall time, items per second, jobs done and how many items
+were fetched more than once (server requests beyond one per item,
+hedged requests included).
+
+Usage: python bench_workqueue.py [items] [latency_ms]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+PROCESSES, THREADS = 4, 8
+BATCH = 32
+VISIBILITY = 2.0
+
+
+def worker(path, base_url, crash):
+    from hn_fetch import item_handler
+    from workqueue import SQLiteQueue, Worker
+
+    handle = item_handler(max_workers=THREADS, base_url=base_url)
+
+    def crashing(payloads):
+        handle(payloads)
+        os._exit(1)  # fetched, never completed: the leases are left to run out
+
+    with SQLiteQueue(path) as queue:
+        return Worker(queue, {"fetch_item": crashing if crash else handle}, batch_size=BATCH,
+                      visibility=VISIBILITY, idle_sleep=0.1).run()
+
+
+def run(items, latency, processes, crash=False):
+    from standin_server import serve_hn, synthetic_hn_items
+    from workqueue import SQLiteQueue
+
+    hn_items = synthetic_hn_items(items)
+    ids = sorted(hn_items)
+    path = os.path.join(tempfile.mkdtemp(), "workqueue.sqlite3")
+    with SQLiteQueue(path) as queue:
+        queue.enqueue("fetch_item", [{"id": item_id} for item_id in ids], keys=ids)
+
+    with serve_hn(hn_items, latency=latency) as server:
+        context = multiprocessing.get_context("spawn")
+        start = time.perf_counter()
+        procs = [context.Process(target=worker, args=(path, f"{server.base_url}/v0", crash and n == 0))
+                 for n in range(processes)]
+        for proc in procs:
+            proc.start()
+        for proc in procs:
+            proc.join()
+        elapsed = time.perf_counter() - start
+        hits = server.total_hits
+
+    with SQLiteQueue(path) as queue:
+        done = queue.counts().get("fetch_item", {}).get("done", 0)
+    return elapsed, done, hits - len(ids)
+
+
+def main():
+    items = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    print("=" * 70)
+    print(f"⏱️  Work queue: {items} fetch_item jobs, {latency_ms:.0f}ms injected latency, "
+          f"{THREADS} threads per worker process")
+    print("=" * 70)
+    print(f"\n{'workers':<26} {'time':>8} {'items/s':>9} {'done':>6} {'refetched':>10}")
+    baseline = None
+    for label, processes, crash in (("1 process", 1, False), (f"{PROCESSES} processes", PROCESSES, False),
+                                    (f"{PROCESSES} processes, 1 crashes", PROCESSES, True)):
+        elapsed, done, refetched = run(items, latency_ms / 1000, processes, crash)
+        baseline = baseline or elapsed
+        print(f"{label:<26} {elapsed:>7.2f}s {done / elapsed:>9.0f} {done:>6} {refetched:>10}"
+              f"  ({baseline / elapsed:.1f}x)")
+    print(f"\ncrashed worker's leases expire after {VISIBILITY:.0f}s (startup time included)\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Record/replay HTTP cassettes for the fetch and extraction scripts
+
+Every requests call (pooled sessions and bare requests.get alike) ends in
+HTTPAdapter.send, so that is where a Cassette hooks in while it is active:
+- record: requests go out as usual; each exchange (method, URL, a digest
+  of the request body, status, headers, body, elapsed time, or the
+  connection error raised) is kept and written to a gzipped JSON-lines
+  file on exit. Request headers are never stored, so API keys stay out
+- replay: nothing leaves the process. A request is answered with the next
+  recording for the same method + URL + body digest (falling back to the
+  same method + URL), cycling once they run out; unknown requests get a
+  404 and are counted as misses. Latency can be fixed, taken from the
+  recording, and spread across the chunks of a streamed (SSE) body;
+  error_rate turns a seeded fraction of requests into 503s or connection
+  errors, so retry paths can be exercised reproducibly
+
+aliases maps a base URL to the one stored in the cassette, so traffic
+recorded against a local stand-in replays for the real endpoints (and the
+other way round).
+
+    with Cassette("cassettes/hn.jsonl.gz", mode="record"):
+        fetch_items(ids)
+    with Cassette("cassettes/hn.jsonl.gz", latency=0.02, error_rate=0.05):
+        fetch_items(ids)
+
+Usage: python cassette.py record CASSETTE -- script.py [args]
+       python cassette.py replay CASSETTE [--latency MS | --recorded-latency] [--chunk-delay MS]
+                                  [--error-rate R] [--error status|connection] [--seed N] -- script.py [args]
+       python cassette.py show CASSETTE
+"""
+import argparse
+import base64
+import gzip
+import hashlib
+import http.client
+import json
+import os
+import random
+import runpy
+import sys
+import threading
+import time
+from collections import Counter
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+import metrics
+
+# Describe the transfer, not the content: replayed bodies are already decoded
+DROPPED_HEADERS = {"connection", "keep-alive", "transfer-encoding", "content-encoding", "content-length",
+                   "date", "set-cookie", "server"}
+STREAM_CHUNK = 64 * 1024
+
+_original_send = HTTPAdapter.send
+_active = None
+_active_lock = threading.Lock()
+
+
+def body_digest(body):
+    """Short digest of a request body; JSON bodies are compared by content, not key order"""
+    if body is None:
+        return None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode("utf-8")
+    except ValueError:
+        pass
+    return hashlib.sha1(body).hexdigest()[:16]
+
+
+def body_chunks(body, content_type):
+    """Split a body the way it would have arrived: per event for SSE, else in large slices"""
+    if not body:
+        return []
+    if "event-stream" in content_type:
+        events = body.split(b"\n\n")
+        chunks = [event + b"\n\n" for event in events[:-1]]
+        return chunks + ([events[-1]] if events[-1] else [])
+    return [body[i:i + STREAM_CHUNK] for i in range(0, len(body), STREAM_CHUNK)]
+
+
+class ReplayBody:
+    """Stands in for urllib3's response: yields recorded chunks, optionally paced
+
+    A truncated recording raises ChunkedEncodingError after its last chunk,
+    like the dropped connection it was recorded from.
+    """
+
+    def __init__(self, chunks, delay=0.0, truncated=False):
+        self.chunks = chunks
+        self.delay = delay
+        self.truncated = truncated
+
+    def stream(self, chunk_size=None, decode_content=True):
+        for chunk in self.chunks:
+            if self.delay:
+                time.sleep(self.delay)
+            yield chunk
+        if self.truncated:
+            raise requests.exceptions.ChunkedEncodingError("response ended before the body was complete")
+
+    def read(self, amt=None, decode_content=True):
+        return b"".join(self.stream())
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class Cassette:
+    """Records or replays every requests exchange made while it is active"""
+
+    def __init__(self, path, mode="replay", latency=0.0, recorded_latency=False, chunk_delay=0.0,
+                 error_rate=0.0, error="status", seed=0, aliases=None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be record or replay, not {mode!r}")
+        if error not in ("status", "connection"):
+            raise ValueError(f"error must be status or connection, not {error!r}")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.recorded_latency = recorded_latency
+        self.chunk_delay = chunk_delay
+        self.error_rate = error_rate
+        self.error = error
+        self.aliases = aliases or {}
+        self.interactions = []
+        self.counts = Counter()
+        self._random = random.Random(seed)
+        self._cursors = {}
+        self._lock = threading.Lock()
+        if mode == "replay":
+            self.load()
+
+    def load(self):
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            self.interactions = [json.loads(line) for line in f if line.strip()]
+        self._by_body, self._by_url = {}, {}
+        for i, interaction in enumerate(self.interactions):
+            url_key = (interaction['method'], interaction['url'])
+            self._by_body.setdefault(url_key + (interaction['body_digest'],), []).append(i)
+            self._by_url.setdefault(url_key, []).append(i)
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(self.path, "wt", encoding="utf-8") as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+
+    def __enter__(self):
+        global _active
+        with _active_lock:
+            if _active is not None:
+                raise RuntimeError("another cassette is already active")
+            _active = self
+            HTTPAdapter.send = _send
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        with _active_lock:
+            _active = None
+            HTTPAdapter.send = _original_send
+        if self.mode == "record":
+            self.save()
+
+    def canonical_url(self, url):
+        for prefix, canonical in self.aliases.items():
+            if url.startswith(prefix):
+                return canonical + url[len(prefix):]
+        return url
+
+    def stats(self):
+        return {'interactions': len(self.interactions), **self.counts}
+
+    def send(self, adapter, request, **kwargs):
+        if self.mode == "record":
+            return self._record(adapter, request, **kwargs)
+        return self._replay(adapter, request)
+
+    def _record(self, adapter, request, **kwargs):
+        interaction = {'method': request.method, 'url': self.canonical_url(request.url),
+                       'body_digest': body_digest(request.body)}
+        start = time.perf_counter()
+        try:
+            response = _original_send(adapter, request, **kwargs)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            interaction.update(elapsed=time.perf_counter() - start, error=type(e).__name__)
+            self._keep(interaction)
+            raise
+
+        chunks = []
+        try:
+            for chunk in response.iter_content(chunk_size=None):
+                chunks.append(chunk)
+        except requests.RequestException:
+            interaction['truncated'] = True
+        finally:
+            response.close()
+        body = b"".join(chunks)
+        interaction.update(
+            elapsed=time.perf_counter() - start,
+            status=response.status_code,
+            headers={k: v for k, v in response.headers.items() if k.lower() not in DROPPED_HEADERS},
+        )
+        try:
+            interaction['body'] = body.decode("utf-8")
+        except UnicodeDecodeError:
+            interaction['body_b64'] = base64.b64encode(body).decode("ascii")
+        self._keep(interaction)
+        return self._response(adapter, request, interaction, delay=0.0)
+
+    def _keep(self, interaction):
+        with self._lock:
+            self.interactions.append(interaction)
+            self.counts['recorded'] += 1
+
+    def _replay(self, adapter, request):
+        method, url = request.method, self.canonical_url(request.url)
+        with self._lock:
+            inject = self.error_rate and self._random.random() < self.error_rate
+            candidates = (self._by_body.get((method, url, body_digest(request.body)))
+                          or self._by_url.get((method, url)))
+            interaction = None
+            if candidates:
+                cursor = self._cursors.get(id(candidates), 0)
+                self._cursors[id(candidates)] = cursor + 1
+                interaction = self.interactions[candidates[cursor % len(candidates)]]
+            self.counts['injected' if inject else 'replayed' if interaction else 'misses'] += 1
+
+        delay = self.latency
+        if self.recorded_latency and interaction is not None:
+            delay = interaction.get('elapsed', 0.0)
+        if delay:
+            time.sleep(delay)
+
+        if inject:
+            if self.error == "connection":
+                raise requests.ConnectionError(f"injected connection error for {request.url}")
+            interaction = {'status': 503, 'headers': {'Retry-After': '0'}, 'body': "injected error"}
+        elif interaction is None:
+            interaction = {'status': 404, 'headers': {'X-Cassette-Miss': '1'}, 'body': f"no recording for {method} {url}"}
+        elif interaction.get('error'):
+            raise getattr(requests, interaction['error'], requests.ConnectionError)(
+                f"recorded {interaction['error']} for {request.url}")
+        return self._response(adapter, request, interaction, delay=self.chunk_delay)
+
+    def _response(self, adapter, request, interaction, delay):
+        if 'body_b64' in interaction:
+            body = base64.b64decode(interaction['body_b64'])
+        else:
+            body = interaction.get('body', '').encode("utf-8")
+        response = requests.Response()
+        response.status_code = interaction['status']
+        response.reason = http.client.responses.get(response.status_code, "")
+        response.headers = CaseInsensitiveDict(interaction.get('headers', {}))
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = ReplayBody(body_chunks(body, response.headers.get('Content-Type', '')), delay,
+                                  interaction.get('truncated', False))
+        response.url = request.url
+        response.request = request
+        response.connection = adapter
+        return response
+
+
+def _send(adapter, request, **kwargs):
+    cassette = _active
+    if cassette is None:
+        return _original_send(adapter, request, **kwargs)
+    return cassette.send(adapter, request, **kwargs)
+
+
+def show(path):
+    """Print a per-endpoint summary of a cassette"""
+    cassette = Cassette(path)
+    by_endpoint = {}
+    for interaction in cassette.interactions:
+        key = (interaction['method'], metrics.endpoint(interaction['url']))
+        entry = by_endpoint.setdefault(key, {'count': 0, 'bytes': 0, 'elapsed': 0.0, 'statuses': Counter()})
+        entry['count'] += 1
+        entry['bytes'] += len(interaction.get('body') or interaction.get('body_b64') or '')
+        entry['elapsed'] += interaction.get('elapsed', 0.0)
+        entry['statuses'][interaction.get('status') or interaction.get('error')] += 1
+    print(f"📼 {path}: {len(cassette.interactions)} interactions, {os.path.getsize(path) / 1024:.0f} KB on disk")
+    for (method, endpoint), entry in sorted(by_endpoint.items(), key=lambda item: -item[1]['count']):
+        statuses = ", ".join(f"{status}×{n}" for status, n in entry['statuses'].most_common())
+        print(f"   {entry['count']:>6}  {method:<5} {endpoint}  "
+              f"({entry['bytes'] / 1024:.0f} KB, avg {entry['elapsed'] / entry['count'] * 1000:.0f}ms; {statuses})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay HTTP traffic of a script")
+    parser.add_argument("mode", choices=["record", "replay", "show"])
+    parser.add_argument("cassette")
+    parser.add_argument("--latency", type=float, default=0.0, help="ms added to every replayed request")
+    parser.add_argument("--recorded-latency", action="store_true", help="replay with each request's recorded time")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="ms between chunks of a replayed body")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of replayed requests that fail")
+    parser.add_argument("--error", choices=["status", "connection"], default="status")
+    parser.add_argument("--seed", type=int, default=0)
+    argv = sys.argv[1:]
+    script_argv = argv[argv.index("--") + 1:] if "--" in argv else []
+    args = parser.parse_args(argv[:len(argv) - len(script_argv) - ("--" in argv)])
+
+    if args.mode == "show":
+        show(args.cassette)
+        return
+    if not script_argv:
+        parser.error("a script to run is required after --")
+
+    cassette = Cassette(args.cassette, mode=args.mode, latency=args.latency / 1000,
+                        recorded_latency=args.recorded_latency, chunk_delay=args.chunk_delay / 1000,
+                        error_rate=args.error_rate, error=args.error, seed=args.seed)
+    sys.argv = script_argv
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script_argv[0])))
+    try:
+        with cassette:
+            runpy.run_path(script_argv[0], run_name="__main__")
+    finally:
+        stats = cassette.stats()
+        print(f"\n📼 {args.mode}: " + ", ".join(f"{n} {name}" for name, n in stats.items()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
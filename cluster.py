@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Offline clustering of extracted pain points (no model call, no network)
+
+Each pain point becomes a sparse TF-IDF vector (sublinear tf,
+L2-normalised; terms in more than MAX_DF of documents are dropped) over
+lightly stemmed words. The pain_point summary carries the meaning: its
+words count fully, its bigrams BIGRAM_WEIGHT, and the supporting_quote's
+words only QUOTE_WEIGHT (quotes are long and mostly incidental words, and
+with equal weight they drowned two pain points about the same tool).
+Clustering is average linkage, with k coming from the data:
+- leader pass: points are visited highest composite_score first and join
+  the cluster they're most similar to on average if that is at least
+  LEADER_FACTOR x threshold, else start a new one; candidate clusters come
+  from an inverted index (term -> clusters), so a point is only compared
+  with clusters it shares a term with. This only folds near-duplicates
+  together, so large inputs don't reach the next step as singletons
+- merge: the two clusters with the highest average pairwise cosine are
+  joined, best first, until no pair reaches threshold
+- refinement: centroids are recomputed (truncated to their top terms) and
+  every point is reassigned to its nearest centroid, a few times
+
+DEFAULT_THRESHOLD is calibrated on the two bundled result sets
+(hn_extraction_results.json, reddit-signals-spike/extraction_results.json):
+their related pairs (the two Codex complaints, the two "which tool / where
+to invest" decisions, payment fees vs API pricing, support load vs
+burnout) sit at 0.10-0.12, unrelated pairs that share a word at 0.08 and
+below.
+
+Each cluster gets a theme label (top terms shared by its members; a
+singleton is labelled with its own pain point), a representative (highest
+composite_score) and a mention count. category_map() turns the
+clusters into the {theme: [post ids]} shape analysis.category_rollup()
+takes, replacing hand-written category dicts.
+
+Usage: python cluster.py hn_extraction_results.json [--threshold 0.09] [--json out.json]
+"""
+import argparse
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+
+import metrics
+from analysis import load_records, split_pain_points
+from records import ExtractionResult, dump
+
+DEFAULT_THRESHOLD = 0.09
+LEADER_FACTOR = 3
+MAX_DF = 0.5
+CENTROID_TERMS = 40
+REFINE_ITERATIONS = 3
+BIGRAM_WEIGHT = 0.25
+QUOTE_WEIGHT = 0.5
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being
+below between both but by can could did do does doing down during each even every few for from
+further get gets getting got had has have having he her here hers him his how i if in into is it
+its itself just like lot lots make makes many me more most much my no nor not now of off on once
+one only or other our out over own really same she should so some still such than that the their
+them then there these they this those through to too under until up us very was we were what when
+where which while who whom why will with without would you your yours
+""".split())
+
+_WORD = re.compile(r"[a-z0-9][a-z0-9+#'.-]*[a-z0-9+#]|[a-z]")
+# Longest first; a stem keeps at least MIN_STEM characters
+SUFFIXES = ("abilities", "ability", "ations", "ation", "ities", "ity", "ments", "ment", "ness",
+            "ing", "ers", "er", "ed", "ies", "es", "s")
+MIN_STEM = 4
+
+
+def stem(word):
+    """Strip one common suffix ("pricing" -> "pric", "profitability" -> "profit")"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return word[:-len(suffix)]
+    return word
+
+
+def tokenize(text, surface=None):
+    """Lowercase stemmed content words plus bigrams of adjacent content words
+
+    If a surface dict is passed, it counts the words seen for each stem
+    ({stem: Counter(word)}), so labels can show words instead of stems.
+    """
+    words = []
+    for word in _WORD.findall((text or "").lower()):
+        word = word.replace("'", "")
+        if word in STOPWORDS or len(word) < 2 or not any(char.isalpha() for char in word):
+            words.append(None)
+            continue
+        stemmed = stem(word)
+        if surface is not None:
+            surface.setdefault(stemmed, Counter())[word] += 1
+        words.append(stemmed)
+    terms = [w for w in words if w]
+    terms.extend(f"{a} {b}" for a, b in zip(words, words[1:]) if a and b)
+    return terms
+
+
+def pain_point_terms(result, surface=None):
+    """{term: weight} for a result; the pain point summary outweighs the raw quote"""
+    weights = Counter()
+    for term in tokenize(result.get('pain_point', ''), surface):
+        weights[term] += BIGRAM_WEIGHT if " " in term else 1.0
+    for term in tokenize(result.get('supporting_quote', ''), surface):
+        if " " not in term:
+            weights[term] += QUOTE_WEIGHT
+    return weights
+
+
+def vectorize(documents, max_df=MAX_DF):
+    """Sparse TF-IDF vectors ({term: weight}, unit length) for term lists or {term: weight} dicts
+
+    Weights are sublinear (1 + log tf) from 1 up and linear below it, so
+    a term seen only at QUOTE_WEIGHT counts for less than a pain point word.
+    """
+    counts = [terms if isinstance(terms, dict) else Counter(terms) for terms in documents]
+    df = Counter(term for count in counts for term in count)
+    n = len(documents)
+    limit = max(1, max_df * n) if n > 4 else n
+    idf = {term: math.log((1 + n) / (1 + d)) + 1 for term, d in df.items() if d <= limit}
+
+    vectors = []
+    for count in counts:
+        vector = {term: (1 + math.log(tf) if tf >= 1 else tf) * idf[term] for term, tf in count.items()
+                  if term in idf}
+        norm = math.sqrt(sum(w * w for w in vector.values()))
+        vectors.append({term: w / norm for term, w in vector.items()} if norm else {})
+    return vectors
+
+
+def _normalized_top(total, size=CENTROID_TERMS):
+    top = sorted(total.items(), key=lambda item: item[1], reverse=True)[:size]
+    norm = math.sqrt(sum(w * w for _, w in top))
+    return {term: w / norm for term, w in top} if norm else {}
+
+
+def _index(centroids):
+    postings = defaultdict(list)
+    for cluster, centroid in enumerate(centroids):
+        for term, weight in centroid.items():
+            postings[term].append((cluster, weight))
+    return postings
+
+
+def _nearest(vector, postings):
+    scores = defaultdict(float)
+    for term, weight in vector.items():
+        for cluster, centroid_weight in postings.get(term, ()):
+            scores[cluster] += weight * centroid_weight
+    if not scores:
+        return None, 0.0
+    return max(scores.items(), key=lambda item: item[1])
+
+
+def cluster_vectors(vectors, order=None, threshold=DEFAULT_THRESHOLD, iterations=REFINE_ITERATIONS):
+    """Assign each vector a cluster number; returns a list aligned with vectors"""
+    order = list(range(len(vectors))) if order is None else order
+    assignment = [None] * len(vectors)
+
+    # Leader pass: running (unnormalised) sums; sum . v / size is v's
+    # average cosine with the cluster's members
+    sums, sizes = [], []
+    postings = defaultdict(set)
+    for i in order:
+        vector = vectors[i]
+        scores = defaultdict(float)
+        for term, weight in vector.items():
+            for cluster in postings.get(term, ()):
+                scores[cluster] += weight * sums[cluster][term]
+        best, best_sim = None, 0.0
+        for cluster, dot in scores.items():
+            if dot / sizes[cluster] > best_sim:
+                best, best_sim = cluster, dot / sizes[cluster]
+        if best is None or best_sim < threshold * LEADER_FACTOR:
+            best = len(sums)
+            sums.append(defaultdict(float))
+            sizes.append(0)
+        sizes[best] += 1
+        for term, weight in vector.items():
+            sums[best][term] += weight
+            postings[term].add(best)
+        assignment[i] = best
+
+    # Merge: average linkage, best pair first. A pair's average pairwise
+    # cosine is sums[a] . sums[b] / (sizes[a] * sizes[b]); heap entries
+    # go stale when either side has merged since (versions)
+    parent = list(range(len(sums)))
+    versions = [0] * len(sums)
+    heap = []
+
+    def push_pairs(cluster, only_lower):
+        scores = defaultdict(float)
+        for term, weight in sums[cluster].items():
+            for other in postings[term]:
+                if other != cluster and (not only_lower or other < cluster):
+                    scores[other] += weight * sums[other][term]
+        for other, dot in scores.items():
+            similarity = dot / (sizes[cluster] * sizes[other])
+            if similarity >= threshold:
+                heapq.heappush(heap, (-similarity, cluster, other, versions[cluster], versions[other]))
+
+    for cluster in range(len(sums)):
+        push_pairs(cluster, only_lower=True)
+    while heap:
+        _, a, b, version_a, version_b = heapq.heappop(heap)
+        if parent[a] != a or parent[b] != b or versions[a] != version_a or versions[b] != version_b:
+            continue
+        parent[b] = a
+        versions[a] += 1
+        sizes[a] += sizes[b]
+        for term, weight in sums[b].items():
+            sums[a][term] += weight
+            postings[term].discard(b)
+            postings[term].add(a)
+        sums[b] = None
+        push_pairs(a, only_lower=False)
+
+    def root(cluster):
+        while parent[cluster] != cluster:
+            cluster = parent[cluster]
+        return cluster
+
+    assignment = [root(cluster) for cluster in assignment]
+
+    # Refinement: reassign to the nearest truncated centroid; a point that
+    # no longer shares a term with any centroid keeps its cluster
+    for _ in range(iterations):
+        totals = defaultdict(lambda: defaultdict(float))
+        for i, cluster in enumerate(assignment):
+            for term, weight in vectors[i].items():
+                totals[cluster][term] += weight
+        clusters = sorted(totals)
+        centroid_postings = _index([_normalized_top(totals[c]) for c in clusters])
+        changed = 0
+        for i, vector in enumerate(vectors):
+            nearest, _ = _nearest(vector, centroid_postings)
+            if nearest is not None and clusters[nearest] != assignment[i]:
+                assignment[i] = clusters[nearest]
+                changed += 1
+        if not changed:
+            break
+
+    # Renumber densely in first-seen order
+    renumber = {}
+    return [renumber.setdefault(cluster, len(renumber)) for cluster in assignment]
+
+
+def theme_label(members_vectors, size=3, surface=None):
+    """Top centroid terms, preferring terms several members share and
+    skipping words already covered by a chosen term
+
+    With tokenize()'s surface counts, each stem is shown as its most
+    common word.
+    """
+    total = defaultdict(float)
+    shared = Counter()
+    for vector in members_vectors:
+        for term, weight in vector.items():
+            total[term] += weight
+            shared[term] += 1
+    chosen = []
+    for term, _ in sorted(total.items(), key=lambda item: (-min(shared[item[0]], 2), -item[1], item[0])):
+        if any(term in other.split() or set(term.split()) <= set(other.split()) for other in chosen):
+            continue
+        chosen.append(term)
+        if len(chosen) == size:
+            break
+    if surface:
+        chosen = [" ".join(surface[word].most_common(1)[0][0] if word in surface else word
+                           for word in term.split()) for term in chosen]
+    return " / ".join(chosen)
+
+
+@metrics.timed("analysis_seconds", step="cluster")
+def cluster_pain_points(pain_points, threshold=DEFAULT_THRESHOLD, iterations=REFINE_ITERATIONS):
+    """Cluster pain point results, biggest cluster first
+
+    Returns [{'cluster_id', 'theme', 'representative', 'mention_count',
+    'avg_score', 'members'}]; members are sorted by composite_score.
+    """
+    if not pain_points:
+        return []
+    surface = {}
+    vectors = vectorize([pain_point_terms(p, surface) for p in pain_points])
+    order = sorted(range(len(pain_points)), key=lambda i: pain_points[i].get('composite_score', 0), reverse=True)
+    assignment = cluster_vectors(vectors, order=order, threshold=threshold, iterations=iterations)
+
+    grouped = defaultdict(list)
+    for i, cluster in enumerate(assignment):
+        grouped[cluster].append(i)
+
+    clusters = []
+    for indices in grouped.values():
+        members = sorted((pain_points[i] for i in indices), key=lambda p: p.get('composite_score', 0), reverse=True)
+        if len(members) > 1:
+            theme = theme_label([vectors[i] for i in indices], surface=surface)
+        else:
+            theme = members[0].get('pain_point', '')
+        clusters.append({
+            'theme': theme or members[0].get('pain_point', ''),
+            'representative': members[0],
+            'mention_count': len(members),
+            'avg_score': sum(p.get('composite_score', 0) for p in members) / len(members),
+            'members': members,
+        })
+    clusters.sort(key=lambda c: (-c['mention_count'], -c['representative'].get('composite_score', 0)))
+    for number, cluster in enumerate(clusters):
+        cluster['cluster_id'] = f"cluster_{number}"
+    return clusters
+
+
+def category_map(clusters, other="Other"):
+    """{theme: [post ids]} for analysis.category_rollup
+
+    Only clusters with more than one member become categories; the
+    singletons are pooled under other.
+    """
+    grouped = [cluster for cluster in clusters if cluster['mention_count'] > 1]
+    categories = {}
+    for cluster in grouped:
+        theme = cluster['theme']
+        if theme in categories:
+            theme = f"{theme} ({cluster['cluster_id']})"
+        categories[theme] = [p['post_id'] for p in cluster['members']]
+    singles = [p['post_id'] for cluster in clusters if cluster['mention_count'] <= 1 for p in cluster['members']]
+    if singles:
+        categories[other] = singles
+    return categories
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster extracted pain points offline")
+    parser.add_argument("results", help="extraction results (JSON file or columnar store)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="cosine similarity needed to join a cluster")
+    parser.add_argument("--json", help="write clusters to this file")
+    args = parser.parse_args()
+
+    pain_points, _ = split_pain_points(load_records(args.results, ExtractionResult))
+    clusters = cluster_pain_points(pain_points, threshold=args.threshold)
+
+    print(f"📊 {len(pain_points)} pain points -> {len(clusters)} clusters")
+    for cluster in clusters:
+        rep = cluster['representative']
+        print(f"\n{cluster['mention_count']:>4}x  {cluster['theme']}  (avg score {cluster['avg_score']:.1f})")
+        print(f"      ★ [{rep.get('composite_score', 0):.1f}] {rep.get('pain_point', '')[:80]}")
+
+    if args.json:
+        dump(clusters, args.json, indent=2)
+        print(f"\n💾 Saved to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Compact columnar storage for posts and extraction results
+
+A store is a directory with one file per column plus schema.json:
+- int / float / bool columns: raw little-endian arrays (int64, float64,
+  int8), read back through mmap + memoryview, so a column costs nothing
+  to open and only the pages you touch are loaded
+- "cat" string columns (author, source, ...): interned dictionary, values
+  stored as int32 codes into it
+- "str" columns (title, content, ...): one UTF-8 blob plus int64 offsets
+- "json" columns: the same blob layout, one JSON document per value
+- a .nulls byte array per column that ever held a missing value
+- an .ints byte array per float column that holds ints, so 1 reads
+  back as 1, not 1.0
+
+Column types are inferred from the values seen so far and only ever
+widen: int -> float when a float arrives (json instead if an int is too
+big for a float to hold exactly), anything mixed -> json. A column that
+has only held nulls stays untyped ("null", no files) until its first
+value. Widening rewrites the column under a new file stem (name~type)
+that schema.json switches to.
+
+Reads are column-selective (read only score + intensity without touching
+content). Appends write each column file then bump the row count in
+schema.json last, so a crashed append is simply ignored on the next read.
+
+Usage:
+    python columnar.py convert hn_extraction_results.json [out_dir]
+    python columnar.py info out_dir
+"""
+import json
+import mmap
+import os
+import sys
+from array import array
+
+SCHEMA_FILE = "schema.json"
+
+ARRAY_CODES = {"int": "q", "float": "d", "bool": "b"}
+NULL_DEFAULTS = {"int": 0, "float": float("nan"), "bool": 0}
+
+# Low-cardinality string fields worth interning regardless of sample size
+CATEGORICAL_FIELDS = {"author", "source", "by", "type", "feed"}
+
+
+# Suffixes of every file a column can own
+COLUMN_FILES = (".nulls", ".ints", ".bin", ".codes", ".dict", ".offsets", ".utf8")
+
+# Largest int a float64 holds exactly; bigger ones make a mixed column json
+MAX_EXACT_INT = 2 ** 53
+
+
+def infer_type(name, values):
+    """Pick a column type from the non-null values of a batch ("null" if none)"""
+    present = [v for v in values if v is not None]
+    if not present:
+        return "null"
+    if all(isinstance(v, bool) for v in present):
+        return "bool"
+    if all(isinstance(v, int) and not isinstance(v, bool) for v in present):
+        return "int" if all(-2 ** 63 <= v < 2 ** 63 for v in present) else "json"
+    if all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+        return "float" if exact_in_float(present) else "json"
+    if all(isinstance(v, str) for v in present):
+        if name in CATEGORICAL_FIELDS or (len(present) >= 20 and len(set(present)) <= len(present) // 4):
+            return "cat"
+        return "str"
+    return "json"
+
+
+def is_int(value):
+    """True for ints, not bools"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def exact_in_float(values):
+    """True if every int among values survives a float64 round trip"""
+    return all(abs(v) <= MAX_EXACT_INT for v in values if is_int(v))
+
+
+def widen(kind, other):
+    """Narrowest type that holds values of both kinds"""
+    if other in (kind, "null"):
+        return kind
+    if kind == "null":
+        return other
+    if {kind, other} == {"int", "float"}:
+        return "float"
+    if {kind, other} == {"cat", "str"}:
+        return kind
+    return "json"
+
+
+class Column:
+    """Read-only view of one column; indexable and iterable, None for nulls"""
+
+    def __init__(self, store, name, spec, rows):
+        self.name = name
+        self.type = spec["type"]
+        self.rows = rows
+        self._maps = []
+        stem = spec.get("file", name)
+        self.nulls = store._map_array(self, stem + ".nulls", "b", rows) if spec.get("nullable") else None
+        self.ints = store._map_array(self, stem + ".ints", "b", rows) if spec.get("ints") else None
+
+        if self.type == "null":
+            pass
+        elif self.type in ARRAY_CODES:
+            self.values = store._map_array(self, stem + ".bin", ARRAY_CODES[self.type], rows)
+        elif self.type == "cat":
+            self.codes = store._map_array(self, stem + ".codes", "i", rows)
+            with open(store._path(stem + ".dict"), "r") as f:
+                self.dictionary = [sys.intern(s) for s in json.load(f)]
+        else:
+            self.offsets = store._map_array(self, stem + ".offsets", "q", rows + 1)
+            self.blob = store._map_bytes(self, stem + ".utf8")
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError(index)
+        if self.type == "null" or self.nulls is not None and self.nulls[index]:
+            return None
+        if self.type == "bool":
+            return bool(self.values[index])
+        if self.ints is not None and self.ints[index]:
+            return int(self.values[index])
+        if self.type in ARRAY_CODES:
+            return self.values[index]
+        if self.type == "cat":
+            return self.dictionary[self.codes[index]]
+        text = bytes(self.blob[self.offsets[index]:self.offsets[index + 1]]).decode("utf-8")
+        return json.loads(text) if self.type == "json" else text
+
+    def __iter__(self):
+        for index in range(self.rows):
+            yield self[index]
+
+    def close(self):
+        # Views must be released (newest first) before their mmap can close
+        for handle in reversed(self._maps):
+            handle.release() if isinstance(handle, memoryview) else handle.close()
+        self._maps = []
+
+
+class ColumnStore:
+    """Directory of column files; see module docstring for the layout"""
+
+    def __init__(self, path):
+        self.path = path
+        self.schema = {"rows": 0, "columns": {}}
+        schema_path = self._path(SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path, "r") as f:
+                self.schema = json.load(f)
+
+    def _path(self, filename):
+        return os.path.join(self.path, filename)
+
+    def __len__(self):
+        return self.schema["rows"]
+
+    @property
+    def columns(self):
+        return list(self.schema["columns"])
+
+    # -- reading -------------------------------------------------------
+
+    def _map_bytes(self, column, filename):
+        path = self._path(filename)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return b""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        column._maps.extend((mapped, view))
+        return view
+
+    def _map_array(self, column, filename, code, count):
+        view = self._map_bytes(column, filename)
+        if not view:
+            return array(code)
+        itemsize = array(code).itemsize
+        # Rows past the committed count belong to an append that never finished
+        sliced = view[:count * itemsize]
+        cast = sliced.cast(code)
+        column._maps.extend((sliced, cast))
+        return cast
+
+    def column(self, name):
+        """Open one column (memory-mapped)"""
+        return Column(self, name, self.schema["columns"][name], self.schema["rows"])
+
+    def read(self, columns=None):
+        """Open the selected columns; returns {name: Column}"""
+        names = columns or self.columns
+        return {name: self.column(name) for name in names if name in self.schema["columns"]}
+
+    def rows(self, columns=None):
+        """Yield records as dicts; null values are left out, like missing JSON keys"""
+        opened = self.read(columns)
+        try:
+            for index in range(len(self)):
+                record = {}
+                for name, column in opened.items():
+                    value = column[index]
+                    if value is not None:
+                        record[name] = value
+                yield record
+        finally:
+            for column in opened.values():
+                column.close()
+
+    # -- writing -------------------------------------------------------
+
+    def append(self, records):
+        """Append a batch of dicts; new fields become new (back-filled) columns
+
+        A value that doesn't fit its column's type widens the column (see
+        widen()) and rewrites the rows already stored.
+        """
+        records = list(records)
+        if not records:
+            return
+        os.makedirs(self.path, exist_ok=True)
+
+        rows = self.schema["rows"]
+        columns = self.schema["columns"]
+        names = list(columns)
+        for record in records:
+            for name in record:
+                if name not in columns and name not in names:
+                    names.append(name)
+
+        replaced = []
+        for name in names:
+            values = [record.get(name) for record in records]
+            spec = columns.get(name)
+            kind = infer_type(name, values)
+            if spec is None or spec["type"] == "null" and kind != "null":
+                spec = columns[name] = {"type": kind}
+                if rows:
+                    self._write_values(name, spec, [None] * rows, 0)
+            else:
+                wider = widen(spec["type"], kind)
+                if wider == "float" and not exact_in_float(values):
+                    wider = "json"
+                if wider != spec["type"]:
+                    replaced.append(spec.get("file", name))
+                    spec = columns[name] = self._rewrite(name, spec, wider, rows)
+            self._write_values(name, spec, values, rows)
+
+        self.schema["rows"] = rows + len(records)
+        tmp_path = self._path(SCHEMA_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.schema, f, indent=2)
+        os.replace(tmp_path, self._path(SCHEMA_FILE))
+
+        # Only now that schema.json points at the widened files
+        for stem in replaced:
+            for suffix in COLUMN_FILES:
+                if os.path.exists(self._path(stem + suffix)):
+                    os.remove(self._path(stem + suffix))
+
+    def _rewrite(self, name, spec, kind, rows):
+        """Copy a column's committed rows into new files of a wider type; returns the new spec"""
+        column = Column(self, name, spec, rows)
+        try:
+            values = list(column)
+        finally:
+            column.close()
+        if kind == "float" and not exact_in_float(values):
+            kind = "json"
+        widened = {"type": kind, "file": f"{name}~{kind}"}
+        self._write_values(name, widened, values, 0)
+        return widened
+
+    def _truncate(self, filename, size):
+        """Drop bytes left behind by an append that crashed before committing"""
+        path = self._path(filename)
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            with open(path, "r+b") as f:
+                f.truncate(size)
+
+    def _write_values(self, name, spec, values, rows_before):
+        kind = spec["type"]
+        if kind == "null":
+            return
+        stem = spec.get("file", name)
+        has_nulls = any(v is None for v in values)
+
+        if has_nulls and not spec.get("nullable"):
+            spec["nullable"] = True
+            self._truncate(stem + ".nulls", 0)
+            with open(self._path(stem + ".nulls"), "ab") as f:
+                array("b", bytes(rows_before)).tofile(f)
+        if spec.get("nullable"):
+            self._truncate(stem + ".nulls", rows_before)
+            with open(self._path(stem + ".nulls"), "ab") as f:
+                array("b", [v is None for v in values]).tofile(f)
+
+        if kind == "float" and (spec.get("ints") or any(is_int(v) for v in values)):
+            if not spec.get("ints"):
+                spec["ints"] = True
+                self._truncate(stem + ".ints", 0)
+                with open(self._path(stem + ".ints"), "ab") as f:
+                    array("b", bytes(rows_before)).tofile(f)
+            self._truncate(stem + ".ints", rows_before)
+            with open(self._path(stem + ".ints"), "ab") as f:
+                array("b", [is_int(v) for v in values]).tofile(f)
+
+        if kind in ARRAY_CODES:
+            code = ARRAY_CODES[kind]
+            self._truncate(stem + ".bin", rows_before * array(code).itemsize)
+            default = NULL_DEFAULTS[kind]
+            try:
+                data = array(code, [default if v is None else v for v in values])
+            except (TypeError, OverflowError):
+                raise ValueError(f"column {name!r} is {kind}, got incompatible values")
+            with open(self._path(stem + ".bin"), "ab") as f:
+                data.tofile(f)
+
+        elif kind == "cat":
+            dict_path = self._path(stem + ".dict")
+            dictionary = []
+            if os.path.exists(dict_path):
+                with open(dict_path, "r") as f:
+                    dictionary = json.load(f)
+            code_of = {value: code for code, value in enumerate(dictionary)}
+            codes = array("i")
+            for value in values:
+                value = "" if value is None else str(value)
+                code = code_of.get(value)
+                if code is None:
+                    code = code_of[value] = len(dictionary)
+                    dictionary.append(value)
+                codes.append(code)
+            with open(dict_path + ".tmp", "w") as f:
+                json.dump(dictionary, f)
+            os.replace(dict_path + ".tmp", dict_path)
+            self._truncate(stem + ".codes", rows_before * codes.itemsize)
+            with open(self._path(stem + ".codes"), "ab") as f:
+                codes.tofile(f)
+
+        else:
+            offsets_path = self._path(stem + ".offsets")
+            end = 0
+            if rows_before:
+                with open(offsets_path, "rb") as f:
+                    f.seek(rows_before * 8)
+                    end = array("q", f.read(8))[0]
+            self._truncate(stem + ".offsets", (rows_before + 1) * 8 if rows_before else 0)
+            self._truncate(stem + ".utf8", end)
+
+            offsets = array("q", [] if rows_before else [0])
+            chunks = []
+            for value in values:
+                if value is not None:
+                    text = json.dumps(value) if kind == "json" else str(value)
+                    encoded = text.encode("utf-8")
+                    chunks.append(encoded)
+                    end += len(encoded)
+                offsets.append(end)
+            with open(self._path(stem + ".utf8"), "ab") as f:
+                f.write(b"".join(chunks))
+            with open(offsets_path, "ab") as f:
+                offsets.tofile(f)
+
+
+def convert(json_path, out_dir=None):
+    """Write a JSON array file (posts or results) as a columnar store"""
+    out_dir = out_dir or os.path.splitext(json_path)[0] + ".columnar"
+    with open(json_path, "r") as f:
+        records = json.load(f)
+    store = ColumnStore(out_dir)
+    if len(store):
+        raise ValueError(f"{out_dir} already holds {len(store)} rows")
+    store.append(records)
+    return store
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ("convert", "info"):
+        print(__doc__)
+        sys.exit(1)
+
+    if sys.argv[1] == "convert":
+        store = convert(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        print(f"✅ Wrote {len(store)} rows to {store.path}")
+    else:
+        store = ColumnStore(sys.argv[2])
+
+    print(f"📊 {len(store)} rows")
+    for name, spec in store.schema["columns"].items():
+        print(f"   {name:<20} {spec['type']}{' (nullable)' if spec.get('nullable') else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+Exceptions shared across the fetchers, the extraction engine and the work queue
+
+JobError is a handler's per-job failure result. It lives here, not in
+workqueue.py, so the low-level fetchers (hn_fetch, rss_fetch) can report
+a failed job without depending on the queue; workqueue re-exports it.
+
+Usage: from errors import JobError; return [JobError(f"item {item_id} not fetched")]
+"""
+
+
+class JobError(Exception):
+    """A handler's result for a job that failed (retried, then dead-lettered)"""
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Content-hash keyed cache of extraction results
+
+A post that comes back with the same title and content, extracted with the
+same prompt and model, gets the same answer, so we don't pay for it again.
+Keys are sha256(normalized title + content, prompt version, model); values
+are ExtractionResult-shaped dicts (post_id is re-stamped on every hit,
+since the same text can show up under a new id).
+
+Entries are evicted by age (max_age) and, past max_entries, least recently
+used first. Hits and misses are counted for reporting.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from records import ExtractionResult
+
+DEFAULT_CACHE_PATH = "extraction_cache.sqlite3"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+"""
+
+
+def normalize_text(text):
+    """Case- and whitespace-insensitive form of post text"""
+    return " ".join((text or "").split()).lower()
+
+
+def content_key(post, prompt_version, model):
+    """Cache key for a post under a given prompt version and model"""
+    text = normalize_text(post.get('title', '')) + "\n" + normalize_text(post.get('content', ''))
+    return hashlib.sha256(f"{prompt_version}\n{model}\n{text}".encode("utf-8")).hexdigest()
+
+
+class ExtractionCache:
+    """SQLite-backed result cache with age/size eviction and hit/miss counters"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=100000, max_age=30 * 24 * 60 * 60):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, posts, prompt_version, model, now=None):
+        """Split posts into (cached results keyed by post id, posts to extract)"""
+        now = now or time.time()
+        keys = {post['id']: content_key(post, prompt_version, model) for post in posts}
+        found = {}
+        with self._lock, self._conn:
+            unique_keys = list(set(keys.values()))
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, result FROM results WHERE key IN ({marks}) AND created_at > ?",
+                    (*chunk, now - self.max_age),
+                )
+                found.update((key, json.loads(result)) for key, result in rows)
+            self._conn.executemany("UPDATE results SET last_used = ? WHERE key = ?",
+                                   [(now, key) for key in found])
+
+        cached, missing = {}, []
+        for post in posts:
+            result = found.get(keys[post['id']])
+            if result is None:
+                missing.append(post)
+            else:
+                cached[post['id']] = ExtractionResult.from_dict(dict(result, post_id=post['id']))
+        self.hits += len(cached)
+        self.misses += len(missing)
+        return cached, missing
+
+    def put_many(self, pairs, prompt_version, model, now=None):
+        """Store (post, result) pairs, then evict expired / excess entries"""
+        now = now or time.time()
+        rows = []
+        for post, result in pairs:
+            stored = {k: v for k, v in result.items() if k != 'post_id'}
+            rows.append((content_key(post, prompt_version, model), json.dumps(stored), now, now))
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO results (key, result, created_at, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict(now)
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM results WHERE created_at <= ?", (now - self.max_age,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self),
+        }
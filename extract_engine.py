@@ -0,0 +1,505 @@
+#!/usr/bin/env python3
+"""
+Batched, concurrent pain point extraction over the Messages API
+
+Instead of one huge prompt with every post (which truncates at max_tokens
+and loses the whole batch on any failure), posts are:
+- split into chunks under an input token budget
+- sent concurrently, capped by max_workers and a requests-per-minute limit
+  (a ratelimit.py bucket, shared with other processes once
+  ratelimit.shared() is open; 429s pause it for all of them)
+- retried with backoff on 429 / 5xx / connection errors (Retry-After honoured)
+- checkpointed per chunk to a JSONL file, so a rerun only sends the chunks
+  that didn't finish
+- streamed (SSE): the response text is fed to an incremental JSON array
+  parser as it arrives, so each per-post result is available (on_result)
+  as soon as its object closes, a malformed element is reported on its
+  own instead of failing the chunk, and a cut-off stream keeps the
+  results that completed
+Per-chunk results are merged back into one list keyed by post_id.
+enqueue() / handle_chunks() run the same chunks through a workqueue.py
+queue instead, so extraction can be spread over worker processes. With an
+ExtractionCache, posts whose text was already extracted under the same
+prompt and model are answered locally before any prompt is built. Prompts
+come from a prompt_builder.PromptBuilder: posts compacted and trimmed to
+a per-post token budget, in a stable order.
+
+Each API attempt is timed (extract_call_seconds), token usage reported by
+the API is counted per model (extract_tokens_total), and extract() counts
+results by where they came from (extract_results_total); see metrics.py.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import requests
+
+import metrics
+import ratelimit
+from errors import JobError
+from hn_fetch import make_session
+from json_stream import JSONArrayParser, parse_array
+from prompt_builder import PromptBuilder
+from ratelimit import RateLimiter, host_of
+from records import ExtractionResult, Post, dumps, loads
+
+CALL_SECONDS = metrics.histogram("extract_call_seconds", "Messages API call time by mode and status")
+FIRST_RESULT_SECONDS = metrics.histogram("extract_first_result_seconds", "Streamed call time until the first parsed result")
+TOKENS = metrics.counter("extract_tokens_total", "Tokens reported by the API (usage) by model and kind")
+RESULTS = metrics.counter("extract_results_total", "Extraction results by source; failed counts posts without one")
+PROMPT_TOKENS = metrics.counter("extract_prompt_tokens_total", "Estimated prompt tokens sent, and saved by compaction")
+
+MESSAGES_URL = "https://api.anthropic.com/v1/messages"
+ANTHROPIC_VERSION = "2023-06-01"
+DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504, 529}
+
+# Fixed instructions first and the posts last, so every prompt shares a
+# cacheable prefix; posts are rendered by prompt_builder
+PROMPT_TEMPLATE = """You are analyzing Reddit posts from r/Entrepreneur to extract actionable pain points that indie hackers could build products around.
+
+For each post below, identify:
+1. Is there a genuine pain point or problem being expressed? (not just a meme, joke, or off-topic discussion)
+2. If yes, extract the specific pain point
+3. Score the pain point on three dimensions (0-100):
+   - **Intensity**: How frustrated/desperate does the person sound? (0=mild annoyance, 100=extreme frustration)
+   - **Specificity**: How actionable is the problem? (0=vague complaint, 100=specific workflow pain)
+   - **Frequency**: Based on language, does this seem like a recurring problem? (0=one-time issue, 100=ongoing struggle)
+
+Return your analysis as a JSON array. For each post, either:
+- If NO actionable pain point: {{"post_id": N, "has_pain_point": false, "reason": "brief reason"}}
+- If YES pain point found: {{
+    "post_id": N,
+    "has_pain_point": true,
+    "pain_point": "concise description of the problem",
+    "intensity": 0-100,
+    "specificity": 0-100,
+    "frequency": 0-100,
+    "composite_score": (intensity + specificity + frequency) / 3,
+    "supporting_quote": "direct quote from post showing the pain"
+  }}
+
+Only extract REAL pain points. Be strict. Reject:
+- Memes, jokes, sarcasm
+- Success stories without a problem
+- General discussions without a specific complaint
+- Self-promotional posts
+- Off-topic content
+
+Return ONLY valid JSON, no other text. Long posts are shortened; " … " marks where text was cut.
+
+POSTS TO ANALYZE:
+{posts}"""
+
+
+class ExtractionError(Exception):
+    """A chunk could not be extracted after all retries"""
+
+
+def chunk_key(prompt, model):
+    """Checkpoint key: identical prompt + model means identical work"""
+    return hashlib.sha1(f"{model}\n{prompt}".encode("utf-8")).hexdigest()
+
+
+def as_result(value):
+    """ExtractionResult for a parsed object; any other JSON value is passed through as is"""
+    return ExtractionResult.from_dict(value) if isinstance(value, dict) else value
+
+
+def parse_results(text):
+    """Parse the JSON array of per-post results in a complete model response
+
+    Returns (results, malformed elements, whether the array was closed).
+    """
+    values, malformed, closed = parse_array(text)
+    if not values and not malformed and not closed:
+        raise ValueError("No JSON array found in response")
+    return [as_result(value) for value in values], malformed, closed
+
+
+def iter_sse_events(chunks):
+    """Yield (event, data) pairs from server-sent event stream chunks (bytes)"""
+    pending = b""
+    event, data = None, []
+    for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            line = line.rstrip(b"\r").decode("utf-8")
+            if not line:
+                if data:
+                    yield event or "message", "\n".join(data)
+                event, data = None, []
+            elif line.startswith(":"):
+                continue
+            else:
+                field, _, value = line.partition(":")
+                value = value[1:] if value.startswith(" ") else value
+                if field == "event":
+                    event = value
+                elif field == "data":
+                    data.append(value)
+
+
+def iter_text_deltas(events, state):
+    """Yield the text pieces of a Messages stream; records stop_reason and usage in state
+
+    Raises ExtractionError on an error event.
+    """
+    for event, data in events:
+        if event == "content_block_delta":
+            delta = json.loads(data).get("delta", {})
+            if delta.get("type") == "text_delta":
+                yield delta["text"]
+        elif event == "message_start":
+            usage = json.loads(data).get("message", {}).get("usage", {})
+            state["input_tokens"] = usage.get("input_tokens", 0)
+        elif event == "message_delta":
+            payload = json.loads(data)
+            state["stop_reason"] = payload.get("delta", {}).get("stop_reason")
+            state["output_tokens"] = payload.get("usage", {}).get("output_tokens", 0)
+        elif event == "message_stop":
+            state["complete"] = True
+            return
+        elif event == "error":
+            error = json.loads(data).get("error", {})
+            raise ExtractionError(f"stream error: {error.get('type')} {error.get('message', '')}".strip())
+
+
+class Checkpoint:
+    """Append-only JSONL of finished chunks: {"key": ..., "results": [...]}"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self.done[record['key']] = [as_result(result) for result in record['results']]
+
+    def get(self, key):
+        return self.done.get(key)
+
+    def add(self, key, results):
+        with self._lock:
+            self.done[key] = results
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(dumps({'key': key, 'results': results}) + "\n")
+
+
+class ExtractionEngine:
+    """Chunked, concurrent, checkpointed extraction
+
+    engine = ExtractionEngine(api_key=os.environ['ANTHROPIC_API_KEY'])
+    results, report = engine.extract(posts)
+    """
+
+    def __init__(self, api_key=None, model=DEFAULT_MODEL, url=MESSAGES_URL, max_workers=4,
+                 requests_per_minute=50, max_input_tokens=6000, max_posts_per_chunk=10,
+                 max_tokens=4000, timeout=120, retries=4, backoff=1.0,
+                 checkpoint_path=None, session=None, cache=None, stream=True, prompt_builder=None, limiter=None):
+        self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY", "")
+        self.model = model
+        self.url = url
+        self.max_workers = max_workers
+        # The process-wide shared limiter when one is open (ratelimit.shared()), else a private one
+        self.limiter = limiter or ratelimit.current() or RateLimiter(None, limits={})
+        self.bucket = host_of(url)
+        self.limiter.configure(self.bucket, requests_per_minute / 60.0, burst=min(requests_per_minute, 10))
+        self.max_input_tokens = max_input_tokens
+        self.max_posts_per_chunk = max_posts_per_chunk
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.checkpoint = Checkpoint(checkpoint_path)
+        self.session = session or make_session(max_workers)
+        self.cache = cache
+        self.stream = stream
+        self.prompt_builder = prompt_builder or PromptBuilder(PROMPT_TEMPLATE)
+        # Changes whenever the prompt does, so cached results from an older prompt aren't reused
+        self.prompt_version = self.prompt_builder.version
+
+    def _post(self, prompt, stream):
+        return self.session.post(
+            self.url,
+            headers={
+                "content-type": "application/json",
+                "x-api-key": self.api_key,
+                "anthropic-version": ANTHROPIC_VERSION,
+            },
+            json={
+                "model": self.model,
+                "max_tokens": self.max_tokens,
+                "messages": [{"role": "user", "content": prompt}],
+                **({"stream": True} if stream else {}),
+            },
+            timeout=self.timeout,
+            stream=stream,
+        )
+
+    def _retry_delay(self, attempt, retry_after):
+        delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        return delay
+
+    def call(self, prompt):
+        """POST one prompt, retrying transient failures; returns the response text"""
+        last_error = None
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(self.bucket)
+            retry_after = None
+            start, status = time.perf_counter(), "error"
+            try:
+                response = self._post(prompt, stream=False)
+                status = response.status_code
+                if response.status_code == 200:
+                    body = response.json()
+                    self._count_tokens(body.get('usage', {}))
+                    return body['content'][0]['text']
+                last_error = f"API Error: {response.status_code} {response.text[:200]}"
+                if response.status_code not in RETRY_STATUSES:
+                    break
+                retry_after = response.headers.get("retry-after")
+                self.limiter.backoff(self.bucket, response.status_code, retry_after)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = f"request failed: {e}"
+            finally:
+                CALL_SECONDS.observe(time.perf_counter() - start, mode="buffered", status=status)
+
+            if attempt < self.retries:
+                time.sleep(self._retry_delay(attempt, retry_after))
+
+        raise ExtractionError(last_error)
+
+    def call_stream(self, prompt, on_result=None):
+        """POST one prompt as an SSE stream, parsing results as they arrive
+
+        on_result(result) is called for each per-post object as soon as it
+        is complete. Failures before any result arrives are retried like
+        call(); after that the stream is not restarted, and whatever
+        completed is returned. Returns {'results', 'malformed', 'complete',
+        'stop_reason', 'error'}.
+        """
+        last_error = None
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire(self.bucket)
+            retry_after = None
+            parser = JSONArrayParser()
+            state = {"complete": False, "stop_reason": None}
+            results = []
+            start, status = time.perf_counter(), "error"
+            try:
+                with self._post(prompt, stream=True) as response:
+                    status = response.status_code
+                    if response.status_code == 200:
+                        events = iter_sse_events(response.iter_content(chunk_size=None))
+                        for text in iter_text_deltas(events, state):
+                            for result in map(as_result, parser.feed(text)):
+                                if not results:
+                                    FIRST_RESULT_SECONDS.observe(time.perf_counter() - start)
+                                results.append(result)
+                                if on_result is not None:
+                                    on_result(result)
+                    else:
+                        last_error = f"API Error: {response.status_code} {response.text[:200]}"
+                        if response.status_code not in RETRY_STATUSES:
+                            break
+                        retry_after = response.headers.get("retry-after")
+                        self.limiter.backoff(self.bucket, response.status_code, retry_after)
+            except (requests.RequestException, ExtractionError) as e:
+                last_error = str(e) if isinstance(e, ExtractionError) else f"stream failed: {e}"
+            finally:
+                CALL_SECONDS.observe(time.perf_counter() - start, mode="stream", status=status)
+                self._count_tokens(state)
+
+            if state["complete"] or results or parser.errors:
+                parser.close()
+                error = None
+                if not state["complete"]:
+                    error = last_error or "stream ended before message_stop"
+                elif state["stop_reason"] == "max_tokens":
+                    error = "response hit max_tokens"
+                elif not parser.done:
+                    error = "No complete JSON array found in response"
+                return {'results': results, 'malformed': parser.errors, 'complete': state["complete"],
+                        'stop_reason': state["stop_reason"], 'error': error}
+
+            if attempt < self.retries:
+                time.sleep(self._retry_delay(attempt, retry_after))
+
+        raise ExtractionError(last_error)
+
+    def _count_tokens(self, usage):
+        for kind in ("input_tokens", "output_tokens"):
+            if usage.get(kind):
+                TOKENS.inc(usage[kind], model=self.model, kind=kind[:-len("_tokens")])
+
+    def extract_chunk(self, chunk, on_result=None):
+        """Extract one chunk, using the checkpoint if it already finished
+
+        Returns (results, from_checkpoint, problems) where problems has
+        'malformed' elements and the 'error' that cut the response short
+        (None if it completed). Only fully answered chunks are checkpointed.
+        """
+        built = self.prompt_builder.build(chunk)
+        prompt = built.text
+        key = chunk_key(prompt, self.model)
+        cached = self.checkpoint.get(key)
+        if cached is not None:
+            if on_result is not None:
+                for result in cached:
+                    on_result(result)
+            return cached, True, {'malformed': [], 'error': None}
+
+        PROMPT_TOKENS.inc(built.tokens, model=self.model, kind="sent")
+        PROMPT_TOKENS.inc(built.saved_tokens, model=self.model, kind="saved")
+        if self.stream:
+            outcome = self.call_stream(prompt, on_result)
+            results, malformed, error = outcome['results'], outcome['malformed'], outcome['error']
+        else:
+            results, malformed, closed = parse_results(self.call(prompt))
+            error = None if closed else "response ended inside the JSON array"
+            if on_result is not None:
+                for result in results:
+                    on_result(result)
+
+        answered = {r.get('post_id') for r in results if isinstance(r, ExtractionResult)}
+        if error is None and not malformed and all(post['id'] in answered for post in chunk):
+            self.checkpoint.add(key, results)
+        return results, False, {'malformed': malformed, 'error': error}
+
+    def extract(self, posts, on_result=None):
+        """Extract pain points from posts
+
+        Returns (results ordered like posts, report dict). Posts without a
+        result (failed chunk, malformed element, cut-off response) are
+        listed in report['failed_posts']; malformed elements are in
+        report['malformed']. on_result(result) is called, from worker
+        threads, for each result as soon as it is parsed.
+        """
+        by_post_id = {}
+        pending = posts
+        if self.cache is not None:
+            by_post_id, pending = self.cache.get_many(posts, self.prompt_version, self.model)
+            if on_result is not None:
+                for result in by_post_id.values():
+                    on_result(result)
+
+        chunks = self.prompt_builder.chunk(pending, self.max_input_tokens, self.max_posts_per_chunk)
+        report = {'chunks': len(chunks), 'from_cache': len(by_post_id), 'from_checkpoint': 0, 'sent': 0,
+                  'failed_chunks': 0, 'partial_chunks': 0, 'failed_posts': [], 'malformed': [], 'errors': []}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.extract_chunk, chunk, on_result): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                chunk = futures[future]
+                try:
+                    results, from_checkpoint, problems = future.result()
+                except (ExtractionError, ValueError) as e:
+                    report['failed_chunks'] += 1
+                    report['failed_posts'].extend(post['id'] for post in chunk)
+                    report['errors'].append(str(e))
+                    continue
+
+                report['from_checkpoint' if from_checkpoint else 'sent'] += 1
+                chunk_by_id = {post['id']: post for post in chunk}
+                fresh = []
+                for result in results:
+                    if isinstance(result, ExtractionResult) and result.get('post_id') in chunk_by_id:
+                        by_post_id[result['post_id']] = result
+                        fresh.append((chunk_by_id[result['post_id']], result))
+                RESULTS.inc(len(fresh), source="checkpoint" if from_checkpoint else "model")
+                report['malformed'].extend(problems['malformed'])
+                if problems['error']:
+                    report['partial_chunks'] += 1
+                    report['errors'].append(problems['error'])
+                report['failed_posts'].extend(post['id'] for post in chunk if post['id'] not in by_post_id)
+                if self.cache is not None:
+                    self.cache.put_many(fresh, self.prompt_version, self.model)
+
+        RESULTS.inc(report['from_cache'], source="cache")
+        RESULTS.inc(len(report['malformed']), source="malformed")
+        RESULTS.inc(len(report['failed_posts']), source="failed")
+        ordered = [by_post_id[post['id']] for post in posts if post['id'] in by_post_id]
+        return ordered, report
+
+    def enqueue(self, queue, posts):
+        """Queue posts as "extract_chunk" jobs on a workqueue.py queue instead of extracting here
+
+        Posts the cache already answers aren't queued. Jobs are keyed like
+        checkpoint entries (prompt + model), so queueing the same posts
+        again adds nothing. Returns (cached results, job keys); the rest
+        arrive as queue.results("extract_chunk", keys) once workers
+        running handle_chunks have finished them.
+        """
+        cached, pending = {}, posts
+        if self.cache is not None:
+            cached, pending = self.cache.get_many(posts, self.prompt_version, self.model)
+        chunks = self.prompt_builder.chunk(pending, self.max_input_tokens, self.max_posts_per_chunk)
+        keys = [chunk_key(self.prompt_builder.build(chunk).text, self.model) for chunk in chunks]
+        queue.enqueue("extract_chunk", [{'posts': chunk} for chunk in chunks], keys=keys)
+        RESULTS.inc(len(cached), source="cache")
+        return list(cached.values()), keys
+
+    def handle_chunks(self, payloads):
+        """Work-queue handler for "extract_chunk" jobs ({"posts": [...]})
+
+        Each attempt first answers what it can from the cache and runs
+        extract_chunk (on max_workers threads) only for the posts still
+        missing, so a retried chunk doesn't pay again for posts an earlier
+        attempt already answered. A chunk with every post answered
+        completes with its results; a failed, cut-off or malformed one
+        becomes a JobError and the queue retries it, with whatever did
+        come back cached first.
+        """
+        chunks = [[Post.from_dict(post) for post in payload['posts']] for payload in payloads]
+        answered = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = []
+            for chunk in chunks:
+                cached, pending = {}, chunk
+                if self.cache is not None:
+                    cached, pending = self.cache.get_many(chunk, self.prompt_version, self.model)
+                    RESULTS.inc(len(cached), source="cache")
+                answered.append(cached)
+                futures.append(pool.submit(self.extract_chunk, pending) if pending else None)
+        outcomes = []
+        for chunk, by_post_id, future in zip(chunks, answered, futures):
+            if future is not None:
+                try:
+                    results, from_checkpoint, problems = future.result()
+                except (ExtractionError, ValueError) as e:
+                    outcomes.append(JobError(str(e)))
+                    continue
+                chunk_by_id = {post['id']: post for post in chunk}
+                fresh = [(chunk_by_id[result['post_id']], result) for result in results
+                         if isinstance(result, ExtractionResult) and result.get('post_id') in chunk_by_id]
+                RESULTS.inc(len(fresh), source="checkpoint" if from_checkpoint else "model")
+                if self.cache is not None:
+                    self.cache.put_many(fresh, self.prompt_version, self.model)
+                by_post_id.update((result['post_id'], result) for _, result in fresh)
+                if problems['error'] or problems['malformed']:
+                    outcomes.append(JobError(problems['error'] or f"{len(problems['malformed'])} malformed results"))
+                    continue
+            missing = sum(1 for post in chunk if post['id'] not in by_post_id)
+            if missing:
+                outcomes.append(JobError(f"{missing} posts without a result"))
+            else:
+                outcomes.append([by_post_id[post['id']] for post in chunk])
+        return outcomes
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Persistent HackerNews item cache for incremental polling
+
+Items are stored in SQLite keyed by HN id. Each item gets a TTL scaled by
+its age: fresh stories still collect votes and comments so they expire
+quickly, week-old stories barely change so they're kept for a day.
+
+On each poll we also read /v0/updates.json (recently changed items) to
+invalidate cached copies early, and /v0/maxitem.json as a high-water mark
+so we know which ids are brand new since the last run.
+"""
+import json
+import sqlite3
+import threading
+import time
+
+import requests
+
+from hn_fetch import HN_API, ITEMS, get_json, iter_items
+
+DEFAULT_CACHE_PATH = "hn_cache.sqlite3"
+
+# (max item age in seconds, ttl in seconds), checked in order
+AGE_TTLS = [
+    (60 * 60, 60),                # < 1 hour old: 1 minute
+    (24 * 60 * 60, 5 * 60),       # < 1 day old: 5 minutes
+    (7 * 24 * 60 * 60, 60 * 60),  # < 1 week old: 1 hour
+]
+OLD_ITEM_TTL = 24 * 60 * 60
+ID_LIST_TTL = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    item_time INTEGER,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def ttl_for(item, now=None):
+    """How long a cached copy of item stays fresh, based on its age"""
+    now = now or time.time()
+    item_time = (item or {}).get('time')
+    if not item_time:
+        return AGE_TTLS[0][1]
+    age = now - item_time
+    for max_age, ttl in AGE_TTLS:
+        if age < max_age:
+            return ttl
+    return OLD_ITEM_TTL
+
+
+class ItemCache:
+    """SQLite-backed HN item cache plus small key/value metadata"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get_many(self, ids, now=None):
+        """Return (fresh, stale_ids): cached items still within TTL, and ids to refetch"""
+        now = now or time.time()
+        fresh = {}
+        with self._lock:
+            for chunk_start in range(0, len(ids), 500):
+                chunk = ids[chunk_start:chunk_start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT id, body FROM items WHERE id IN ({marks}) AND expires_at > ?",
+                    (*chunk, now),
+                )
+                for item_id, body in rows:
+                    fresh[item_id] = json.loads(body)
+        stale = [item_id for item_id in ids if item_id not in fresh]
+        return fresh, stale
+
+    def put_many(self, items, now=None):
+        """Store (id, item) pairs; failed fetches (None) are skipped"""
+        now = now or time.time()
+        rows = [
+            (item_id, item.get('time'), now, now + ttl_for(item, now), json.dumps(item))
+            for item_id, item in items
+            if item
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO items (id, item_time, fetched_at, expires_at, body) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def invalidate(self, ids):
+        """Force ids to be refetched on the next poll"""
+        if not ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE items SET expires_at = 0 WHERE id = ?",
+                                   [(item_id,) for item_id in ids])
+
+    def get_meta(self, key, max_age=None, now=None):
+        """Read a JSON metadata value, or None if missing or older than max_age"""
+        now = now or time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, updated_at FROM meta WHERE key = ?",
+                                     (key,)).fetchone()
+        if not row or (max_age is not None and now - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def set_meta(self, key, value, now=None):
+        now = now or time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value, updated_at) VALUES (?, ?, ?)",
+                               (key, json.dumps(value), now))
+
+
+def cached_story_ids(cache, kind="askstories", session=None, base_url=HN_API, ttl=ID_LIST_TTL):
+    """Fetch an id list, reusing the cached copy if it's younger than ttl
+
+    A failed fetch isn't cached: the last good copy (however old) is
+    returned instead, or [] if there is none.
+    """
+    key = f"ids:{kind}"
+    ids = cache.get_meta(key, max_age=ttl)
+    if ids is None:
+        ids = get_json(session or requests, f"{base_url}/{kind}.json")
+        if not isinstance(ids, list):
+            return cache.get_meta(key) or []
+        cache.set_meta(key, ids)
+    return ids
+
+
+def sync_updates(cache, session=None, base_url=HN_API):
+    """Invalidate items HN reports as changed and advance the maxitem high-water mark
+
+    Returns (previous_maxitem, current_maxitem).
+    """
+    session = session or requests
+    updates = get_json(session, f"{base_url}/updates.json") or {}
+    cache.invalidate(updates.get('items', []))
+
+    previous = cache.get_meta("maxitem")
+    current = get_json(session, f"{base_url}/maxitem.json")
+    if current is not None:
+        cache.set_meta("maxitem", current)
+    return previous, current
+
+
+def iter_items_incremental(item_ids, cache, session=None, base_url=HN_API, stats=None,
+                           batch_size=50, **fetch_kwargs):
+    """Yield (id, item) for item_ids: cached hits first, then network fetches as they complete
+
+    Fetched items are written back to the cache in batches. If a stats dict
+    is passed, its 'fetched' and 'cached' counters are filled in.
+    """
+    item_ids = list(item_ids)
+    fresh, stale = cache.get_many(item_ids)
+    ITEMS.inc(len(item_ids) - len(stale), outcome="cached")
+    if stats is not None:
+        stats['fetched'] = len(stale)
+        stats['cached'] = len(item_ids) - len(stale)
+
+    for item_id in item_ids:
+        if item_id in fresh:
+            yield item_id, fresh[item_id]
+
+    pending = []
+    try:
+        for item_id, item in iter_items(stale, session=session, base_url=base_url, **fetch_kwargs):
+            pending.append((item_id, item))
+            if len(pending) >= batch_size:
+                cache.put_many(pending)
+                pending = []
+            yield item_id, item
+    finally:
+        cache.put_many(pending)
+
+
+def fetch_items_incremental(item_ids, cache, session=None, base_url=HN_API, on_progress=None, **fetch_kwargs):
+    """Like fetch_items, but only hits the network for missing or expired items
+
+    Returns (items aligned with item_ids, number of items fetched over HTTP).
+    """
+    item_ids = list(item_ids)
+    stats = {}
+    by_id = {}
+    for done, (item_id, item) in enumerate(
+            iter_items_incremental(item_ids, cache, session=session, base_url=base_url,
+                                   stats=stats, **fetch_kwargs), 1):
+        by_id[item_id] = item
+        if on_progress:
+            on_progress(done, len(item_ids))
+    return [by_id.get(item_id) for item_id in item_ids], stats.get('fetched', 0)
+
+
+def poll_story_ids(cache, kind="askstories", limit=None, session=None, base_url=HN_API):
+    """Resolve the current id list for kind, syncing updates and the maxitem mark first
+
+    The id list keeps its ID_LIST_TTL even when maxitem hasn't moved:
+    rankings (topstories, askstories) reorder without any new item.
+
+    Returns (ids, stats dict).
+    """
+    previous, current = sync_updates(cache, session=session, base_url=base_url)
+    ids = cached_story_ids(cache, kind, session=session, base_url=base_url, ttl=ID_LIST_TTL)
+    if limit is not None:
+        ids = ids[:limit]
+    stats = {
+        'ids': len(ids),
+        'maxitem': current,
+        'new_since_last_poll': (current - previous) if previous is not None and current is not None else None,
+    }
+    return ids, stats
+
+
+def poll_stories(cache, kind="askstories", limit=None, session=None, base_url=HN_API, **fetch_kwargs):
+    """One incremental poll of an HN story list
+
+    Only missing, expired or updated items are fetched.
+
+    Returns (items aligned with the id list, stats dict).
+    """
+    ids, stats = poll_story_ids(cache, kind, limit=limit, session=session, base_url=base_url)
+    items, fetched = fetch_items_incremental(ids, cache, session=session, base_url=base_url, **fetch_kwargs)
+    stats['fetched'] = fetched
+    stats['cached'] = len(ids) - fetched
+    return items, stats
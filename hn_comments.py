@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Breadth-first HN comment-tree crawler
+
+On Ask HN the story text is a line or two; the pain points are in the
+comments. Every comment is its own /v0/item/{id}.json, so walking a
+1000-comment thread one request after another costs 1000 round trips.
+The crawler fetches a whole level of the tree at once (all pending kids
+of every thread being crawled, concurrently over one pooled session), so
+a thread costs about one round trip per level instead of per comment.
+
+Per-thread limits keep huge threads bounded:
+- max_depth: levels below the story (1 = top-level comments only)
+- max_comments: comments fetched per thread; when a level doesn't fit,
+  replies are taken by rank (every parent's first reply before anyone's
+  second, and so on), so the budget goes to the best-ranked branches
+- max_replies: follow at most this many top-ranked replies per comment
+- since: comments posted before this UTC epoch aren't emitted (replies
+  are always newer than their parent, so the crawl still goes below them)
+
+The API exposes no comment scores; the order of `kids` is HN's ranking,
+so rank is the score signal. Dead comments are dropped with their
+subtree; deleted ones are dropped but their replies are kept.
+
+Comments come out as raw items tagged with story_id, story_title and
+depth; format_comment() turns one into the post shape used for
+extraction and the post store.
+
+Usage: python hn_comments.py STORY_ID [STORY_ID ...] [--max-depth 6] [--max-comments 500] [--max-replies N]
+                             [--out comments.ndjson]
+"""
+import argparse
+import sys
+import time
+
+import metrics
+import ratelimit
+from hn_cache import iter_items_incremental
+from hn_fetch import HN_API, iter_items, make_session
+from html_text import html_to_text
+from records import Post, dumps
+from timestamps import HOUR, iso_utc, to_epoch
+
+DEFAULT_MAX_DEPTH = 6
+DEFAULT_MAX_COMMENTS = 500
+
+COMMENTS = metrics.counter("hn_comments_total", "Comments by outcome (emitted, skipped, failed, cut)")
+
+
+class _Thread:
+    """Crawl state of one story's comment tree"""
+
+    def __init__(self, story, max_comments):
+        self.story = story
+        self.remaining = max_comments
+
+
+def _ranked_kids(parents, thread, max_replies):
+    """Kid ids of parents that fit the thread's budget, in (parent, rank) order"""
+    ranked = []
+    for position, parent in enumerate(parents):
+        kids = parent.get('kids') or []
+        if max_replies is not None:
+            kids = kids[:max_replies]
+        ranked.extend((rank, position, kid) for rank, kid in enumerate(kids))
+    ranked.sort()
+    taken = ranked[:max(thread.remaining, 0)]
+    thread.remaining -= len(taken)
+    COMMENTS.inc(len(ranked) - len(taken), outcome="cut")
+    return [kid for _, _, kid in sorted(taken, key=lambda entry: entry[1:])]
+
+
+def iter_comments(stories, session=None, cache=None, base_url=HN_API, max_depth=DEFAULT_MAX_DEPTH,
+                  max_comments=DEFAULT_MAX_COMMENTS, max_replies=None, since=None, stats=None,
+                  max_workers=32, per_host=None):
+    """Yield the comments of stories (raw HN items), level by level
+
+    Each yielded item is the raw comment plus story_id, story_title and
+    depth (1 = reply to the story). Within a level, comments keep tree
+    order. With an hn_cache.ItemCache, cached comments aren't refetched.
+    If a stats dict is passed it gets 'levels', 'requested' and 'failed'.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = make_session(max_workers)
+    stats = stats if stats is not None else {}
+    stats.update(levels=0, requested=0, failed=0)
+
+    # (thread, parents at this level) for every thread still growing
+    frontier = [(_Thread(story, max_comments), [story]) for story in stories if story]
+    try:
+        for depth in range(1, max_depth + 1):
+            wanted = [(thread, _ranked_kids(parents, thread, max_replies)) for thread, parents in frontier]
+            ids = [kid for _, kids in wanted for kid in kids]
+            if not ids:
+                break
+            if cache is not None:
+                pairs = iter_items_incremental(ids, cache, session=session, base_url=base_url,
+                                               max_workers=max_workers, per_host=per_host)
+            else:
+                pairs = iter_items(ids, session=session, base_url=base_url, max_workers=max_workers,
+                                   per_host=per_host)
+            by_id = dict(pairs)
+            stats['levels'] += 1
+            stats['requested'] += len(ids)
+
+            frontier = []
+            for thread, kids in wanted:
+                parents = []
+                for kid in kids:
+                    item = by_id.get(kid)
+                    if item is None:
+                        stats['failed'] += 1
+                        COMMENTS.inc(outcome="failed")
+                        continue
+                    if item.get('dead'):
+                        COMMENTS.inc(outcome="skipped")
+                        continue
+                    parents.append(item)
+                    if item.get('deleted') or item.get('type') != 'comment' or (
+                            since is not None and (item.get('time') or 0) < since):
+                        COMMENTS.inc(outcome="skipped")
+                        continue
+                    COMMENTS.inc(outcome="emitted")
+                    yield dict(item, story_id=thread.story.get('id'), story_title=thread.story.get('title', ''),
+                               depth=depth)
+                if parents:
+                    frontier.append((thread, parents))
+        else:  # max_depth reached: replies below it are never fetched
+            COMMENTS.inc(sum(len(parent.get('kids') or []) for _, parents in frontier for parent in parents),
+                         outcome="cut")
+    finally:
+        if owns_session:
+            session.close()
+
+
+def format_comment(comment):
+    """Convert a comment from iter_comments to the post format used for extraction"""
+    created = to_epoch(comment.get('time') or None, source="hn")
+    return Post(
+        id=comment.get('id'),
+        title=f"Re: {comment.get('story_title', '')}",
+        content=html_to_text(comment.get('text', '')),
+        url=f"https://news.ycombinator.com/item?id={comment.get('id')}",
+        score=0,  # the API doesn't expose comment scores
+        comments=len(comment.get('kids') or []),
+        author=comment.get('by', 'unknown'),
+        source='hn',
+        created_utc=created,
+        published=iso_utc(created) or 'unknown',
+        extra={'story_id': comment.get('story_id'), 'parent': comment.get('parent'), 'depth': comment.get('depth')},
+    )
+
+
+def fetch_threads(story_ids, session=None, base_url=HN_API, max_workers=32, **crawl_kwargs):
+    """Fetch stories and crawl their comments together
+
+    Returns (stories, formatted comments); see iter_comments for crawl_kwargs.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = make_session(max_workers)
+    try:
+        stories = [item for _, item in iter_items(story_ids, session=session, base_url=base_url,
+                                                  max_workers=max_workers) if item]
+        comments = [format_comment(comment) for comment in
+                    iter_comments(stories, session=session, base_url=base_url, max_workers=max_workers,
+                                  **crawl_kwargs)]
+    finally:
+        if owns_session:
+            session.close()
+    return stories, comments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl HN comment trees breadth-first")
+    parser.add_argument("story_ids", nargs="+", type=int)
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH)
+    parser.add_argument("--max-comments", type=int, default=DEFAULT_MAX_COMMENTS, help="per thread")
+    parser.add_argument("--max-replies", type=int, help="top-ranked replies followed per comment")
+    parser.add_argument("--since-hours", type=float, help="only emit comments younger than this")
+    parser.add_argument("--out", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--base-url", default=HN_API)
+    args = parser.parse_args()
+    ratelimit.shared()  # one request budget per host for every worker on this machine
+
+    since = time.time() - args.since_hours * HOUR if args.since_hours is not None else None
+    start = time.perf_counter()
+    stories, comments = fetch_threads(args.story_ids, base_url=args.base_url, max_depth=args.max_depth,
+                                      max_comments=args.max_comments, max_replies=args.max_replies, since=since)
+    elapsed = time.perf_counter() - start
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        for comment in comments:
+            out.write(dumps(comment) + "\n")
+    finally:
+        if args.out:
+            out.close()
+    print(f"💬 {len(comments)} comments from {len(stories)} threads in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
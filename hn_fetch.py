@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Concurrent HackerNews item fetcher
+
+Pulls many /v0/item/{id}.json objects in parallel over one pooled
+requests.Session instead of opening a fresh connection per story:
+- Thread pool bounded by max_workers
+- Per-host concurrency limit (so one API never gets more than N in flight,
+  plus a small reserve, HEDGE_BUDGET of N, that only hedged GETs use)
+  and, once ratelimit.shared() is open, a per-host request rate shared
+  with every other worker on the machine
+- Timeouts on every request
+- Retry with exponential backoff on connection errors, 429 and 5xx
+- Hedged GETs past the endpoint's p95, per-host circuit breakers and
+  optional batch deadlines (resilience.py)
+- item_handler() runs the same fetch as a workqueue.py consumer, so
+  several processes can share one queue of item ids
+
+Every request attempt lands in the http_request_seconds histogram
+(labelled by endpoint and status) and iter_items counts fetched / failed
+items in hn_items_total; see metrics.py.
+"""
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+import ratelimit
+from errors import JobError
+from resilience import HEDGE_BUDGET, CircuitOpen, host_breaker, hedged_get, shorter
+
+HN_API = "https://hacker-news.firebaseio.com/v0"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+DEFAULT_PER_HOST = 16
+
+REQUEST_SECONDS = metrics.histogram("http_request_seconds", "HTTP request latency by endpoint and status")
+ITEMS = metrics.counter("hn_items_total", "HN items by outcome (fetched, failed, cached, deadline)")
+
+_host_limits = {}  # host -> (per_host, semaphore, hedge reserve semaphore)
+_host_limits_lock = threading.Lock()
+
+
+def make_session(pool_size=32, session_class=requests.Session):
+    """Create a requests.Session (or session_class) whose connection pool fits pool_size workers"""
+    session = session_class()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def host_limit(url, per_host=None):
+    """Get the shared semaphore that caps in-flight requests to url's host
+
+    One semaphore per host, sized by the first caller (per_host, or
+    DEFAULT_PER_HOST when that caller leaves it as None). per_host=None
+    takes whatever cap the host already has; a different explicit cap
+    raises ValueError instead of quietly opening a second pool.
+    """
+    return _host_entry(url, per_host)[1]
+
+
+def hedge_limit(url, per_host=None):
+    """Get the host's hedge reserve: ceil(HEDGE_BUDGET * per_host) extra slots
+
+    Only hedged GETs take these, so a backup call can still go out when
+    primaries hold every host_limit slot - which is exactly when a stall
+    leaves the pool waiting.
+    """
+    return _host_entry(url, per_host)[2]
+
+
+def _host_entry(url, per_host):
+    host = urlsplit(url).netloc
+    with _host_limits_lock:
+        entry = _host_limits.get(host)
+        if entry is None:
+            entry = _host_limits[host] = _new_host_entry(per_host or DEFAULT_PER_HOST)
+        elif per_host is not None and per_host != entry[0]:
+            raise ValueError(f"{host} is capped at {entry[0]} in-flight requests, not {per_host} "
+                             f"(set_host_limit() changes it)")
+        return entry
+
+
+def _new_host_entry(per_host):
+    reserve = max(1, math.ceil(HEDGE_BUDGET * per_host))
+    return per_host, threading.BoundedSemaphore(per_host), threading.BoundedSemaphore(reserve)
+
+
+def set_host_limit(url, per_host):
+    """Configure (or change) the in-flight cap for url's host
+
+    Requests already holding the old semaphore release it as they finish,
+    so change caps between runs, not in the middle of one.
+    """
+    with _host_limits_lock:
+        _host_limits[urlsplit(url).netloc] = _new_host_entry(per_host)
+
+
+def get_json(session, url, timeout=10, retries=3, backoff=0.5, per_host=None, deadline=None, hedge=True):
+    """GET url and decode JSON, retrying transient failures with backoff
+
+    Calls go through the host's circuit breaker and are hedged once they
+    pass the endpoint's p95 (resilience.py); with a resilience.Deadline,
+    timeouts and retries stop at it. Returns None on 404/other client
+    errors, while the breaker is open, or once retries (or time) run out.
+    """
+    label = metrics.endpoint(url)
+    breaker = host_breaker(url)
+    limit, reserve = host_limit(url, per_host), hedge_limit(url, per_host)
+    for attempt in range(retries + 1):
+        if deadline is not None and deadline.expired:
+            break
+        retry_after = None
+        status = "error"
+        try:
+            if not ratelimit.throttle(url, timeout=deadline.remaining() if deadline else None):
+                break
+            with breaker.guard(deadline):
+                limit.acquire()  # hedged_get releases it (and takes its own for a hedge)
+                start = time.perf_counter()
+                try:
+                    response = hedged_get(session, url, hedge=hedge, slot=limit, hedge_slot=reserve,
+                                          timeout=shorter(timeout, deadline))
+                    status = response.status_code
+                finally:
+                    REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=label, status=status)
+            breaker.record(response.status_code < 500)
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code not in RETRY_STATUSES:
+                return None
+            retry_after = response.headers.get("Retry-After")
+            ratelimit.backoff(url, response.status_code, retry_after)
+        except CircuitOpen:
+            return None
+        except (requests.ConnectionError, requests.Timeout, ValueError):
+            pass
+
+        if attempt == retries:
+            break
+
+        delay = backoff * (2 ** attempt) * (0.5 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        time.sleep(shorter(delay, deadline))
+
+    return None
+
+
+def item_url(item_id, base_url=HN_API):
+    """Build the item URL for an HN id"""
+    return f"{base_url}/item/{item_id}.json"
+
+
+def iter_items(item_ids, session=None, max_workers=32, per_host=None, timeout=10,
+               retries=3, backoff=0.5, base_url=HN_API, deadline=None, hedge=True):
+    """Fetch many HN items concurrently, yielding (id, item) as each completes
+
+    item is None where a fetch failed. Completion order, not input order.
+    With a resilience.Deadline, items not fetched by then are yielded as
+    None right away (hn_items_total outcome "deadline").
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+
+    owns_session = session is None
+    if owns_session:
+        session = make_session(max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(get_json, session, item_url(item_id, base_url),
+                            timeout, retries, backoff, per_host, deadline, hedge): item_id
+                for item_id in item_ids
+            }
+            try:
+                for future in as_completed(futures, timeout=deadline.remaining() if deadline else None):
+                    item = future.result()
+                    ITEMS.inc(outcome="fetched" if item is not None else "failed")
+                    yield futures[future], item
+            except FutureTimeout:
+                for future, item_id in futures.items():
+                    if not future.done():
+                        future.cancel()
+                        ITEMS.inc(outcome="deadline")
+                        yield item_id, None
+            finally:
+                for future in futures:
+                    future.cancel()
+    finally:
+        if owns_session:
+            session.close()
+
+
+def fetch_items(item_ids, on_progress=None, **fetch_kwargs):
+    """Fetch many HN items concurrently
+
+    Returns a list aligned with item_ids (None where an item failed).
+    on_progress(done, total) is called as each item completes.
+    Accepts the same keyword arguments as iter_items.
+    """
+    item_ids = list(item_ids)
+    by_id = {}
+    for done, (item_id, item) in enumerate(iter_items(item_ids, **fetch_kwargs), 1):
+        by_id[item_id] = item
+        if on_progress:
+            on_progress(done, len(item_ids))
+    return [by_id.get(item_id) for item_id in item_ids]
+
+
+def item_handler(session=None, max_workers=32, **fetch_kwargs):
+    """Work-queue handler for "fetch_item" jobs ({"id": n}; see workqueue.py)
+
+    Fetches a leased batch concurrently over one session kept for the
+    handler's lifetime; an item that couldn't be fetched (or doesn't
+    exist) comes back as a JobError, so the queue retries it.
+    Accepts the same keyword arguments as iter_items.
+    """
+    session = session or make_session(max_workers)
+
+    def handle(payloads):
+        ids = [payload['id'] for payload in payloads]
+        by_id = dict(iter_items(ids, session=session, max_workers=max_workers, **fetch_kwargs))
+        return [by_id[item_id] if by_id.get(item_id) is not None else JobError(f"item {item_id} not fetched")
+                for item_id in ids]
+
+    return handle
+
+
+def fetch_story_ids(kind="askstories", session=None, timeout=10, base_url=HN_API):
+    """Fetch an HN id list (askstories, topstories, newstories, ...)"""
+    session = session or requests
+    ids = get_json(session, f"{base_url}/{kind}.json", timeout=timeout)
+    return ids or []
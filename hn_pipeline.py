@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Streaming HN ingest pipeline: fetch -> format -> filter -> sink
+
+Every stage is a generator that takes an iterable and yields as soon as it
+has something, so the first post reaches the sink (stdout, an NDJSON file,
+the extraction step) while the rest of the batch is still downloading.
+
+    posts = pipeline(
+        hn_source(ids, cache=cache),
+        only_stories,
+        with_comments(max_comments=200),  # optional: crawl each story's comment tree
+        format_posts,
+        with_content(50),
+        recent(168),
+        collapse_duplicates(NearDuplicateIndex()),  # optional: one copy per post
+        triaged(Triage()),  # optional: drop posts not worth extracting
+    )
+
+Wrapping a stage in metered(stage, name) counts items going in and coming
+out of it (pipeline_items_total), so each filter's drop count shows up in
+the metrics export.
+
+Usage: python hn_pipeline.py [--kind askstories] [--limit 50] [--comments 200] [--dedupe] [--triage 1.0]
+                             [--out posts.ndjson] [--store posts.store] [--index search_index.sqlite3]
+                             [--metrics metrics.jsonl|metrics.prom]
+"""
+import argparse
+import sys
+import time
+
+import metrics
+import ratelimit
+from html_text import html_to_text
+from hn_cache import ItemCache, iter_items_incremental, poll_story_ids
+from hn_comments import format_comment, iter_comments
+from hn_fetch import HN_API, iter_items
+from near_dup import NearDuplicateIndex
+from post_store import PostStore
+from records import Post, dumps
+from search_index import SearchIndex
+from timestamps import HOUR, iso_utc, to_epoch
+from triage import Triage
+
+STAGE_ITEMS = metrics.counter("pipeline_items_total", "Items into / out of each pipeline stage")
+
+
+def format_post_for_extraction(story):
+    """Convert HN story to our standard format (a records.Post)
+
+    Times are stored as created_utc (UTC epoch) plus a UTC ISO string;
+    ages are computed when needed (timestamps.age_hours), so saved posts
+    don't go stale.
+    """
+    created = to_epoch(story.get('time') or None, source="hn")
+
+    # Get content (text field in HN stories)
+    content = story.get('text', '')
+
+    # HN returns HTML: keep paragraphs and links, decode every entity
+    content_clean = html_to_text(content)
+
+    return Post(
+        id=story.get('id'),
+        title=story.get('title', ''),
+        content=content_clean,
+        url=f"https://news.ycombinator.com/item?id={story.get('id')}",
+        score=story.get('score', 0),
+        comments=story.get('descendants', 0),
+        author=story.get('by', 'unknown'),
+        source='hn',
+        created_utc=created,
+        published=iso_utc(created) or 'unknown',
+    )
+
+
+def pipeline(source, *stages):
+    """Chain stages lazily: each stage takes an iterable and returns an iterable"""
+    for stage in stages:
+        source = stage(source)
+    return source
+
+
+def hn_source(item_ids, cache=None, stats=None, **fetch_kwargs):
+    """Yield raw HN items as they arrive (cache hits first when a cache is given)"""
+    if cache is not None:
+        pairs = iter_items_incremental(item_ids, cache, stats=stats, **fetch_kwargs)
+    else:
+        pairs = iter_items(item_ids, **fetch_kwargs)
+    for _, item in pairs:
+        if item:
+            yield item
+
+
+def only_stories(items):
+    """Drop comments, jobs, polls and deleted items"""
+    for item in items:
+        if item.get('type') == 'story' and not item.get('deleted') and not item.get('dead'):
+            yield item
+
+
+def with_comments(batch_size=10, **crawl_kwargs):
+    """Stage: pass stories through, followed by their comments (hn_comments.iter_comments)
+
+    Stories are crawled batch_size at a time so their trees share each
+    level's round trip; a batch's stories are yielded before it's crawled.
+    """
+    def stage(stories):
+        batch = []
+        for story in stories:
+            yield story
+            batch.append(story)
+            if len(batch) >= batch_size:
+                yield from iter_comments(batch, **crawl_kwargs)
+                batch = []
+        if batch:
+            yield from iter_comments(batch, **crawl_kwargs)
+    return stage
+
+
+def format_posts(items):
+    """Convert raw stories (and comments from with_comments) to post dicts"""
+    for item in items:
+        if item.get('type') == 'comment':
+            yield format_comment(item)
+        else:
+            yield format_post_for_extraction(item)
+
+
+def with_content(min_chars=50):
+    """Stage: keep posts whose cleaned content is longer than min_chars"""
+    def stage(posts):
+        for post in posts:
+            if post['content'] and len(post['content']) > min_chars:
+                yield post
+    return stage
+
+
+def recent(max_age_hours=168, now=None):
+    """Stage: keep posts created less than max_age_hours before now (default: when the stage runs)"""
+    def stage(posts):
+        cutoff = (now or time.time()) - max_age_hours * HOUR
+        for post in posts:
+            if post.get('created_utc') is not None and post['created_utc'] > cutoff:
+                yield post
+    return stage
+
+
+def triaged(triage, skipped=None):
+    """Stage: keep posts the triage pre-filter says are worth extracting
+
+    Skipped posts are appended to skipped (if given) for reporting.
+    """
+    def stage(posts):
+        for post in posts:
+            if triage.worth_extracting(post):
+                yield post
+            elif skipped is not None:
+                skipped.append(post)
+    return stage
+
+
+def collapse_duplicates(index):
+    """Stage: drop near-duplicates of posts already in a NearDuplicateIndex
+
+    The first post of each cluster passes through; later copies only bump
+    the canonical record's count in the index.
+    """
+    def stage(posts):
+        for post in posts:
+            if not index.add(post)[1]:
+                yield post
+    return stage
+
+
+def count(counts, key):
+    """Stage: pass items through unchanged, tallying them in counts[key]"""
+    def stage(items):
+        counts.setdefault(key, 0)
+        for item in items:
+            counts[key] += 1
+            yield item
+    return stage
+
+
+def metered(stage, name=None):
+    """Wrap a stage so items in and out are counted under name"""
+    name = name or stage.__name__
+
+    def counted_in(items):
+        for item in items:
+            STAGE_ITEMS.inc(stage=name, direction="in")
+            yield item
+
+    def wrapped(items):
+        for item in stage(counted_in(items)):
+            STAGE_ITEMS.inc(stage=name, direction="out")
+            yield item
+    return wrapped
+
+
+def to_store(store, batch_size=200):
+    """Stage: append posts to a post_store.PostStore in batches and pass them through"""
+    def stage(posts):
+        batch = []
+        try:
+            for post in posts:
+                batch.append(post)
+                if len(batch) >= batch_size:
+                    store.append(batch)
+                    batch = []
+                yield post
+        finally:
+            store.append(batch)
+    return stage
+
+
+def to_index(index, batch_size=200):
+    """Stage: add posts to a search_index.SearchIndex in batches and pass them through"""
+    def stage(posts):
+        batch = []
+        try:
+            for post in posts:
+                batch.append(post)
+                if len(batch) >= batch_size:
+                    index.add_many(batch)
+                    batch = []
+                yield post
+        finally:
+            index.add_many(batch)
+    return stage
+
+
+def write_ndjson(fp, flush=True):
+    """Stage: write each post as one JSON line to fp and pass it through"""
+    def stage(posts):
+        for post in posts:
+            fp.write(dumps(post) + "\n")
+            if flush:
+                fp.flush()
+            yield post
+    return stage
+
+
+def drain(items):
+    """Consume a pipeline for its side effects; returns how many items came out"""
+    total = 0
+    for _ in items:
+        total += 1
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream HN posts as NDJSON")
+    parser.add_argument("--kind", default="askstories", help="askstories, topstories, newstories, ...")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--comments", type=int, metavar="MAX_PER_THREAD",
+                        help="also crawl up to this many comments per story (breadth-first)")
+    parser.add_argument("--comment-depth", type=int, default=6, help="comment levels to crawl with --comments")
+    parser.add_argument("--min-chars", type=int, default=50)
+    parser.add_argument("--max-age-hours", type=float, default=168)
+    parser.add_argument("--dedupe", action="store_true",
+                        help="collapse near-duplicate posts (index kept in near_dup.sqlite3)")
+    parser.add_argument("--triage", type=float, metavar="THRESHOLD",
+                        help="only write posts scoring >= THRESHOLD on the triage lexicon")
+    parser.add_argument("--out", help="NDJSON output file (default: stdout)")
+    parser.add_argument("--base-url", default=HN_API)
+    parser.add_argument("--store", help="also append posts to this day-partitioned post store (post_store.py)")
+    parser.add_argument("--index", help="also add posts to this keyword index (search_index.py)")
+    parser.add_argument("--metrics", help="write metrics here (.prom: Prometheus text, else JSON lines)")
+    args = parser.parse_args()
+    ratelimit.shared()  # one request budget per host for every worker on this machine
+
+    stages = [metered(only_stories)]
+    if args.comments:
+        stages.append(metered(with_comments(max_comments=args.comments, max_depth=args.comment_depth,
+                                            base_url=args.base_url), "with_comments"))
+    stages += [
+        metered(format_posts),
+        metered(with_content(args.min_chars), "with_content"),
+        metered(recent(args.max_age_hours), "recent"),
+    ]
+    near_dups = NearDuplicateIndex() if args.dedupe else None
+    if near_dups is not None:
+        stages.append(metered(collapse_duplicates(near_dups), "collapse_duplicates"))
+    if args.triage is not None:
+        stages.append(metered(triaged(Triage(threshold=args.triage)), "triaged"))
+
+    if args.store:
+        stages.append(to_store(PostStore(args.store)))
+    search_index = SearchIndex(args.index) if args.index else None
+    if search_index is not None:
+        stages.append(to_index(search_index))
+
+    out = open(args.out, "w") if args.out else sys.stdout
+    try:
+        with ItemCache() as cache:
+            ids, stats = poll_story_ids(cache, args.kind, limit=args.limit, base_url=args.base_url)
+            written = drain(pipeline(
+                hn_source(ids, cache=cache, stats=stats, base_url=args.base_url),
+                *stages,
+                write_ndjson(out),
+            ))
+    finally:
+        if args.out:
+            out.close()
+        if near_dups is not None:
+            near_dups.close()
+        if search_index is not None:
+            search_index.close()
+
+    print(f"{written}/{stats['ids']} posts written "
+          f"({stats.get('fetched', 0)} fetched, {stats.get('cached', 0)} cached)", file=sys.stderr)
+    if args.metrics:
+        metrics.dump(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Incremental parser for a JSON array that arrives in pieces
+
+Model responses are a JSON array of per-post objects, usually with some
+text or a ``` fence around it, streamed a few characters at a time.
+JSONArrayParser.feed() takes each piece as it arrives and returns the
+elements that became complete, so the first result is usable long before
+the last token. Only the current element is buffered.
+
+Elements are delimited by tracking strings, escapes and bracket depth, and
+each one is json.loads()'ed on its own: a malformed element is recorded in
+.errors (index, raw text, message) and the rest of the array still parses.
+close() reports an element cut off by a truncated stream the same way.
+
+    parser = JSONArrayParser()
+    for piece in pieces:
+        for result in parser.feed(piece):
+            handle(result)
+    parser.close()
+"""
+import json
+import re
+
+_OUTSIDE_STRING = re.compile(r'["\[\]{},]')
+_INSIDE_STRING = re.compile(r'["\\]')
+_POST_ID = re.compile(r'"post_id"\s*:\s*"?(\w+)')
+
+
+def post_id_hint(raw):
+    """post_id mentioned in a malformed element's text, if any"""
+    match = _POST_ID.search(raw)
+    if not match:
+        return None
+    value = match.group(1)
+    return int(value) if value.isdigit() else value
+
+
+class JSONArrayParser:
+    """Returns the elements of one top-level JSON array as they complete"""
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0              # scan position in buffer
+        self.element_start = 0    # buffer offset just after the last [ or , at depth 1
+        self.depth = 0            # 0 = before the array, 1 = inside it, >1 = nested
+        self.in_string = False
+        self.escaped = False
+        self.index = 0            # elements seen so far (parsed or not)
+        self.done = False         # closing ] seen
+        self.errors = []
+
+    def feed(self, text):
+        """Add text; returns the list of elements completed by it"""
+        if self.done:
+            return []
+        buffer = self.buffer + text
+        pos = self.pos
+        completed = []
+
+        while pos < len(buffer):
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                    pos += 1
+                    continue
+                match = _INSIDE_STRING.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    self.escaped = True
+                else:
+                    self.in_string = False
+                continue
+
+            match = _OUTSIDE_STRING.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char, at, pos = match.group(), match.start(), match.end()
+
+            if self.depth == 0:
+                # Preamble ("Here are the results:", ```json) until the array opens
+                if char == "[":
+                    self.depth = 1
+                    self.element_start = pos
+                continue
+
+            if char == '"':
+                self.in_string = True
+            elif char in "[{":
+                self.depth += 1
+            elif char in "]}":
+                self.depth -= 1
+                if self.depth == 0:
+                    self._finish(buffer[self.element_start:at], completed)
+                    self.done = True
+                    break
+            elif self.depth == 1:  # a comma between elements
+                self._finish(buffer[self.element_start:at], completed)
+                self.element_start = pos
+
+        # Only the unfinished element needs to be kept
+        keep = self.element_start if self.depth else pos
+        self.buffer = buffer[keep:]
+        self.pos = pos - keep
+        self.element_start -= keep
+        return completed
+
+    def _finish(self, raw, completed):
+        raw = raw.strip()
+        if not raw:
+            return  # "[]" or a trailing comma
+        try:
+            completed.append(json.loads(raw))
+        except ValueError as e:
+            self.errors.append({'index': self.index, 'post_id': post_id_hint(raw), 'raw': raw, 'error': str(e)})
+        self.index += 1
+
+    def close(self):
+        """End of input; records a cut-off element. Returns True if the array closed"""
+        if not self.done and self.depth:
+            raw = self.buffer[self.element_start:].strip()
+            if raw:
+                self.errors.append({'index': self.index, 'post_id': post_id_hint(raw), 'raw': raw,
+                                    'error': "truncated: stream ended inside this element"})
+                self.index += 1
+        return self.done
+
+
+def parse_array(text):
+    """Parse a complete response text; returns (elements, errors, closed)"""
+    parser = JSONArrayParser()
+    elements = parser.feed(text)
+    closed = parser.close()
+    return elements, parser.errors, closed
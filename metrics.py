@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Lightweight in-process metrics for the ingest / extract / analyze scripts
+
+Counters and latency histograms live in one thread-safe registry (the
+module-level REGISTRY unless you pass your own), keyed by name + labels:
+
+    metrics.counter("items_total", "Items seen").inc(3, source="cache")
+    metrics.histogram("http_request_seconds", "HTTP latency").observe(0.12, endpoint="hn/item")
+
+    with metrics.timer("stage_seconds", stage="format"):
+        ...
+
+    @metrics.timed("analysis_seconds", step="rank")
+    def rank(...): ...
+
+Export with to_prometheus() (text exposition format), write_jsonl() (one
+JSON object per series, with a timestamp, appended per run) or dump(path),
+which picks the format from the extension. summary() is a short
+human-readable table of where wall time went.
+"""
+import bisect
+import functools
+import json
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+
+# Seconds; HTTP calls, per-item parsing and model calls all land somewhere useful
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_NUMERIC_SEGMENT = re.compile(r"(?<=/)\d+(?=[/.]|$)")
+
+
+def endpoint(url):
+    """Low-cardinality label for a URL: host + path with numeric ids templated
+
+    https://hacker-news.firebaseio.com/v0/item/123.json -> hacker-news.firebaseio.com/v0/item/{id}.json
+    """
+    parts = urlsplit(url)
+    return parts.netloc + _NUMERIC_SEGMENT.sub("{id}", parts.path)
+
+
+def _label_key(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _prom_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    type = "counter"
+
+    def __init__(self, name, help=""):
+        self.name = name
+        self.help = help
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.values.get(_label_key(labels), 0)
+
+    def series(self):
+        with self._lock:
+            return [(key, {'value': value}) for key, value in self.values.items()]
+
+    def prometheus(self):
+        return [f"{self.name}{_prom_labels(key)} {data['value']}" for key, data in self.series()]
+
+
+class Histogram:
+    """Bucketed observations (count, sum, cumulative buckets) per label set"""
+
+    type = "histogram"
+
+    def __init__(self, name, help="", buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self.values.get(key)
+            if data is None:
+                data = self.values[key] = {'count': 0, 'sum': 0.0, 'counts': [0] * (len(self.buckets) + 1)}
+            data['count'] += 1
+            data['sum'] += value
+            data['counts'][slot] += 1
+
+    def series(self):
+        with self._lock:
+            return [(key, {'count': d['count'], 'sum': d['sum'], 'counts': list(d['counts'])})
+                    for key, d in self.values.items()]
+
+    def quantile(self, q, **labels):
+        """Upper bound of the bucket holding the q-th observation (None if empty)"""
+        data = self.values.get(_label_key(labels))
+        if not data or not data['count']:
+            return None
+        rank, seen = q * data['count'], 0
+        for bound, count in zip(self.buckets + (float("inf"),), data['counts']):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def prometheus(self):
+        lines = []
+        for key, data in self.series():
+            cumulative = 0
+            for bound, count in zip(self.buckets, data['counts']):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_prom_labels(key, [('le', repr(float(bound)))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_prom_labels(key, [('le', '+Inf')])} {data['count']}")
+            lines.append(f"{self.name}_sum{_prom_labels(key)} {data['sum']}")
+            lines.append(f"{self.name}_count{_prom_labels(key)} {data['count']}")
+        return lines
+
+
+class Registry:
+    """Named metrics; asking for an existing name returns the same metric"""
+
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, help, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"metric {name!r} is a {metric.type}, not a {cls.type}")
+            return metric
+
+    def counter(self, name, help=""):
+        return self._get(Counter, name, help)
+
+    def histogram(self, name, help="", buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help, buckets=buckets)
+
+    def reset(self):
+        """Zero every metric (modules keep their metric objects, so these stay registered)"""
+        with self._lock:
+            for metric in self.metrics.values():
+                with metric._lock:
+                    metric.values = {}
+
+    def to_prometheus(self):
+        lines = []
+        for metric in list(self.metrics.values()):
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.prometheus())
+        return "\n".join(lines) + "\n"
+
+    def records(self, now=None):
+        """One dict per series: {'ts', 'name', 'type', 'labels', ...values}"""
+        now = now or time.time()
+        out = []
+        for metric in list(self.metrics.values()):
+            for key, data in metric.series():
+                record = {'ts': now, 'name': metric.name, 'type': metric.type, 'labels': dict(key), **data}
+                if metric.type == "histogram":
+                    record['buckets'] = list(metric.buckets)
+                out.append(record)
+        return out
+
+    def write_jsonl(self, fp):
+        for record in self.records():
+            fp.write(json.dumps(record) + "\n")
+
+    def dump(self, path):
+        """Append JSON lines, or write Prometheus text if path ends in .prom"""
+        if path.endswith(".prom"):
+            with open(path, "w") as f:
+                f.write(self.to_prometheus())
+        else:
+            with open(path, "a") as f:
+                self.write_jsonl(f)
+
+    def summary(self):
+        """Histograms by total time (count, total, p50, p95), then counters"""
+        rows = []
+        for metric in list(self.metrics.values()):
+            if metric.type != "histogram":
+                continue
+            for key, data in metric.series():
+                labels = ",".join(v for _, v in key)
+                rows.append((data['sum'], f"{metric.name}{'[' + labels + ']' if labels else ''}", data['count'],
+                             metric.quantile(0.5, **dict(key)), metric.quantile(0.95, **dict(key))))
+        width = max([len(row[1]) for row in rows] + [5])
+        lines = [f"{'timer':<{width}} {'count':>7} {'total':>9} {'p50≤':>8} {'p95≤':>8}"]
+        for total, label, count, p50, p95 in sorted(rows, reverse=True):
+            lines.append(f"{label:<{width}} {count:>7} {total:>8.3f}s {p50:>8g} {p95:>8g}")
+        for metric in list(self.metrics.values()):
+            if metric.type == "counter":
+                for key, data in sorted(metric.series()):
+                    labels = ",".join(f"{k}={v}" for k, v in key)
+                    lines.append(f"{metric.name}{'{' + labels + '}' if labels else ''} = {data['value']}")
+        return "\n".join(lines)
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help="", registry=REGISTRY):
+    return registry.counter(name, help)
+
+
+def histogram(name, help="", buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+    return registry.histogram(name, help, buckets)
+
+
+class timer:
+    """Time a block (or, as timed(), a function) into a histogram"""
+
+    def __init__(self, name, registry=REGISTRY, **labels):
+        self.histogram = registry.histogram(name, "Wall time in seconds")
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        self.histogram.observe(self.elapsed, **self.labels)
+
+
+def timed(name, registry=REGISTRY, **labels):
+    """Decorator: time every call of the function into histogram name"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timer(name, registry, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def to_prometheus(registry=REGISTRY):
+    return registry.to_prometheus()
+
+
+def write_jsonl(fp, registry=REGISTRY):
+    registry.write_jsonl(fp)
+
+
+def dump(path, registry=REGISTRY):
+    registry.dump(path)
+
+
+def summary(registry=REGISTRY):
+    return registry.summary()
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate index for posts across sources (HN, Reddit feeds, ...)
+
+Cross-posts and re-announcements show up many times with small wording
+changes; each copy would otherwise be formatted, stored and extracted.
+Every post goes through:
+- shingling: lowercase word 3-grams of title + content
+- MinHash signature (NUM_PERM values): one-permutation hashing, i.e. each
+  shingle is hashed once and keeps the minimum per bin, with empty bins
+  filled by a fixed probe sequence (densification), so a signature costs
+  one hash per shingle rather than one per shingle per permutation
+- LSH banding: the signature is cut into BANDS bands; posts sharing any
+  band bucket are candidates, and a candidate whose estimated Jaccard
+  similarity (matching signature slots) reaches the threshold is a
+  duplicate
+
+Buckets live in an indexed SQLite table, so a lookup is BANDS index probes
+no matter how many posts are stored. Only canonical posts (the first of
+each cluster) are bucketed; duplicates are linked to their canonical
+record, which keeps a count of every distinct post collapsed into it.
+Adding a post that is already indexed is a no-op, so re-polling the same
+feeds is safe.
+
+    with NearDuplicateIndex() as index:
+        canonical, duplicate = index.add(post)
+
+Usage: python near_dup.py [index_path]   (prints the biggest clusters)
+"""
+import hashlib
+import random
+import re
+import sqlite3
+import sys
+import threading
+import time
+from array import array
+
+from html_text import html_to_text
+from records import Post, dumps, loads
+
+DEFAULT_INDEX_PATH = "near_dup.sqlite3"
+NUM_PERM = 128
+BANDS = 32
+SHINGLE_SIZE = 3
+# Estimated Jaccard at or above which two posts are the same post. With
+# 32 bands of 4 rows, pairs at 0.6 become candidates ~99% of the time
+DEFAULT_THRESHOLD = 0.6
+
+EMPTY = (1 << 64) - 1
+_BIN_BITS = NUM_PERM.bit_length() - 1
+_WORD = re.compile(r"\w+")
+
+# Densification probe order: empty bin i copies the first filled bin in
+# _PROBES[i]. Fixed seed, so every post (and every process) agrees
+_PROBES = [random.Random(i).sample([b for b in range(NUM_PERM) if b != i], NUM_PERM - 1)
+           for i in range(NUM_PERM)]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    key TEXT PRIMARY KEY,
+    canonical TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS posts_canonical ON posts (canonical);
+CREATE TABLE IF NOT EXISTS canonical (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    post TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    count INTEGER NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS buckets (
+    bucket INTEGER NOT NULL,
+    canonical_id INTEGER NOT NULL,
+    PRIMARY KEY (bucket, canonical_id)
+) WITHOUT ROWID;
+"""
+
+
+def post_key(post):
+    """Stable identity of a post: its URL/link, else its id"""
+    return str(post.get('url') or post.get('link') or post.get('id'))
+
+
+def post_text(post):
+    """Title + body; feed entries carry HTML, which is reduced to its text"""
+    body = post.get('content') or post.get('summary') or ''
+    if '<' in body:
+        body = html_to_text(body)
+    return f"{post.get('title', '')}\n{body}"
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Distinct lowercase word n-grams (the whole text if it is shorter)"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def signature(text):
+    """MinHash signature (array of NUM_PERM unsigned 64-bit values)"""
+    sig = [EMPTY] * NUM_PERM
+    for shingle in shingles(text):
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+        slot = h & (NUM_PERM - 1)
+        value = h >> _BIN_BITS
+        if value < sig[slot]:
+            sig[slot] = value
+
+    filled = [value != EMPTY for value in sig]
+    if any(filled) and not all(filled):
+        for slot in range(NUM_PERM):
+            if not filled[slot]:
+                sig[slot] = next(sig[probe] for probe in _PROBES[slot] if filled[probe])
+    return array("Q", sig)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+def band_buckets(sig, bands=BANDS):
+    """One signed 64-bit bucket id per band (band number folded in)"""
+    rows = len(sig) // bands
+    raw = sig.tobytes()
+    width = rows * sig.itemsize
+    return [
+        int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width],
+                                       digest_size=8, person=band.to_bytes(2, "little")).digest(),
+                       "little", signed=True)
+        for band in range(bands)
+    ]
+
+
+class NearDuplicateIndex:
+    """SQLite-backed MinHash/LSH index collapsing near-duplicate posts"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH, threshold=DEFAULT_THRESHOLD, bands=BANDS):
+        if NUM_PERM % bands:
+            raise ValueError(f"bands must divide {NUM_PERM}")
+        self.path = path
+        self.threshold = threshold
+        self.bands = bands
+        self.added = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # One small transaction per post in the ingest path: WAL keeps each
+        # commit to an append instead of a full journal sync
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA cache_size=-65536")  # 64 MB: keeps the bucket index hot
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, post, now=None):
+        """Index one post; returns (canonical key, is_duplicate)"""
+        return self.add_many([post], now=now)[0]
+
+    def add_many(self, posts, now=None):
+        """Index posts in one transaction; returns [(canonical key, is_duplicate)]"""
+        now = now or time.time()
+        outcomes = []
+        with self._lock, self._conn:
+            for post in posts:
+                outcomes.append(self._add(post, now))
+        return outcomes
+
+    def _add(self, post, now):
+        key = post_key(post)
+        row = self._conn.execute("SELECT canonical FROM posts WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            return row[0], row[0] != key
+
+        sig = signature(post_text(post))
+        buckets = band_buckets(sig, self.bands) if sig[0] != EMPTY else []
+        match, score = self._best_match(sig, buckets)
+
+        if match is not None:
+            self._conn.execute("INSERT INTO posts (key, canonical, similarity, added_at) VALUES (?, ?, ?, ?)",
+                               (key, match, score, now))
+            self._conn.execute("UPDATE canonical SET count = count + 1, last_seen = ? WHERE key = ?", (now, match))
+            self.added += 1
+            self.duplicates += 1
+            return match, True
+
+        self._conn.execute("INSERT INTO posts (key, canonical, similarity, added_at) VALUES (?, ?, 1.0, ?)",
+                           (key, key, now))
+        canonical_id = self._conn.execute(
+            "INSERT INTO canonical (key, post, signature, count, first_seen, last_seen) VALUES (?, ?, ?, 1, ?, ?)",
+            (key, dumps(post), sig.tobytes(), now, now),
+        ).lastrowid
+        # Integer ids keep bucket rows small; the table grows BANDS rows per post
+        self._conn.executemany("INSERT OR IGNORE INTO buckets (bucket, canonical_id) VALUES (?, ?)",
+                               [(bucket, canonical_id) for bucket in buckets])
+        self.added += 1
+        return key, False
+
+    def _best_match(self, sig, buckets):
+        if not buckets:
+            return None, 0.0
+        marks = ",".join("?" * len(buckets))
+        candidates = self._conn.execute(
+            f"SELECT DISTINCT c.key, c.signature FROM buckets b JOIN canonical c ON c.id = b.canonical_id "
+            f"WHERE b.bucket IN ({marks})",
+            buckets,
+        ).fetchall()
+        best, best_score = None, 0.0
+        for key, blob in candidates:
+            score = similarity(sig, array("Q", blob))
+            if score >= self.threshold and score > best_score:
+                best, best_score = key, score
+        return best, best_score
+
+    def record(self, key):
+        """Canonical record for a post key: {'key', 'post', 'count', 'members'}"""
+        with self._lock:
+            row = self._conn.execute("SELECT canonical FROM posts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            canonical = row[0]
+            post, count = self._conn.execute(
+                "SELECT post, count FROM canonical WHERE key = ?", (canonical,)).fetchone()
+            members = [m for (m,) in self._conn.execute(
+                "SELECT key FROM posts WHERE canonical = ? ORDER BY added_at", (canonical,))]
+        return {'key': canonical, 'post': loads(post, Post), 'count': count, 'members': members}
+
+    def clusters(self, min_count=2, limit=None):
+        """Canonical records with at least min_count posts, biggest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, post, count FROM canonical WHERE count >= ? ORDER BY count DESC LIMIT ?",
+                (min_count, -1 if limit is None else limit),
+            ).fetchall()
+        return [{'key': key, 'post': loads(post, Post), 'count': count} for key, post, count in rows]
+
+    def __len__(self):
+        """Number of canonical (distinct) posts"""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM canonical").fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            posts = self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+            canonical = self._conn.execute("SELECT COUNT(*) FROM canonical").fetchone()[0]
+        return {
+            'added': self.added,
+            'duplicates': self.duplicates,
+            'posts': posts,
+            'canonical': canonical,
+        }
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_INDEX_PATH
+    with NearDuplicateIndex(path) as index:
+        stats = index.stats()
+        print(f"📊 {stats['posts']} posts -> {stats['canonical']} canonical")
+        for cluster in index.clusters(limit=20):
+            print(f"   {cluster['count']:>4}x  {cluster['post'].get('title', '')[:70]}  ({cluster['key']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Long-running adaptive poller for HN lists and subreddit feeds
+
+One asyncio process replaces cron-driven one-shot runs: connections stay
+warm in one pooled session, the HN item cache and feed validators stay
+open, and each source is polled on its own cadence:
+- every source runs as its own task; a poll is the existing sync fetch
+  path (id list + fetch_items_incremental, fetch_feed) run in a worker
+  thread, and only items not seen before are fetched and emitted
+- the interval adapts to the observed new-item rate (smoothed, items per
+  second): it aims for target_new new items per poll, moves at most 2x per
+  poll and stays within [min_interval, max_interval], so quiet sources back
+  off and busy ones are polled more often
+- a failed poll (request error, blocked feed) is retried after a
+  jittered exponential backoff instead of the normal interval
+- a global budget caps HTTP requests in flight across all sources
+- SIGINT / SIGTERM stop the scheduler: in-flight polls finish, then the
+  per-source state (interval, rate, next due time, recently seen ids) and
+  the feed validators are written, so a restart resumes where it left off
+  instead of cold-polling everything
+
+New posts go to a sink (default: the day-partitioned post store).
+
+Usage: python poller.py [--hn askstories topstories newstories] [--subreddits Entrepreneur SaaS ...]
+                        [--budget 8] [--store posts.store] [--state poller_state.json] [--run-for SECONDS]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import metrics
+import ratelimit
+from hn_cache import ItemCache, fetch_items_incremental
+from hn_fetch import HN_API, get_json, make_session
+from hn_pipeline import format_post_for_extraction
+from post_store import PostStore
+from records import Post
+from rss_fetch import REDDIT_BASE, FeedStateStore, entry_key, feed_url, fetch_feed
+
+DEFAULT_STATE_PATH = "poller_state.json"
+DEFAULT_BUDGET = 8
+SEEN_LIMIT = 5000           # ids remembered per source (HN lists hold <= 500)
+RATE_SMOOTHING = 0.3        # weight of the latest poll in the rate estimate
+MAX_STEP = 2.0              # interval changes at most this factor per poll
+SAVE_EVERY = 30.0           # seconds between state checkpoints
+
+# (min_interval, max_interval, target_new) in seconds / items per poll
+HN_CADENCES = {
+    "newstories": (30, 15 * 60, 10),
+    "askstories": (60, 30 * 60, 5),
+    "topstories": (120, 60 * 60, 5),
+}
+FEED_CADENCE = (60, 60 * 60, 5)
+
+POLLS = metrics.counter("poller_polls_total", "Polls by source and outcome (new, empty, error)")
+NEW_ITEMS = metrics.counter("poller_new_items_total", "New items emitted by source")
+POLL_SECONDS = metrics.histogram("poller_poll_seconds", "Wall time per poll")
+
+
+class PollError(Exception):
+    """A poll that should be retried with backoff"""
+
+
+class BudgetedSession(requests.Session):
+    """Session whose requests share one in-flight budget (a bounded semaphore)"""
+
+    budget = None
+
+    def send(self, request, **kwargs):
+        with self.budget:
+            return super().send(request, **kwargs)
+
+
+def next_interval(interval, rate, target_new, min_interval, max_interval):
+    """Interval aiming for target_new items per poll at rate items/s, moving at most MAX_STEP"""
+    wanted = target_new / rate if rate > 0 else interval * MAX_STEP
+    wanted = min(max(wanted, interval / MAX_STEP), interval * MAX_STEP)
+    return min(max(wanted, min_interval), max_interval)
+
+
+def backoff_delay(failures, min_interval, max_interval):
+    """Jittered exponential backoff after the failures-th consecutive failure"""
+    return min(max_interval, min_interval * 2 ** (failures - 1)) * (0.5 + random.random())
+
+
+class Source:
+    """One polled list or feed plus its scheduling state"""
+
+    def __init__(self, name, min_interval, max_interval, target_new):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_new = target_new
+        self.interval = min_interval
+        self.rate = None           # smoothed new items per second
+        self.failures = 0
+        self.next_due = 0.0
+        self.last_poll = None
+        self.seen = deque(maxlen=SEEN_LIMIT)
+        self._seen_set = set()
+        self._lock = threading.Lock()  # seen is snapshotted by checkpoints mid-poll
+
+    def is_new(self, key):
+        return key not in self._seen_set
+
+    def mark_seen(self, keys):
+        with self._lock:
+            for key in keys:
+                if key in self._seen_set:
+                    continue
+                if len(self.seen) == self.seen.maxlen:
+                    self._seen_set.discard(self.seen[0])
+                self.seen.append(key)
+                self._seen_set.add(key)
+
+    def poll(self, context):
+        """Fetch; returns new posts (already marked seen). Raises PollError to back off"""
+        raise NotImplementedError
+
+    def observe(self, new_count, now):
+        """Fold a successful poll into the rate estimate; returns the delay until the next poll"""
+        self.failures = 0
+        if self.last_poll is not None:  # a first poll's backlog says nothing about the rate
+            observed = new_count / max(now - self.last_poll, 1e-6)
+            self.rate = observed if self.rate is None else (
+                RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * self.rate)
+            self.interval = next_interval(self.interval, self.rate, self.target_new,
+                                          self.min_interval, self.max_interval)
+        self.last_poll = now
+        return self.interval
+
+    def failed(self):
+        self.failures += 1
+        return backoff_delay(self.failures, self.min_interval, self.max_interval)
+
+    def state(self):
+        with self._lock:
+            seen = list(self.seen)
+        return {'interval': self.interval, 'rate': self.rate, 'failures': self.failures,
+                'next_due': self.next_due, 'last_poll': self.last_poll, 'seen': seen}
+
+    def restore(self, state):
+        self.interval = min(max(state.get('interval', self.interval), self.min_interval), self.max_interval)
+        self.rate = state.get('rate')
+        self.failures = state.get('failures', 0)
+        self.next_due = state.get('next_due', 0.0)
+        self.last_poll = state.get('last_poll')
+        self.mark_seen(state.get('seen', []))
+
+
+class HNListSource(Source):
+    """An HN id list (askstories, newstories, ...); new = ids not seen before
+
+    maxitem is checked first (one tiny request): if it hasn't moved since
+    this source's last poll nothing was posted, and the list isn't fetched.
+    Kept per source, since the cache's shared maxitem mark is advanced by
+    whichever list polled last.
+    """
+
+    def __init__(self, kind, min_interval, max_interval, target_new):
+        super().__init__(f"hn:{kind}", min_interval, max_interval, target_new)
+        self.kind = kind
+        self.maxitem = None
+
+    def poll(self, context):
+        session, base_url = context['session'], context['hn_base_url']
+        maxitem = get_json(session, f"{base_url}/maxitem.json")
+        if maxitem is None:
+            raise PollError("maxitem unavailable")
+        if maxitem == self.maxitem:
+            return []
+        ids = get_json(session, f"{base_url}/{self.kind}.json")
+        if ids is None:
+            raise PollError(f"{self.kind} list unavailable")
+        fresh = [item_id for item_id in ids if self.is_new(item_id)]
+        items, _ = fetch_items_incremental(fresh, context['cache'], session=session, base_url=base_url,
+                                           max_workers=context['budget'])
+        # Failed fetches stay unseen, so the next poll picks them up
+        posts, done = [], []
+        for item_id, item in zip(fresh, items):
+            if item is None:
+                continue
+            done.append(item_id)
+            if item.get('type') == 'story' and not item.get('deleted') and not item.get('dead'):
+                posts.append(format_post_for_extraction(item))
+        self.mark_seen(done)
+        if len(done) == len(fresh):
+            self.maxitem = maxitem
+        return posts
+
+    def state(self):
+        return dict(super().state(), maxitem=self.maxitem)
+
+    def restore(self, state):
+        super().restore(state)
+        self.maxitem = state.get('maxitem')
+
+
+class FeedSource(Source):
+    """A subreddit feed, fetched with conditional GET; new = entries not seen before"""
+
+    def __init__(self, subreddit, min_interval, max_interval, target_new):
+        super().__init__(f"reddit:{subreddit}", min_interval, max_interval, target_new)
+        self.subreddit = subreddit
+
+    def poll(self, context):
+        url = feed_url(self.subreddit, context['reddit_base_url'])
+        result = fetch_feed(context['session'], url, store=context['feed_state'])
+        if result['error']:
+            raise PollError(result['error'])
+        posts = []
+        for entry in result['entries']:
+            key = entry_key(entry)
+            if self.is_new(key):
+                posts.append(Post.from_dict(dict(entry, feed=url, source="reddit")))
+        self.mark_seen(entry_key(post) for post in posts)
+        return posts
+
+
+class Poller:
+    """Runs every source on its own adaptive schedule until stopped"""
+
+    def __init__(self, sources, sink=None, budget=DEFAULT_BUDGET, state_path=DEFAULT_STATE_PATH,
+                 cache=None, feed_state=None, hn_base_url=HN_API, reddit_base_url=REDDIT_BASE, log=print):
+        self.sources = sources
+        self.sink = sink
+        self.budget = budget
+        self.state_path = state_path
+        self.log = log
+        session = make_session(budget, session_class=BudgetedSession)
+        session.budget = threading.BoundedSemaphore(budget)
+        self.context = {
+            'session': session,
+            'cache': cache,
+            'feed_state': feed_state,
+            'hn_base_url': hn_base_url,
+            'reddit_base_url': reddit_base_url,
+            'budget': budget,
+        }
+        self._sink_lock = threading.Lock()
+        self._stop = None
+        self._dirty = False
+
+    def load_state(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        with open(self.state_path, "r") as f:
+            saved = json.load(f)
+        for source in self.sources:
+            if source.name in saved:
+                source.restore(saved[source.name])
+
+    def save_state(self):
+        if not self.state_path:
+            return
+        snapshot = {source.name: source.state() for source in self.sources}
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, self.state_path)
+        if self.context['feed_state'] is not None:
+            self.context['feed_state'].save()
+        self._dirty = False
+
+    def stop(self):
+        if self._stop is not None:
+            self._stop.set()
+
+    async def _sleep(self, delay):
+        """Wait delay seconds; True if stop was requested meanwhile"""
+        try:
+            await asyncio.wait_for(self._stop.wait(), timeout=max(0.0, delay))
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    def _poll_once(self, source):
+        posts = source.poll(self.context)
+        if posts and self.sink is not None:
+            with self._sink_lock:
+                self.sink(source, posts)
+        return posts
+
+    async def _run_source(self, source):
+        if await self._sleep(source.next_due - time.time()):
+            return
+        while True:
+            start = time.perf_counter()
+            try:
+                posts = await asyncio.to_thread(self._poll_once, source)
+            except PollError as e:
+                delay = source.failed()
+                POLLS.inc(source=source.name, outcome="error")
+                self.log(f"⚠️  {source.name}: {e} (failure {source.failures}, retry in {delay:.0f}s)")
+            else:
+                delay = source.observe(len(posts), time.time())
+                POLLS.inc(source=source.name, outcome="new" if posts else "empty")
+                NEW_ITEMS.inc(len(posts), source=source.name)
+                if posts:
+                    self.log(f"🔄 {source.name}: +{len(posts)} new, next poll in {delay:.0f}s")
+            POLL_SECONDS.observe(time.perf_counter() - start, source=source.name)
+            source.next_due = time.time() + delay
+            self._dirty = True
+            if await self._sleep(delay):
+                return
+
+    async def _checkpoint(self):
+        while not await self._sleep(SAVE_EVERY):
+            if self._dirty:
+                await asyncio.to_thread(self.save_state)
+
+    async def run(self, run_for=None):
+        """Poll until SIGINT/SIGTERM, stop(), or run_for seconds; then persist state"""
+        self._stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        # One thread per source: a slow poll never delays another source's schedule
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=len(self.sources) + 2))
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, self._stop.set)
+            except (NotImplementedError, RuntimeError):  # not the main thread / platform
+                pass
+        if run_for is not None:
+            loop.call_later(run_for, self._stop.set)
+
+        self.load_state()
+        tasks = [asyncio.create_task(self._run_source(source)) for source in self.sources]
+        tasks.append(asyncio.create_task(self._checkpoint()))
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.save_state()
+            self.context['session'].close()
+
+
+def store_sink(store):
+    """Sink appending new posts to a post_store.PostStore"""
+    def sink(source, posts):
+        store.append(posts)
+    return sink
+
+
+def build_sources(hn_kinds, subreddits, scale=1.0):
+    """Sources with the default cadences (scale multiplies every interval)"""
+    sources = []
+    for kind in hn_kinds:
+        low, high, target = HN_CADENCES.get(kind, HN_CADENCES["askstories"])
+        sources.append(HNListSource(kind, low * scale, high * scale, target))
+    for subreddit in subreddits:
+        low, high, target = FEED_CADENCE
+        sources.append(FeedSource(subreddit, low * scale, high * scale, target))
+    return sources
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adaptive multi-source polling daemon")
+    parser.add_argument("--hn", nargs="*", default=["askstories", "topstories", "newstories"])
+    parser.add_argument("--subreddits", nargs="*", default=["Entrepreneur", "SaaS", "startups", "smallbusiness"])
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="HTTP requests in flight, all sources")
+    parser.add_argument("--store", default="posts.store", help="post store for new posts")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every cadence (testing)")
+    parser.add_argument("--run-for", type=float, help="stop after this many seconds")
+    parser.add_argument("--hn-base-url", default=HN_API)
+    parser.add_argument("--reddit-base-url", default=REDDIT_BASE)
+    parser.add_argument("--metrics", help="write metrics here on exit (.prom: Prometheus text, else JSON lines)")
+    args = parser.parse_args()
+    ratelimit.shared()  # one request budget per host for every worker on this machine
+
+    sources = build_sources(args.hn, args.subreddits, args.scale)
+    feed_state = FeedStateStore()
+    with ItemCache() as cache:
+        poller = Poller(sources, sink=store_sink(PostStore(args.store)), budget=args.budget,
+                        state_path=args.state, cache=cache, feed_state=feed_state,
+                        hn_base_url=args.hn_base_url, reddit_base_url=args.reddit_base_url)
+        print(f"📡 Polling {len(sources)} sources (budget {args.budget} requests in flight); Ctrl-C to stop")
+        asyncio.run(poller.run(run_for=args.run_for))
+
+    print(f"💾 State saved to {args.state}")
+    for source in sources:
+        rate = f"{source.rate * 3600:.1f}/h" if source.rate is not None else "n/a"
+        print(f"   {source.name:<28} every {source.interval:>6.0f}s  new-item rate {rate}")
+    if args.metrics:
+        metrics.dump(args.metrics)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Day-partitioned post store for windowed queries over months of history
+
+Posts from every source (HN, Reddit feeds, ...) are normalized to one
+record shape (FIELDS) with created_utc as a UTC epoch int (timestamps.py),
+and appended to one columnar store (columnar.py) per UTC day:
+
+    posts.store/
+        manifest.json       {day: rows, min/max created_utc, max score, rows per source}
+        2026-02-09/         ColumnStore
+        2026-02-10/         ...
+
+A query like "last 7 days, score >= 10, source in {hn, reddit}" picks
+partitions from the manifest alone (day range, max score and sources act
+as zone maps), then filters rows on the created_utc / score / source
+columns (memory-mapped) and reads the requested columns only for rows
+that match. Partitions outside the window are never opened.
+
+A post always lands in the same partition (its creation day), so
+re-ingesting is de-duplicated per partition on source:id; the first
+write wins.
+
+Usage:
+    python post_store.py ingest posts.ndjson|posts.json [store]
+    python post_store.py query [store] [--days 7] [--min-score 10] [--source hn reddit] [--limit 20]
+"""
+import argparse
+import json
+import os
+import time
+
+from columnar import ColumnStore
+from records import Post, load
+from timestamps import DAY, day_of, iso_utc, to_epoch
+
+DEFAULT_STORE_PATH = "posts.store"
+MANIFEST_FILE = "manifest.json"
+
+# Field -> default; defaults keep every column's type fixed across sources
+FIELDS = {
+    'key': "",
+    'source': "",
+    'id': "",
+    'title': "",
+    'content': "",
+    'url': "",
+    'author': "",
+    'feed': "",
+    'score': 0,
+    'comments': 0,
+    'created_utc': 0,
+}
+FILTER_COLUMNS = ('created_utc', 'score', 'source')
+
+
+def normalize(post, source=None):
+    """Store record for a post (HN-formatted post, feed entry, ...); None if it has no date"""
+    created = post.get('created_utc')
+    if created is None:
+        created = to_epoch(post.get('published') or post.get('time'))
+    if created is None:
+        return None
+    source = source or post.get('source') or ("reddit" if post.get('feed') else "hn")
+    post_id = str(post.get('id') or post.get('link') or post.get('url') or "")
+    record = {field: post.get(field, default) for field, default in FIELDS.items()}
+    record.update(
+        key=f"{source}:{post_id}",
+        source=source,
+        id=post_id,
+        url=post.get('url') or post.get('link') or "",
+        content=post.get('content') or post.get('summary') or "",
+        created_utc=int(created),
+    )
+    for field, default in FIELDS.items():
+        if record[field] is None:
+            record[field] = default
+        elif isinstance(default, int):
+            record[field] = int(record[field])
+        else:
+            record[field] = str(record[field])
+    return record
+
+
+class PostStore:
+    """Directory of per-day ColumnStores plus a manifest; see module docstring"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self.manifest = {}
+        self._keys = {}
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            with open(manifest_path, "r") as f:
+                self.manifest = json.load(f)
+
+    def __len__(self):
+        return sum(part['rows'] for part in self.manifest.values())
+
+    def partitions(self):
+        """Days present, oldest first"""
+        return sorted(self.manifest)
+
+    def partition(self, day):
+        return ColumnStore(os.path.join(self.path, day))
+
+    def _partition_keys(self, day):
+        keys = self._keys.get(day)
+        if keys is None:
+            keys = set()
+            if day in self.manifest:
+                column = self.partition(day).column('key')
+                try:
+                    keys.update(column)
+                finally:
+                    column.close()
+            self._keys[day] = keys
+        return keys
+
+    # -- writing -------------------------------------------------------
+
+    def append(self, posts, source=None):
+        """Add posts; returns {'added', 'duplicates', 'undated'}"""
+        by_day = {}
+        counts = {'added': 0, 'duplicates': 0, 'undated': 0}
+        for post in posts:
+            record = normalize(post, source)
+            if record is None:
+                counts['undated'] += 1
+                continue
+            by_day.setdefault(day_of(record['created_utc']), []).append(record)
+
+        for day, records in by_day.items():
+            keys = self._partition_keys(day)
+            fresh = []
+            for record in records:
+                if record['key'] in keys:
+                    counts['duplicates'] += 1
+                    continue
+                keys.add(record['key'])
+                fresh.append(record)
+            if not fresh:
+                continue
+            self.partition(day).append(fresh)
+            self._update_manifest(day, fresh)
+            counts['added'] += len(fresh)
+
+        if counts['added']:
+            self._save_manifest()
+        return counts
+
+    def _update_manifest(self, day, records):
+        part = self.manifest.setdefault(day, {'rows': 0, 'min_created': None, 'max_created': None,
+                                              'max_score': None, 'sources': {}})
+        part['rows'] += len(records)
+        created = [r['created_utc'] for r in records]
+        scores = [r['score'] for r in records]
+        part['min_created'] = min(created + ([part['min_created']] if part['min_created'] is not None else []))
+        part['max_created'] = max(created + ([part['max_created']] if part['max_created'] is not None else []))
+        part['max_score'] = max(scores + ([part['max_score']] if part['max_score'] is not None else []))
+        for record in records:
+            part['sources'][record['source']] = part['sources'].get(record['source'], 0) + 1
+
+    def _save_manifest(self):
+        # Written after the partition appends it describes; a crash in
+        # between leaves rows that queries don't see yet, never the reverse
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = os.path.join(self.path, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, os.path.join(self.path, MANIFEST_FILE))
+
+    # -- reading -------------------------------------------------------
+
+    def candidate_partitions(self, since=None, until=None, min_score=None, sources=None):
+        """Days whose manifest entry can hold a match, oldest first"""
+        days = []
+        for day in self.partitions():
+            part = self.manifest[day]
+            if since is not None and part['max_created'] < since:
+                continue
+            if until is not None and part['min_created'] >= until:
+                continue
+            if min_score is not None and part['max_score'] < min_score:
+                continue
+            if sources is not None and not sources.intersection(part['sources']):
+                continue
+            days.append(day)
+        return days
+
+    def query(self, since=None, until=None, min_score=None, sources=None, columns=None):
+        """Yield records with since <= created_utc < until, score >= min_score, source in sources
+
+        columns limits the fields read (all FIELDS by default).
+        """
+        sources = set(sources) if sources is not None else None
+        for day in self.candidate_partitions(since, until, min_score, sources):
+            part = self.manifest[day]
+            store = self.partition(day)
+            rows = part['rows']
+            filters = store.read(FILTER_COLUMNS)
+            try:
+                created, score, source = (filters[name] for name in FILTER_COLUMNS)
+                whole_day = ((since is None or part['min_created'] >= since)
+                             and (until is None or part['max_created'] < until))
+                matches = []
+                for i in range(rows):
+                    if not whole_day:
+                        ts = created[i]
+                        if (since is not None and ts < since) or (until is not None and ts >= until):
+                            continue
+                    if min_score is not None and score[i] < min_score:
+                        continue
+                    if sources is not None and source[i] not in sources:
+                        continue
+                    matches.append(i)
+            finally:
+                for column in filters.values():
+                    column.close()
+            if not matches:
+                continue
+
+            opened = store.read(columns or list(FIELDS))
+            try:
+                for i in matches:
+                    yield {name: column[i] for name, column in opened.items()}
+            finally:
+                for column in opened.values():
+                    column.close()
+
+    def window(self, days, now=None, **filters):
+        """query() over the last days days (sliding, measured from now)"""
+        now = int(now or time.time())
+        return self.query(since=now - int(days * DAY), until=None, **filters)
+
+
+def load_posts(path):
+    """Posts (records.Post) from an NDJSON (hn_pipeline output) or JSON array file"""
+    return load(path, Post)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Day-partitioned post store")
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="add posts from a JSON / NDJSON file")
+    ingest.add_argument("posts")
+    ingest.add_argument("store", nargs="?", default=DEFAULT_STORE_PATH)
+    query = sub.add_parser("query", help="windowed query")
+    query.add_argument("store", nargs="?", default=DEFAULT_STORE_PATH)
+    query.add_argument("--days", type=float, default=7)
+    query.add_argument("--min-score", type=int)
+    query.add_argument("--source", nargs="+")
+    query.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    store = PostStore(args.store)
+    if args.command == "ingest":
+        counts = store.append(load_posts(args.posts))
+        print(f"💾 {counts['added']} added, {counts['duplicates']} already stored, {counts['undated']} without a date "
+              f"({len(store)} posts in {len(store.partitions())} partitions)")
+        return
+
+    start = time.perf_counter()
+    now = int(time.time())
+    days = store.candidate_partitions(since=now - int(args.days * DAY), min_score=args.min_score,
+                                      sources=set(args.source) if args.source else None)
+    posts = list(store.window(args.days, now=now, min_score=args.min_score, sources=args.source,
+                              columns=['source', 'title', 'score', 'created_utc', 'url']))
+    elapsed = time.perf_counter() - start
+    print(f"🔎 {len(posts)} posts from {len(days)}/{len(store.partitions())} partitions in {elapsed * 1000:.1f}ms")
+    for post in sorted(posts, key=lambda p: -p['score'])[:args.limit]:
+        print(f"   [{post['source']:<6} {post['score']:>4}] {iso_utc(post['created_utc'])[:16]}  {post['title'][:70]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+Token-budgeted prompt assembly for extraction
+
+Every post used to go into the prompt whole, URL line included, so one
+long thread could dominate a chunk's input tokens (and its time to first
+token). Posts are now compacted before they are rendered:
+- HTML and entities are reduced to text (html_text), URLs become their
+  domain, and runs of whitespace collapse to one space
+- a post over max_post_tokens is trimmed sentence by sentence: the first
+  sentence stays (it says what the post is about), then sentences are
+  kept by triage score (pain and question terms) until the budget is
+  spent, and the survivors are put back in their original order with
+  " … " marking cuts. Same text, same budget, same output, so the
+  extraction cache and checkpoints keep matching
+- posts in a chunk are ordered by id, and the template keeps its fixed
+  instructions ahead of the post list, so identical work renders an
+  identical prompt and every prompt shares a cacheable prefix
+
+Token counts are local estimates (estimate_tokens): one per word piece,
+number group and punctuation mark, plus one per extra six letters of a
+long word. Close enough to budget with; the API's usage numbers remain
+the source of truth (extract_tokens_total).
+
+    builder = PromptBuilder(PROMPT_TEMPLATE, max_post_tokens=400)
+    prompt = builder.build(posts)       # .text, .tokens, .posts (per-post token report)
+
+Usage: python prompt_builder.py [posts.json] [--max-post-tokens 400]   (token report for a corpus)
+"""
+import argparse
+import hashlib
+import json
+import re
+
+from html_text import html_to_text
+from triage import Triage
+
+DEFAULT_POST_TOKENS = 400
+MEMO_LIMIT = 10000
+ELLIPSIS = " … "
+
+_PIECE = re.compile(r"[^\W\d_]+|\d{1,3}|[^\w\s]|_")
+_URL = re.compile(r"https?://(?:www\.)?([^/\s)\]>\"']+)[^\s)\]>\"']*")
+_SPACE = re.compile(r"\s+")
+# Sentence ends: .!? followed by space, or glued to a capital (old <p>-stripped text: "done.Then")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|(?<=[a-z0-9][.!?])(?=[A-Z])|\s*\n\s*")
+
+
+def estimate_tokens(text):
+    """Fast local estimate of the tokens text costs"""
+    pieces = _PIECE.findall(text)
+    return len(pieces) + sum((len(piece) - 1) // 6 for piece in pieces if len(piece) > 6)
+
+
+def compact_text(text):
+    """Text with HTML reduced, URLs replaced by their domain and whitespace collapsed
+
+    Line breaks survive as sentence boundaries for trimming; callers
+    flatten them when rendering.
+    """
+    if '<' in text or '&' in text:
+        text = html_to_text(text)
+    text = _URL.sub(lambda match: match.group(1), text)
+    return "\n".join(_SPACE.sub(" ", line).strip() for line in text.splitlines() if line.strip())
+
+
+def split_sentences(text):
+    return [sentence for sentence in _SENTENCE_END.split(text) if sentence and sentence.strip()]
+
+
+def trim_text(text, budget, triage):
+    """Deterministically cut text to about budget tokens, keeping the sentences that carry pain signals"""
+    if estimate_tokens(text) <= budget:
+        return text
+    sentences = split_sentences(text)
+    costs = [estimate_tokens(sentence) + 1 for sentence in sentences]  # +1: the ellipsis a cut may add
+    kept = {0}
+    used = costs[0]
+    ranked = sorted(range(1, len(sentences)), key=lambda i: (-triage.score(sentences[i])[0], i))
+    for i in ranked:
+        if used + costs[i] <= budget:
+            kept.add(i)
+            used += costs[i]
+
+    if used > budget:  # the first sentence alone is over budget: cut it by words
+        words, room = [], budget
+        for word in sentences[0].split():
+            room -= estimate_tokens(word)
+            if room < 0:
+                break
+            words.append(word)
+        return " ".join(words) + ELLIPSIS.rstrip()
+
+    parts, previous = [], -1
+    for i in sorted(kept):
+        if parts and i != previous + 1:
+            parts.append(ELLIPSIS.strip())
+        parts.append(sentences[i])
+        previous = i
+    if previous != len(sentences) - 1:
+        parts.append(ELLIPSIS.strip())
+    return " ".join(parts)
+
+
+class Prompt:
+    """A rendered prompt plus its token report"""
+
+    def __init__(self, text, posts):
+        self.text = text
+        self.tokens = estimate_tokens(text)
+        self.posts = posts  # [{'id', 'tokens', 'original_tokens', 'trimmed'}] in prompt order
+
+    @property
+    def saved_tokens(self):
+        return sum(post['original_tokens'] - post['tokens'] for post in self.posts)
+
+
+class PromptBuilder:
+    """Renders posts compactly into a template with a {posts} slot; see module docstring"""
+
+    def __init__(self, template, max_post_tokens=DEFAULT_POST_TOKENS, triage=None):
+        self.template = template
+        self.max_post_tokens = max_post_tokens
+        self.triage = triage or Triage()
+        self.overhead = estimate_tokens(template.replace("{posts}", ""))
+        self._rendered = {}
+
+    @property
+    def version(self):
+        """Changes with the template or the compaction settings (cache / checkpoint keys)"""
+        settings = f"{self.template}\n{self.max_post_tokens}\n{sorted(self.triage.lexicon.items())}"
+        return hashlib.sha1(settings.encode("utf-8")).hexdigest()[:12]
+
+    def render_post(self, post):
+        """(rendered text, report dict) for one post; memoized per id and text"""
+        content = post.get('content') or post.get('summary') or ""
+        memo_key = (post['id'], post.get('title', ''), content)
+        cached = self._rendered.get(memo_key)
+        if cached is not None:
+            return cached
+
+        title = compact_text(post.get('title', '')).replace("\n", " ")
+        body = compact_text(content)
+        original = f"POST {post['id']}: {post.get('title', '')}\nContent: {content}\nURL: {post.get('url', '')}\n"
+        trimmed = body
+        if self.max_post_tokens is not None:
+            trimmed = trim_text(body, self.max_post_tokens, self.triage)
+        text = f"POST {post['id']}: {title}\n{trimmed.replace(chr(10), ' ')}\n"
+        report = {'id': post['id'], 'tokens': estimate_tokens(text), 'original_tokens': estimate_tokens(original),
+                  'trimmed': trimmed != body}
+        if len(self._rendered) >= MEMO_LIMIT:
+            self._rendered.clear()
+        self._rendered[memo_key] = (text, report)
+        return text, report
+
+    def order(self, posts):
+        """Posts in prompt order (by id, as text, so int and string ids mix)"""
+        return sorted(posts, key=lambda post: str(post['id']))
+
+    def build(self, posts):
+        """Prompt for a chunk of posts"""
+        rendered = [self.render_post(post) for post in self.order(posts)]
+        text = self.template.format(posts="\n".join(text for text, _ in rendered))
+        return Prompt(text, [report for _, report in rendered])
+
+    def chunk(self, posts, max_input_tokens=6000, max_posts=10):
+        """Greedily split posts (in prompt order) into chunks that fit the input token budget
+
+        A single post larger than the budget still gets a chunk of its own.
+        """
+        chunks, current, used = [], [], self.overhead
+        for post in self.order(posts):
+            cost = self.render_post(post)[1]['tokens'] + 1
+            if current and (used + cost > max_input_tokens or len(current) >= max_posts):
+                chunks.append(current)
+                current, used = [], self.overhead
+            current.append(post)
+            used += cost
+        if current:
+            chunks.append(current)
+        return chunks
+
+
+def main():
+    from extract_engine import PROMPT_TEMPLATE  # the engine imports this module
+
+    parser = argparse.ArgumentParser(description="Token report for prompts built from a post corpus")
+    parser.add_argument("posts", nargs="?", default="hackernews_posts_test.json")
+    parser.add_argument("--max-post-tokens", type=int, default=DEFAULT_POST_TOKENS)
+    args = parser.parse_args()
+
+    with open(args.posts, "r") as f:
+        posts = json.load(f)
+    builder = PromptBuilder(PROMPT_TEMPLATE, max_post_tokens=args.max_post_tokens)
+    print(f"{'post':>12} {'before':>7} {'after':>6}")
+    for chunk in builder.chunk(posts):
+        prompt = builder.build(chunk)
+        for post in prompt.posts:
+            print(f"{post['id']:>12} {post['original_tokens']:>7} {post['tokens']:>6}{'  trimmed' if post['trimmed'] else ''}")
+        print(f"{'chunk':>12} {prompt.tokens + prompt.saved_tokens:>7} {prompt.tokens:>6}   ({len(chunk)} posts)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Shared token-bucket rate limits per host, across threads, tasks and processes
+
+Every worker on a machine takes its tokens from the same SQLite file, so
+running four ingest processes spends one Reddit budget, not four:
+- one named bucket per host (DEFAULT_LIMITS, or configure()): a refill
+  rate in requests per second plus a burst size
+- acquiring is one short BEGIN IMMEDIATE transaction that refills the
+  bucket, takes a token and, when the bucket is empty, reserves the next
+  one and returns how long until it's due. Waiters queue up one interval
+  apart instead of all waking when a token comes back, so aggregate
+  throughput sits just under the limit instead of bursting into bans
+- penalize() (a Retry-After, a 429, Reddit's HTML block page) pushes the
+  bucket's next token out for every process at once; callers already
+  sleeping on a reservation aren't recalled
+- path=None keeps the buckets in memory (one process only)
+
+Rates and bursts are code config, not stored: each process configures the
+buckets it uses; only token counts are shared. Hosts without a bucket
+aren't limited.
+
+Fetch points call throttle(url) / backoff(url, status, retry_after) next
+to hn_fetch.host_limit; they act on the process-wide limiter installed by
+shared() and do nothing when none is. Time spent waiting goes to the
+ratelimit_wait_seconds histogram, pauses to ratelimit_penalties_total.
+
+    ratelimit.shared()                  # once, at startup (CLI entry points)
+    ratelimit.throttle(url)             # before each request
+    limiter.acquire("api.anthropic.com")
+    await limiter.acquire_async("www.reddit.com")
+
+Usage: python ratelimit.py [path]   (show bucket state)
+"""
+import asyncio
+import sqlite3
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import metrics
+
+DEFAULT_PATH = "ratelimit.sqlite3"
+
+# host -> (requests per second, burst)
+DEFAULT_LIMITS = {
+    "hacker-news.firebaseio.com": (100.0, 200),  # no published limit; stay a polite client
+    "www.reddit.com": (10 / 60, 5),  # unauthenticated feeds: ~10 requests a minute
+    "old.reddit.com": (10 / 60, 5),
+    "api.anthropic.com": (50 / 60, 10),  # ExtractionEngine reconfigures from requests_per_minute
+}
+DEFAULT_COOLDOWN = 5.0  # 429 without a Retry-After
+BLOCK_COOLDOWN = 60.0  # HTML block page instead of a feed
+
+WAIT_SECONDS = metrics.histogram("ratelimit_wait_seconds", "Time spent waiting for a rate-limit token, by bucket")
+PENALTIES = metrics.counter("ratelimit_penalties_total", "Bucket pauses from Retry-After / 429 / block pages")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    stamp REAL NOT NULL
+);
+"""
+
+
+def host_of(url):
+    return urlsplit(url).netloc
+
+
+def retry_after_seconds(value, now=None):
+    """Seconds a Retry-After header asks for (delta-seconds or HTTP date); None if absent or unparseable"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - (now or time.time()))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Named token buckets in one SQLite file; see module docstring"""
+
+    def __init__(self, path=DEFAULT_PATH, limits=None):
+        self.path = path
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self._conn = sqlite3.connect(path or ":memory:", timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self.waited = 0.0
+        self.acquired = 0
+        self.penalties = 0
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def configure(self, name, rate, burst=None):
+        """Set a bucket's refill rate (tokens per second) and burst (default: one second's worth, at least 1)"""
+        self.limits[name] = (float(rate), max(1.0, float(burst if burst is not None else rate)))
+
+    def reserve(self, name, tokens=1, max_wait=None, now=None):
+        """Take tokens now or reserve them; returns seconds until they're due
+
+        Returns 0.0 for unlimited names, or None (reserving nothing) when
+        the wait would exceed max_wait.
+        """
+        limit = self.limits.get(name)
+        if limit is None:
+            return 0.0
+        rate, burst = limit
+        with self._lock:
+            now = now or time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT tokens, stamp FROM buckets WHERE name = ?", (name,)).fetchone()
+                available, stamp = row if row is not None else (burst, now)
+                if now > stamp:
+                    available = min(burst, available + (now - stamp) * rate)
+                    stamp = now
+                wait = (stamp - now) + max(0.0, tokens - available) / rate
+                if max_wait is not None and wait > max_wait:
+                    self._conn.execute("ROLLBACK")
+                    return None
+                self._conn.execute("INSERT OR REPLACE INTO buckets (name, tokens, stamp) VALUES (?, ?, ?)",
+                                   (name, available - tokens, stamp))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.acquired += tokens
+            self.waited += wait
+        return wait
+
+    def acquire(self, name, tokens=1, timeout=None):
+        """Block until tokens are available; False (nothing taken) if that's more than timeout away"""
+        wait = self.reserve(name, tokens, max_wait=timeout)
+        if wait is None:
+            return False
+        if name in self.limits:
+            WAIT_SECONDS.observe(wait, bucket=name)
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, name, tokens=1, timeout=None):
+        """acquire() for asyncio tasks: the reservation runs in a thread, the wait is asyncio.sleep"""
+        wait = await asyncio.to_thread(self.reserve, name, tokens, timeout)
+        if wait is None:
+            return False
+        if name in self.limits:
+            WAIT_SECONDS.observe(wait, bucket=name)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return True
+
+    def penalize(self, name, delay, now=None):
+        """Hand out no token from name's bucket for delay seconds (every process)"""
+        if name not in self.limits or not delay or delay <= 0:
+            return
+        with self._lock:
+            now = now or time.time()
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("INSERT OR IGNORE INTO buckets (name, tokens, stamp) VALUES (?, 0, ?)",
+                                   (name, now))
+                self._conn.execute("UPDATE buckets SET tokens = MIN(tokens, 0), stamp = MAX(stamp, ?) WHERE name = ?",
+                                   (now + delay, name))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self.penalties += 1
+        PENALTIES.inc(bucket=name)
+
+    def backoff(self, name, status=None, retry_after=None):
+        """Penalize name after a response: honours Retry-After on 429 / 503, DEFAULT_COOLDOWN for a bare 429"""
+        delay = retry_after_seconds(retry_after)
+        if delay is None and status == 429:
+            delay = DEFAULT_COOLDOWN
+        # Retry-After also rides on 3xx / 2xx responses; only overload statuses are a signal to slow down
+        if status in (429, 503):
+            self.penalize(name, delay)
+
+    def state(self, now=None):
+        """{name: {'rate', 'burst', 'tokens', 'paused_for'}} for every configured bucket"""
+        now = now or time.time()
+        with self._lock:
+            rows = dict((name, (tokens, stamp)) for name, tokens, stamp in
+                        self._conn.execute("SELECT name, tokens, stamp FROM buckets"))
+        state = {}
+        for name, (rate, burst) in sorted(self.limits.items()):
+            tokens, stamp = rows.get(name, (burst, now))
+            if now > stamp:
+                tokens = min(burst, tokens + (now - stamp) * rate)
+            state[name] = {'rate': rate, 'burst': burst, 'tokens': round(tokens, 2),
+                           'paused_for': round(max(0.0, stamp - now), 2)}
+        return state
+
+    def stats(self):
+        return {'acquired': self.acquired, 'waited_seconds': round(self.waited, 3), 'penalties': self.penalties,
+                'buckets': len(self.limits)}
+
+
+# -- process-wide limiter --------------------------------------------------
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared(path=DEFAULT_PATH, limits=None):
+    """Open (once per process) the limiter that throttle() / backoff() use"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = RateLimiter(path, limits)
+        return _shared
+
+
+def current():
+    """The process-wide limiter, or None if shared() was never called"""
+    return _shared
+
+
+def throttle(url, timeout=None):
+    """Wait for a token for url's host from the process-wide limiter (no-op without one)"""
+    limiter = _shared
+    return limiter.acquire(host_of(url), timeout=timeout) if limiter is not None else True
+
+
+def backoff(url, status=None, retry_after=None, delay=None):
+    """Pause url's host in the process-wide limiter after a 429 / 503 / block page (no-op without one)"""
+    limiter = _shared
+    if limiter is None:
+        return
+    if delay is not None:
+        limiter.penalize(host_of(url), delay)
+    else:
+        limiter.backoff(host_of(url), status, retry_after)
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_PATH
+    with RateLimiter(path) as limiter:
+        print(f"{'bucket':<30} {'rate/s':>8} {'burst':>6} {'tokens':>7} {'paused':>7}")
+        for name, bucket in limiter.state().items():
+            print(f"{name:<30} {bucket['rate']:>8.2f} {bucket['burst']:>6.0f} {bucket['tokens']:>7.2f} "
+                  f"{bucket['paused_for']:>6.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Typed, compact records for posts and extraction results
+
+Post and ExtractionResult mirror lib/types.ts. Every stage used to pass
+plain dicts around, each one carrying its own hash table of repeated
+string keys. These records keep:
+- one __slots__ attribute per field: no per-record dict, about a third
+  of the memory of the equivalent dict
+- interned author / source / feed strings, so a million posts from a
+  few thousand authors share a few thousand string objects
+- an `extra` dict (None when empty) for fields outside the schema
+  (a comment's story_id / parent / depth, a feed entry's feed, ...)
+
+They read like the dicts they replace (post['title'], post.get('feed'),
+dict(post)), so stages written against dicts keep working. A field that
+is None counts as missing, like a missing JSON key: it's left out of
+to_dict() and post['x'] raises KeyError.
+
+dumps / loads / dump / load are the JSON codecs: orjson when it's
+installed (records serialized through to_dict), the json module
+otherwise, with the same output either way (UTF-8, no ASCII escaping).
+lib/types.ts's age_hours isn't stored; timestamps.age_hours(created_utc)
+computes it when needed, so saved posts don't go stale.
+
+    post = Post.from_dict(raw)          # or Post(id=..., title=..., ...)
+    text = dumps(posts)                 # str; dump(posts, path, indent=2)
+    posts = load(path, Post)            # JSON array or NDJSON file -> [Post]
+
+Usage: python records.py posts.json|results.json   (load and report record memory)
+"""
+import json
+import sys
+from collections.abc import Mapping
+
+try:
+    import orjson
+except ImportError:  # optional: the stdlib json module is the fallback
+    orjson = None
+
+_intern = sys.intern
+
+
+def intern(value):
+    """sys.intern for strings, anything else unchanged"""
+    return _intern(value) if type(value) is str else value
+
+
+class Record:
+    """Base for slot records: mapping-style access over FIELDS plus extra"""
+
+    __slots__ = ('extra',)
+    FIELDS = ()
+    _FIELD_SET = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._FIELD_SET = frozenset(cls.FIELDS)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Record from a dict (or another mapping); fields outside the schema go to extra"""
+        if isinstance(data, cls):
+            return data
+        fields = cls._FIELD_SET
+        if data.keys() <= fields:
+            return cls(*map(data.get, cls.FIELDS))
+        extra = {key: value for key, value in data.items() if key not in fields}
+        return cls(*map(data.get, cls.FIELDS), extra=extra)
+
+    def to_dict(self):
+        """Plain dict of the fields that are set, extra fields last"""
+        data = {}
+        for field in self.FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        if self.extra:
+            data.update((key, value) for key, value in self.extra.items() if value is not None)
+        return data
+
+    # -- mapping-style access (so dict-based stages keep working) --------
+
+    def get(self, key, default=None):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+        elif self.extra is not None:
+            value = self.extra.get(key)
+        else:
+            value = None
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key) is not None
+
+    def keys(self):
+        return self.to_dict().keys()
+
+    def items(self):
+        return self.to_dict().items()
+
+    def values(self):
+        return self.to_dict().values()
+
+    def __iter__(self):
+        return iter(self.to_dict())
+
+    def __len__(self):
+        return len(self.to_dict())
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return type(self) is type(other) and self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def __reduce__(self):
+        return type(self).from_dict, (self.to_dict(),)
+
+
+Mapping.register(Record)
+
+
+class Post(Record):
+    """A collected post (lib/types.ts Post); created_utc is the UTC epoch, published its ISO form"""
+
+    __slots__ = ('id', 'title', 'content', 'url', 'score', 'comments', 'author', 'published', 'source',
+                 'created_utc')
+    FIELDS = __slots__
+
+    def __init__(self, id=None, title=None, content=None, url=None, score=None, comments=None, author=None,
+                 published=None, source=None, created_utc=None, extra=None):
+        self.id = id
+        self.title = title
+        self.content = content
+        self.url = url
+        self.score = score
+        self.comments = comments
+        self.author = intern(author)
+        self.published = published
+        self.source = intern(source)
+        self.created_utc = created_utc
+        if extra and 'feed' in extra:
+            extra['feed'] = intern(extra['feed'])
+        self.extra = extra or None
+
+
+class ExtractionResult(Record):
+    """One post's extraction result (lib/types.ts ExtractionResult)"""
+
+    __slots__ = ('post_id', 'has_pain_point', 'pain_point', 'intensity', 'specificity', 'frequency',
+                 'composite_score', 'supporting_quote', 'reason', 'source')
+    FIELDS = __slots__
+
+    def __init__(self, post_id=None, has_pain_point=None, pain_point=None, intensity=None, specificity=None,
+                 frequency=None, composite_score=None, supporting_quote=None, reason=None, source=None,
+                 extra=None):
+        self.post_id = post_id
+        self.has_pain_point = has_pain_point
+        self.pain_point = pain_point
+        self.intensity = intensity
+        self.specificity = specificity
+        self.frequency = frequency
+        self.composite_score = composite_score
+        self.supporting_quote = supporting_quote
+        self.reason = intern(reason)  # "no pain" reasons repeat a lot
+        self.source = intern(source)
+        self.extra = extra or None
+
+
+# -- JSON codecs ---------------------------------------------------------
+
+def _default(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value, indent=None):
+    """JSON text for value (records, dicts, lists of either)"""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(value, default=_default, option=option).decode("utf-8")
+    separators = None if indent else (",", ":")
+    return json.dumps(value, default=_default, ensure_ascii=False, indent=indent, separators=separators)
+
+
+def loads(text, record_type=None):
+    """Parse JSON text; with record_type, an array's objects (or one object) become records"""
+    value = orjson.loads(text) if orjson is not None else json.loads(text)
+    if record_type is None:
+        return value
+    if isinstance(value, list):
+        return [record_type.from_dict(item) if isinstance(item, dict) else item for item in value]
+    return record_type.from_dict(value) if isinstance(value, dict) else value
+
+
+def dump(value, path, indent=None):
+    """Write value as JSON to path"""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(value, default=_default, option=option))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        separators = None if indent else (",", ":")
+        json.dump(value, f, default=_default, ensure_ascii=False, indent=indent, separators=separators)
+
+
+def load(path, record_type=None):
+    """Records (or plain values) from a JSON array file or an NDJSON / JSONL file"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".ndjson") or path.endswith(".jsonl"):
+        return [loads(line, record_type) for line in data.splitlines() if line.strip()]
+    return loads(data, record_type)
+
+
+def main():
+    import tracemalloc
+
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    path = sys.argv[1]
+    raw = load(path)
+    record_type = ExtractionResult if raw and 'post_id' in raw[0] else Post
+    tracemalloc.start()
+    records = [record_type.from_dict(item) for item in raw]
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print(f"📦 {len(records)} {record_type.__name__} records from {path}: {size / 1024:.0f}KB "
+          f"({'orjson' if orjson is not None else 'json'} codec)")
+
+
+if __name__ == "__main__":
+    main()
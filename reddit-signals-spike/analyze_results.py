@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
-import json
+import os
+import sys
 
-# Load results and posts
-with open('extraction_results.json', 'r') as f:
-    results = json.load(f)
+# Shared modules (analysis, ...) live at the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from analysis import category_rollup, index_by, load_records, rank_pain_points, split_pain_points
+from cluster import category_map, cluster_pain_points
+from records import ExtractionResult, Post
 
-with open('mock_posts.json', 'r') as f:
-    posts = json.load(f)
+# Load results and posts
+results = load_records('extraction_results.json', ExtractionResult)
+posts = load_records('mock_posts.json', Post)
+posts_by_id = index_by(posts, 'id')
 
 # Analyze results
-pain_points = [r for r in results if r.get('has_pain_point')]
-no_pain = [r for r in results if not r.get('has_pain_point')]
+pain_points, no_pain = split_pain_points(results)
 
 accuracy = (len(pain_points) / len(results)) * 100
 passed = len(pain_points) >= 12
@@ -28,10 +33,7 @@ if len(pain_points) > 0:
     print("Top 10 Pain Points Ranked by Composite Score:")
     print("=" * 70)
 
-    sorted_points = sorted(pain_points, key=lambda x: x['composite_score'], reverse=True)
-
-    for i, p in enumerate(sorted_points):
-        post = next((post for post in posts if post['id'] == p['post_id']), None)
+    for i, (p, post) in enumerate(rank_pain_points(pain_points, posts_by_id)):
         print(f"\n{i+1}. [Score: {p['composite_score']:.1f}] {p['pain_point']}")
         if post:
             print(f"   📝 Post: \"{post['title']}\"")
@@ -44,22 +46,13 @@ print("\n" + "=" * 70)
 print("📊 Pain Point Distribution by Category")
 print("=" * 70)
 
-categories = {
-    "Cost/Pricing": [1, 13, 20],  # Email costs, Stripe fees, API pricing
-    "Time Management": [5, 11],    # Support time, burnout
-    "Validation/Product-Market Fit": [7, 18],  # Zero signups, idea paralysis
-    "Financial Management": [16],  # Bookkeeping
-    "Business Relationships": [3, 14],  # Ghosted clients, co-founder equity
-    "Competitive": [9]  # Copied landing page
-}
-
-for category, post_ids in categories.items():
-    matching = [p for p in pain_points if p['post_id'] in post_ids]
-    if matching:
-        avg_score = sum(p['composite_score'] for p in matching) / len(matching)
-        print(f"\n{category}: {len(matching)} signals (avg score: {avg_score:.1f})")
-        for p in matching:
-            print(f"  - {p['pain_point'][:60]}...")
+# Themes come from the pain points themselves (see cluster.py)
+categories = category_map(cluster_pain_points(pain_points))
+
+for category, group in category_rollup(pain_points, categories).items():
+    print(f"\n{category}: {group['count']} signals (avg score: {group['avg_score']:.1f})")
+    for p in group['items']:
+        print(f"  - {p['pain_point'][:60]}...")
 
 print("\n" + "=" * 70)
 print("📝 Next Steps")
@@ -1,19 +1,23 @@
 #!/usr/bin/env python3
-import json
+import os
+import sys
 
-# Load results
-with open('extraction_results_v2.json', 'r') as f:
-    results = json.load(f)
+# Shared modules (analysis, ...) live at the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
 
-with open('extraction_results.json', 'r') as f:
-    results_v1 = json.load(f)
+from analysis import diff_versions, index_by, load_records, split_pain_points
+from records import ExtractionResult, Post
 
-with open('mock_posts.json', 'r') as f:
-    posts = json.load(f)
+# Load results
+results = load_records('extraction_results_v2.json', ExtractionResult)
+results_v1 = load_records('extraction_results.json', ExtractionResult)
+posts = load_records('mock_posts.json', Post)
+posts_by_id = index_by(posts, 'id')
 
 # Compare v1 vs v2
-pain_v1 = [r for r in results_v1 if r.get('has_pain_point')]
-pain_v2 = [r for r in results if r.get('has_pain_point')]
+pain_v1, _ = split_pain_points(results_v1)
+pain_v2, _ = split_pain_points(results)
+diff = diff_versions(results_v1, results)
 
 print("=" * 70)
 print(" " * 15 + "📊 ITERATION #2 RESULTS")
@@ -24,11 +28,8 @@ print(f"\n🎯 Target: 12/20 (60%)")
 print(f"📈 Result: {'✅ PASSED' if len(pain_v2) >= 12 else '❌ STILL BELOW THRESHOLD'}")
 
 # Find differences
-v1_ids = set(p['post_id'] for p in pain_v1)
-v2_ids = set(p['post_id'] for p in pain_v2)
-
-added = v2_ids - v1_ids
-removed = v1_ids - v2_ids
+added = diff['added']
+removed = diff['removed']
 
 if added or removed:
     print("\n" + "=" * 70)
@@ -37,13 +38,13 @@ if added or removed:
     if added:
         print(f"\n✅ Added {len(added)} pain points:")
         for pid in added:
-            post = next(p for p in posts if p['id'] == pid)
+            post = posts_by_id[pid]
             print(f"   - Post {pid}: {post['title']}")
     if removed:
         print(f"\n❌ Removed {len(removed)} pain points:")
         for pid in removed:
-            post = next(p for p in posts if p['id'] == pid)
-            result = next(r for r in results if r['post_id'] == pid)
+            post = posts_by_id[pid]
+            result = diff['v2_by_id'][pid]
             print(f"   - Post {pid}: {post['title']}")
             print(f"     Reason: {result.get('reason', 'N/A')}")
 else:
@@ -55,17 +56,16 @@ print("\n" + "=" * 70)
 print("Score Refinements (V1 → V2):")
 print("=" * 70)
 
-for p2 in pain_v2:
-    p1 = next((p for p in pain_v1 if p['post_id'] == p2['post_id']), None)
-    if p1:
-        score_diff = p2['composite_score'] - p1['composite_score']
-        if abs(score_diff) > 0.1:
-            post = next(p for p in posts if p['id'] == p2['post_id'])
-            direction = "↗️" if score_diff > 0 else "↘️"
-            print(f"\nPost {p2['post_id']}: {post['title'][:60]}")
-            print(f"  {direction} {p1['composite_score']:.1f} → {p2['composite_score']:.1f} ({score_diff:+.1f})")
-            if 'iteration_notes' in p2:
-                print(f"  💡 {p2['iteration_notes']}")
+for post_id, v1_score, v2_score in diff['score_changes']:
+    score_diff = v2_score - v1_score
+    if abs(score_diff) > 0.1:
+        post = posts_by_id[post_id]
+        p2 = diff['v2_by_id'][post_id]
+        direction = "↗️" if score_diff > 0 else "↘️"
+        print(f"\nPost {post_id}: {post['title'][:60]}")
+        print(f"  {direction} {v1_score:.1f} → {v2_score:.1f} ({score_diff:+.1f})")
+        if 'iteration_notes' in p2:
+            print(f"  💡 {p2['iteration_notes']}")
 
 print("\n" + "=" * 70)
 print("📝 Iteration Analysis")
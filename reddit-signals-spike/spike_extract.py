@@ -1,103 +1,73 @@
 #!/usr/bin/env python3
 import json
-import requests
+import os
 import sys
 
+# Shared modules (extract_engine, ...) live at the repo root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import metrics
+import ratelimit
+from extract_cache import ExtractionCache
+from extract_engine import ExtractionEngine
+import records
+from records import ExtractionResult
+
 # Load mock posts
 with open('mock_posts.json', 'r') as f:
     posts = json.load(f)
 
-# Format posts for prompt
-posts_text = []
-for post in posts:
-    posts_text.append(f"""POST {post['id']}: {post['title']}
-Content: {post['content']}
-URL: {post['url']}
-""")
-
-posts_formatted = "\n---\n\n".join(posts_text)
-
-# Create extraction prompt
-prompt = f"""You are analyzing Reddit posts from r/Entrepreneur to extract actionable pain points that indie hackers could build products around.
-
-For each post below, identify:
-1. Is there a genuine pain point or problem being expressed? (not just a meme, joke, or off-topic discussion)
-2. If yes, extract the specific pain point
-3. Score the pain point on three dimensions (0-100):
-   - **Intensity**: How frustrated/desperate does the person sound? (0=mild annoyance, 100=extreme frustration)
-   - **Specificity**: How actionable is the problem? (0=vague complaint, 100=specific workflow pain)
-   - **Frequency**: Based on language, does this seem like a recurring problem? (0=one-time issue, 100=ongoing struggle)
-
-POSTS TO ANALYZE:
-{posts_formatted}
-
-Return your analysis as a JSON array. For each post, either:
-- If NO actionable pain point: {{"post_id": N, "has_pain_point": false, "reason": "brief reason"}}
-- If YES pain point found: {{
-    "post_id": N,
-    "has_pain_point": true,
-    "pain_point": "concise description of the problem",
-    "intensity": 0-100,
-    "specificity": 0-100,
-    "frequency": 0-100,
-    "composite_score": (intensity + specificity + frequency) / 3,
-    "supporting_quote": "direct quote from post showing the pain"
-  }}
-
-Only extract REAL pain points. Be strict. Reject:
-- Memes, jokes, sarcasm
-- Success stories without a problem
-- General discussions without a specific complaint
-- Self-promotional posts
-- Off-topic content
-
-Return ONLY valid JSON, no other text."""
-
-# Call Claude API
+# Call Claude API: posts already extracted with the same text/prompt/model come
+# from the cache; the rest go out in token-budgeted chunks, concurrently, with
+# retries; finished chunks are checkpointed so a rerun only sends the rest.
+# Responses are streamed, so each result prints as soon as it is parsed
 print("🤖 Calling Claude API for extraction...\n")
 
-response = requests.post(
-    "https://api.anthropic.com/v1/messages",
-    headers={
-        "content-type": "application/json",
-        "x-api-key": "sk-ant-REDACTED",
-        "anthropic-version": "2023-06-01"
-    },
-    json={
-        "model": "claude-3-5-sonnet-20241022",
-        "max_tokens": 4000,
-        "messages": [{
-            "role": "user",
-            "content": prompt
-        }]
-    }
-)
-
-if response.status_code != 200:
-    print(f"❌ API Error: {response.status_code}")
-    print(response.text)
-    sys.exit(1)
-
-result = response.json()
 
-# Extract the response text
-response_text = result['content'][0]['text']
-
-# Try to parse as JSON
-try:
-    # Find JSON array in response
-    import re
-    json_match = re.search(r'\[[\s\S]*\]', response_text)
-    if not json_match:
-        print("❌ No JSON array found in response")
-        print("Response:", response_text[:500])
+def show_result(result):
+    if isinstance(result, ExtractionResult):
+        print(f"   ⚡ post {result.get('post_id')}: {'pain point' if result.get('has_pain_point') else 'no pain point'}")
+
+
+# Requests per minute are shared with every other extraction process on this machine
+with ExtractionCache('extraction_cache.sqlite3') as cache:
+    engine = ExtractionEngine(
+        api_key=os.environ.get('ANTHROPIC_API_KEY'),
+        url=os.environ.get('ANTHROPIC_MESSAGES_URL', 'https://api.anthropic.com/v1/messages'),
+        checkpoint_path='extraction_checkpoint.jsonl',
+        cache=cache,
+        limiter=ratelimit.shared(),
+    )
+    with metrics.timer("stage_seconds", stage="extract"):
+        extraction_results, report = engine.extract(posts, on_result=show_result)
+    cache_stats = cache.stats()
+
+# Timings, token usage and result counts: JSON lines appended per run, or
+# Prometheus text if METRICS_PATH ends in .prom
+metrics_path = os.environ.get('METRICS_PATH', 'extraction_metrics.jsonl')
+metrics.dump(metrics_path)
+print(f"\n⏱️  Where the time went (all runs appended to {metrics_path}):")
+print(metrics.summary())
+print()
+
+print(f"🗄️  Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+      f"({cache_stats['hit_rate'] * 100:.0f}% hit rate, {cache_stats['entries']} entries)")
+print(f"📦 {report['chunks']} chunks: {report['sent']} sent, "
+      f"{report['from_checkpoint']} from checkpoint, {report['failed_chunks']} failed")
+for bad in report['malformed']:
+    print(f"⚠️  Malformed result for post {bad['post_id']}: {bad['error']}")
+
+if report['failed_posts']:
+    if report['errors']:
+        print(f"❌ API Error: {report['errors'][0]}")
+    print(f"   Missing posts: {report['failed_posts']} (rerun to retry only these)")
+    if not extraction_results:
         sys.exit(1)
 
-    extraction_results = json.loads(json_match.group(0))
-
-    # Save results
-    with open('extraction_results.json', 'w') as f:
-        json.dump(extraction_results, f, indent=2)
+try:
+    # Save results: to a temp file first, so a failed write can't truncate the last run's results
+    records.dump(extraction_results, 'extraction_results.json.tmp', indent=2)
+    os.replace('extraction_results.json.tmp', 'extraction_results.json')
 
     print(f"✅ Extraction complete")
     print(f"💾 Results saved to extraction_results.json\n")
@@ -146,6 +116,5 @@ try:
         print("   3. Simplify to just extract quotes without scoring")
 
 except Exception as e:
-    print(f"❌ Failed to parse results: {e}")
-    print("Raw response:", response_text[:1000])
+    print(f"❌ Failed to analyze results: {e}")
     sys.exit(1)
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Tail-latency and failure handling for the fetchers: hedging, breakers, deadlines
+
+One slow /v0/item response or one hung feed used to hold a whole batch
+for its full timeout (and retries). The fetchers now get:
+- per-endpoint latency tracking: a sliding window of recent successful
+  call times per metrics.endpoint() label, so "slow" means slow for that
+  endpoint right now
+- hedged GETs: once a call has taken longer than its endpoint's p95, a
+  duplicate is sent and whichever answers first wins. Hedges are capped
+  at HEDGE_BUDGET of calls so a slow upstream doesn't get double load,
+  a hedge goes out only if the host has a free in-flight slot (its own,
+  or one of a small hedge-only reserve, hn_fetch.hedge_limit) and a
+  rate-limit token right now, and only idempotent GETs are hedged
+- per-host circuit breakers: after FAILURE_THRESHOLD failures in a row
+  (connection errors, timeouts, 5xx) the host's breaker opens and calls
+  fail fast for reset_timeout seconds; then one probe is let through
+  (half-open), and its outcome closes or re-opens the breaker
+- Deadline: a hard end time for a whole batch. Timeouts shrink to what's
+  left, retries stop at the deadline, and iter_items / iter_feeds report
+  whatever hasn't finished by then as failed instead of waiting
+
+Hedges are counted in http_hedged_total (won / lost / skipped), breaker events in
+circuit_breaker_total (opened / rejected / probe / closed).
+
+    with host_breaker(url).guard():      # raises CircuitOpen while open
+        response = hedged_get(session, url, timeout=5)
+    deadline = Deadline(2.0)             # deadline.remaining(), .expired
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import metrics
+import ratelimit
+
+WINDOW = 256  # recent calls per endpoint
+MIN_SAMPLES = 20  # no hedging until an endpoint has this many
+HEDGE_QUANTILE = 0.95
+MIN_HEDGE_DELAY = 0.005
+HEDGE_BUDGET = 0.1  # hedges per call, at most
+HEDGE_WORKERS = 64
+
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 5.0
+
+HEDGES = metrics.counter("http_hedged_total", "Duplicate GETs sent after a call passed its endpoint's p95, by outcome")
+BREAKER_EVENTS = metrics.counter("circuit_breaker_total", "Circuit breaker transitions and rejections by host")
+
+
+class CircuitOpen(Exception):
+    """The host's circuit breaker is open: failing fast instead of calling it"""
+
+
+class Deadline:
+    """A hard end time for a batch of calls"""
+
+    def __init__(self, seconds):
+        self.at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.at - time.monotonic())
+
+    @property
+    def expired(self):
+        return time.monotonic() >= self.at
+
+    def timeout(self, timeout):
+        """timeout, shortened to what's left of the deadline (None: no deadline)"""
+        return min(timeout, self.remaining()) if timeout is not None else self.remaining()
+
+
+def shorter(timeout, deadline):
+    """Per-call timeout under an optional Deadline"""
+    return deadline.timeout(timeout) if deadline is not None else timeout
+
+
+class LatencyTracker:
+    """Sliding window of recent call latencies per endpoint label"""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._samples = {}
+        self._cached = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label, seconds):
+        with self._lock:
+            samples = self._samples.get(label)
+            if samples is None:
+                samples = self._samples[label] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._cached.pop(label, None)
+
+    def quantile(self, label, q=HEDGE_QUANTILE):
+        """q-th latency of the window, None below MIN_SAMPLES"""
+        with self._lock:
+            cached = self._cached.get(label)
+            if cached is not None and cached[0] == q:
+                return cached[1]
+            samples = self._samples.get(label)
+            if not samples or len(samples) < MIN_SAMPLES:
+                return None
+            ordered = sorted(samples)
+            value = ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+            self._cached[label] = (q, value)
+            return value
+
+
+class CircuitBreaker:
+    """closed -> (failure_threshold failures in a row) -> open -> (reset_timeout) -> half-open probe"""
+
+    def __init__(self, name, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._changed = threading.Condition()
+
+    def allow(self):
+        """May a call go out now? In half-open state only the single probe may
+
+        Calls arriving while the probe is in flight wait (up to
+        reset_timeout) for its outcome rather than failing straight away,
+        so a batch that hits a recovering host isn't lost wholesale.
+        """
+        with self._changed:
+            if self.state == "closed":
+                return True
+            if self.state == "half_open":
+                self._changed.wait_for(lambda: self.state != "half_open", timeout=self.reset_timeout)
+                if self.state == "closed":
+                    return True
+            # a probe that never reported back (its caller gave up) is replaced by a new one
+            if self.state != "closed" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self.opened_at = time.monotonic()
+                BREAKER_EVENTS.inc(host=self.name, event="probe")
+                return True
+            BREAKER_EVENTS.inc(host=self.name, event="rejected")
+            return False
+
+    def record(self, ok):
+        with self._changed:
+            if ok:
+                if self.state != "closed":
+                    BREAKER_EVENTS.inc(host=self.name, event="closed")
+                self.state = "closed"
+                self.failures = 0
+            else:
+                self.failures += 1
+                if self.state == "half_open" or (self.state == "closed" and self.failures >= self.failure_threshold):
+                    self.state = "open"
+                    self.opened_at = time.monotonic()
+                    BREAKER_EVENTS.inc(host=self.name, event="opened")
+            self._changed.notify_all()
+
+    @contextmanager
+    def guard(self, deadline=None):
+        """Run a call through the breaker: raises CircuitOpen, records exceptions as failures
+
+        A call cut short by the caller's own deadline says nothing about
+        the host, so exceptions once deadline has expired aren't recorded.
+        """
+        if not self.allow():
+            raise CircuitOpen(self.name)
+        try:
+            yield self
+        except Exception:
+            if deadline is None or not deadline.expired:
+                self.record(False)
+            raise
+
+
+LATENCY = LatencyTracker()
+_breakers = {}
+_breakers_lock = threading.Lock()
+_hedge_pool = None
+_hedge_stats = {'calls': 0, 'hedges': 0, 'skipped': 0}
+
+
+def host_breaker(url, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+    """Get the shared circuit breaker for url's host"""
+    host = urlsplit(url).netloc
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host, failure_threshold, reset_timeout)
+        return breaker
+
+
+def reset():
+    """Forget breakers, latency history and hedge counts (tests / benchmarks)"""
+    global LATENCY
+    with _breakers_lock:
+        _breakers.clear()
+        LATENCY = LatencyTracker()
+        _hedge_stats.update(calls=0, hedges=0, skipped=0)
+
+
+def hedge_stats():
+    return dict(_hedge_stats)
+
+
+def _pool():
+    global _hedge_pool
+    with _breakers_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="hedge")
+        return _hedge_pool
+
+
+def _may_hedge(url, slot, hedge_slot):
+    """Take the hedge budget, a free slot and a rate-limit token for a backup call, or none of them
+
+    Returns (True, the semaphore taken for the backup or None) or (False, None).
+    """
+    with _breakers_lock:
+        if _hedge_stats['hedges'] + 1 > HEDGE_BUDGET * _hedge_stats['calls']:
+            return False, None
+        _hedge_stats['hedges'] += 1
+    taken = None
+    for candidate in (slot, hedge_slot):
+        if candidate is not None and candidate.acquire(blocking=False):
+            taken = candidate
+            break
+    if taken is not None or slot is None and hedge_slot is None:
+        if ratelimit.throttle(url, timeout=0):
+            return True, taken
+        if taken is not None:
+            taken.release()
+    HEDGES.inc(endpoint=metrics.endpoint(url), outcome="skipped")
+    with _breakers_lock:
+        _hedge_stats['hedges'] -= 1
+        _hedge_stats['skipped'] += 1
+    return False, None
+
+
+def _get(session, url, kwargs, slot):
+    try:
+        return session.get(url, **kwargs)
+    finally:
+        if slot is not None:
+            slot.release()
+
+
+def hedged_get(session, url, hedge=True, slot=None, hedge_slot=None, **kwargs):
+    """session.get(url), duplicated once the call passes its endpoint's p95
+
+    slot is an already-acquired semaphore (hn_fetch.host_limit) that this
+    function takes over: it's released when the call using it finishes,
+    even if that call lost and ends in the background. A backup is only
+    sent if it can take another slot and a ratelimit token right away,
+    so hedging never exceeds the host's in-flight cap or shared rate;
+    hedge_slot (hn_fetch.hedge_limit) is tried when slot has none free.
+
+    Returns the first response to arrive; if it raised, the other call's
+    outcome is used. The latency recorded is the caller's (first answer),
+    so stalled calls that a hedge beat don't drag the endpoint's p95 up.
+    """
+    label = metrics.endpoint(url)
+    with _breakers_lock:
+        _hedge_stats['calls'] += 1
+    delay = LATENCY.quantile(label) if hedge else None
+    start = time.perf_counter()
+    if delay is None:
+        response = _get(session, url, kwargs, slot)
+    else:
+        response = _hedged(session, url, kwargs, slot, hedge_slot, label, delay)
+    if response.status_code < 500:
+        LATENCY.observe(label, time.perf_counter() - start)
+    return response
+
+
+def _hedged(session, url, kwargs, slot, hedge_slot, label, delay):
+    try:
+        primary = _pool().submit(_get, session, url, kwargs, slot)
+    except BaseException:
+        if slot is not None:
+            slot.release()
+        raise
+    try:
+        return primary.result(timeout=max(delay, MIN_HEDGE_DELAY))
+    except FutureTimeout:
+        pass
+    may_hedge, backup_slot = _may_hedge(url, slot, hedge_slot)
+    if not may_hedge:
+        return primary.result()
+
+    backup = _pool().submit(_get, session, url, kwargs, backup_slot)
+    done, _ = wait([primary, backup], return_when=FIRST_COMPLETED)
+    first = done.pop()
+    other = backup if first is primary else primary
+    if first.exception() is not None:
+        first = other
+    HEDGES.inc(endpoint=label, outcome="won" if first is backup else "lost")
+    return first.result()
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Multi-subreddit RSS fetcher with conditional GET
+
+Pulls many subreddit feeds concurrently over one pooled session:
+- ETag / Last-Modified are remembered per feed (rss_state.json) and sent
+  back as If-None-Match / If-Modified-Since, so unchanged feeds come back
+  as an empty 304
+- HTML block pages are reported per feed instead of failing the batch,
+  and pause the host's shared rate-limit bucket (ratelimit.py)
+- entries from every feed are merged into one stream with duplicates
+  (cross-posts, overlapping feeds) removed, including reworded copies
+  caught by the near-duplicate index (near_dup.py)
+- entry dates are normalized to created_utc (UTC epoch, timestamps.py)
+- a per-host circuit breaker (resilience.py) fails feeds fast while
+  the host keeps erroring, and an optional Deadline bounds a whole batch
+- feed_handler() runs the fetch as a workqueue.py consumer
+- each fetch is counted in feed_fetches_total by outcome (ok,
+  not_modified, blocked, deadline, circuit_open, error) and timed in
+  http_request_seconds
+
+Usage: python rss_fetch.py Entrepreneur SaaS startups ...
+"""
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
+from urllib.parse import urlsplit
+
+import requests
+
+import metrics
+import ratelimit
+from errors import JobError
+from feed_parser import iter_response_entries
+from hn_fetch import REQUEST_SECONDS, host_limit, make_session
+from near_dup import NearDuplicateIndex
+from resilience import CircuitOpen, host_breaker, shorter
+from timestamps import TimestampParser
+
+REDDIT_BASE = "https://www.reddit.com"
+DEFAULT_STATE_PATH = "rss_state.json"
+
+# Reddit requires a User-Agent header to avoid being blocked
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+FETCHES = metrics.counter("feed_fetches_total", "Feed fetches by outcome")
+ERROR_OUTCOMES = ("blocked", "deadline", "circuit_open")  # error prefixes with their own outcome
+
+# Remembers each feed's date format, so its entries parse on the first try
+TIMESTAMPS = TimestampParser()
+
+
+def feed_url(subreddit, base_url=REDDIT_BASE):
+    """RSS URL for a subreddit"""
+    return f"{base_url}/r/{subreddit}/.rss"
+
+
+class FeedStateStore:
+    """ETag / Last-Modified validators per feed URL, persisted as JSON"""
+
+    def __init__(self, path=DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.feeds = {}
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self.feeds = json.load(f)
+
+    def conditional_headers(self, url):
+        with self._lock:
+            state = self.feeds.get(url, {})
+        headers = {}
+        if state.get('etag'):
+            headers['If-None-Match'] = state['etag']
+        if state.get('last_modified'):
+            headers['If-Modified-Since'] = state['last_modified']
+        return headers
+
+    def update(self, url, response):
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self.feeds[url] = {'etag': etag, 'last_modified': last_modified}
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = dict(self.feeds)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(snapshot, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def fetch_feed(session, url, store=None, timeout=10, max_entries=None, per_host=4, deadline=None):
+    """Fetch and parse one feed
+
+    Returns a result dict: url, status, entries, not_modified, truncated,
+    error. truncated means max_entries cut the entries returned; the
+    feed's ETag / Last-Modified are saved all the same.
+    With a resilience.Deadline the request timeout shrinks to what's left
+    and a feed still downloading at the deadline keeps the entries so far.
+    """
+    result = _fetch_feed(session, url, store, timeout, max_entries, per_host, deadline)
+    if result['not_modified']:
+        outcome = "not_modified"
+    elif result['error']:
+        outcome = result['error'].split(":", 1)[0] if result['error'].startswith(ERROR_OUTCOMES) else "error"
+    else:
+        outcome = "ok"
+    FETCHES.inc(outcome=outcome)
+    return result
+
+
+def _fetch_feed(session, url, store, timeout, max_entries, per_host, deadline=None):
+    result = {'url': url, 'status': None, 'entries': [], 'not_modified': False, 'truncated': False,
+              'error': None}
+    headers = dict(HEADERS)
+    if store is not None:
+        headers.update(store.conditional_headers(url))
+
+    breaker = host_breaker(url)
+    limit = host_limit(url, per_host)
+    try:
+        if not ratelimit.throttle(url, timeout=deadline.remaining() if deadline else None):
+            result['error'] = "deadline: no rate-limit token before the deadline"
+            return result
+        with limit:
+            with breaker.guard(deadline):
+                start = time.perf_counter()
+                response = session.get(url, headers=headers, timeout=shorter(timeout, deadline), stream=True)
+                REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=metrics.endpoint(url),
+                                        status=response.status_code)
+            breaker.record(response.status_code < 500)
+            with response:
+                result['status'] = response.status_code
+                if response.status_code == 304:
+                    result['not_modified'] = True
+                    return result
+                ratelimit.backoff(url, response.status_code, response.headers.get('Retry-After'))
+                response.raise_for_status()
+
+                # Reddit serves an HTML block page (still 200) when it throttles us
+                content_type = response.headers.get('Content-Type', '')
+                if 'html' in content_type.lower():
+                    ratelimit.backoff(url, delay=ratelimit.BLOCK_COOLDOWN)
+                    result['error'] = f"blocked: got {content_type} instead of RSS"
+                    return result
+
+                for entry in iter_response_entries(response):
+                    entry['created_utc'] = TIMESTAMPS.parse(entry.get('published'), source=url)
+                    result['entries'].append(entry)
+                    if max_entries and len(result['entries']) >= max_entries:
+                        result['truncated'] = True
+                        break
+                    if deadline is not None and deadline.expired:
+                        result['error'] = f"deadline: stopped after {len(result['entries'])} entries"
+                        return result
+
+        if store is not None:
+            store.update(url, response)
+    except CircuitOpen:
+        result['error'] = f"circuit_open: {urlsplit(url).netloc} is failing, not calling it"
+    except requests.RequestException as e:
+        result['error'] = f"request failed: {e}"
+    except Exception as e:  # xml.etree.ElementTree.ParseError and friends
+        result['error'] = f"parse failed: {e}"
+    return result
+
+
+def iter_feeds(urls, store=None, session=None, max_workers=8, per_host=4, timeout=10, max_entries=None,
+               deadline=None):
+    """Fetch feeds concurrently, yielding each result dict as it completes
+
+    With a resilience.Deadline, feeds not done by then are yielded right
+    away with a "deadline" error instead of being waited for.
+    """
+    urls = list(urls)
+    if not urls:
+        return
+
+    owns_session = session is None
+    if owns_session:
+        session = make_session(max_workers)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(fetch_feed, session, url, store, timeout, max_entries, per_host, deadline): url
+                for url in urls
+            }
+            try:
+                for future in as_completed(futures, timeout=deadline.remaining() if deadline else None):
+                    yield future.result()
+            except FutureTimeout:
+                for future, url in futures.items():
+                    if not future.done():
+                        future.cancel()
+                        FETCHES.inc(outcome="deadline")
+                        yield {'url': url, 'status': None, 'entries': [], 'not_modified': False,
+                               'truncated': False, 'error': "deadline: not fetched in time"}
+    finally:
+        if owns_session:
+            session.close()
+
+
+def feed_handler(session=None, store=None, max_workers=8, **fetch_kwargs):
+    """Work-queue handler for "fetch_feed" jobs ({"url": ...}; see workqueue.py)
+
+    A leased batch is fetched like iter_feeds; each job's result is the
+    feed's result dict, or a JobError carrying its error so the queue
+    retries it. The store's validators are saved after every batch.
+    Accepts the same keyword arguments as iter_feeds.
+    """
+    session = session or make_session(max_workers)
+
+    def handle(payloads):
+        urls = [payload['url'] for payload in payloads]
+        by_url = {result['url']: result for result in
+                  iter_feeds(urls, store=store, session=session, max_workers=max_workers, **fetch_kwargs)}
+        if store is not None:
+            store.save()
+        return [JobError(by_url[url]['error']) if by_url[url]['error'] else by_url[url] for url in urls]
+
+    return handle
+
+
+def entry_key(entry):
+    """Identity used for de-duplication: Reddit post id, else link, else title"""
+    return entry.get('id') or entry.get('link') or entry.get('title')
+
+
+def merge_entries(results, seen=None, near_dups=None):
+    """Yield unique entries across feed results, tagging each with its feed URL and source
+
+    With a near_dup.NearDuplicateIndex, reworded copies of an entry already
+    indexed (from any feed or source) are dropped as well.
+    """
+    seen = set() if seen is None else seen
+    for result in results:
+        for entry in result['entries']:
+            key = entry_key(entry)
+            if key in seen:
+                continue
+            seen.add(key)
+            entry = dict(entry, feed=result['url'], source="reddit")
+            if near_dups is not None and near_dups.add(entry)[1]:
+                continue
+            yield entry
+
+
+def fetch_subreddits(subreddits, store=None, base_url=REDDIT_BASE, near_dups=None, **kwargs):
+    """Fetch many subreddits; returns (unique entries, per-feed results)"""
+    results = []
+
+    def collect():
+        for result in iter_feeds([feed_url(name, base_url) for name in subreddits], store=store, **kwargs):
+            results.append(result)
+            yield result
+
+    entries = list(merge_entries(collect(), near_dups=near_dups))
+    return entries, results
+
+
+def main():
+    subreddits = sys.argv[1:] or ["Entrepreneur", "SaaS", "startups", "smallbusiness"]
+    ratelimit.shared()
+
+    store = FeedStateStore()
+    with NearDuplicateIndex() as near_dups:
+        entries, results = fetch_subreddits(subreddits, store=store, near_dups=near_dups)
+        dup_stats = near_dups.stats()
+    store.save()
+
+    print("=" * 70)
+    print(f"📡 Reddit RSS: {len(subreddits)} feeds")
+    print("=" * 70)
+    for result in sorted(results, key=lambda r: r['url']):
+        if result['error']:
+            status = f"❌ {result['error']}"
+        elif result['not_modified']:
+            status = "⏸️  304 not modified"
+        else:
+            status = f"✅ {len(result['entries'])} entries"
+        print(f"   {result['url']}: {status}")
+
+    print(f"\n📊 {len(entries)} unique entries after merging "
+          f"({dup_stats['duplicates']} near-duplicates collapsed)")
+
+    output_file = "reddit_rss_merged.json"
+    with open(output_file, 'w') as f:
+        json.dump(entries, f, indent=2)
+    print(f"💾 Saved to {output_file}")
+
+
+if __name__ == "__main__":
+    main()
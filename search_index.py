@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""
+BM25 keyword index over collected posts
+
+A local inverted index, so a keyword query over the whole history comes
+back ranked in milliseconds and only the top slice goes to a model:
+- text: title + cleaned content (near_dup.post_text), lowercased \\w+ tokens
+- postings per term, stored in SQLite as compact blobs: varint-encoded
+  doc id deltas and term frequencies, with token positions in a separate
+  blob that only phrase queries decode
+- incremental adds: each add_many() batch writes one new segment per term
+  it touches (nothing is rewritten); compact() merges a term's segments
+  into one by concatenating blobs, and runs by itself once MAX_SEGMENTS
+  batches have piled up. A post already indexed (same source:id key) is
+  skipped
+- ranking: BM25 (k1=1.2, b=0.75); doc lengths are kept in memory so
+  scoring never goes back to the database
+
+Query syntax: words are optional and ranked (OR), "quoted phrases" must
+appear in that order, and word* matches every term starting with word
+(the MAX_EXPANSIONS most frequent).
+
+    with SearchIndex() as index:
+        index.add_many(posts)
+        hits = index.search('invoic* "manual data entry"', limit=50)
+
+Usage:
+    python search_index.py build posts.ndjson|posts.json|posts.store [index]
+    python search_index.py search "QUERY" [index] [--limit 20]
+"""
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from array import array
+
+from near_dup import post_text
+from post_store import PostStore, load_posts
+
+DEFAULT_INDEX_PATH = "search_index.sqlite3"
+K1 = 1.2
+B = 0.75
+MAX_EXPANSIONS = 50
+MAX_SEGMENTS = 32
+
+_WORD = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    length INTEGER NOT NULL,
+    post TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    df INTEGER NOT NULL,
+    last_doc INTEGER NOT NULL,
+    docs BLOB NOT NULL,
+    positions BLOB NOT NULL,
+    PRIMARY KEY (term, segment)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+def tokens(text):
+    return _WORD.findall(text.lower())
+
+
+def doc_key(post):
+    """Same source:id key as the post store"""
+    source = post.get('source') or ("reddit" if post.get('feed') else "hn")
+    return f"{source}:{post.get('id') or post.get('link') or post.get('url')}"
+
+
+def encode_varints(values, out):
+    for value in values:
+        while value >= 0x80:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return out
+
+
+def read_varint(data, offset=0):
+    """(value, offset after it)"""
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def decode_varints(data):
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+
+def encode_postings(entries):
+    """[(doc id ascending, [positions])] -> (docs blob, positions blob)"""
+    docs, positions = bytearray(), bytearray()
+    previous = 0
+    for doc, where in entries:
+        delta, freq = doc - previous, len(where)
+        if delta < 0x80 and freq < 0x80:  # most postings: two one-byte varints
+            docs.append(delta)
+            docs.append(freq)
+        else:
+            encode_varints((delta, freq), docs)
+        last = 0
+        for position in where:
+            gap = position - last
+            if gap < 0x80:
+                positions.append(gap)
+            else:
+                encode_varints((gap,), positions)
+            last = position
+        previous = doc
+    return bytes(docs), bytes(positions)
+
+
+def merge_segments(segments):
+    """Concatenate (last_doc, docs blob, positions blob) segments, oldest first
+
+    Positions restart at every doc and doc ids are deltas, so only each
+    segment's first doc id needs re-basing; nothing else is decoded.
+    """
+    docs, positions = bytearray(), bytearray()
+    previous = 0
+    for last_doc, docs_blob, positions_blob in segments:
+        first, offset = read_varint(docs_blob)
+        encode_varints((first - previous,), docs)
+        docs += docs_blob[offset:]
+        positions += positions_blob
+        previous = last_doc
+    return bytes(docs), bytes(positions)
+
+
+def decode_docs(blob):
+    """Docs blob -> ([doc ids], [term frequencies])"""
+    values = decode_varints(blob)
+    docs, freqs = [], values[1::2]
+    doc = 0
+    for delta in values[0::2]:
+        doc += delta
+        docs.append(doc)
+    return docs, freqs
+
+
+def decode_positions(blob, freqs):
+    """Positions blob -> one list of positions per doc"""
+    values = decode_varints(blob)
+    result, i = [], 0
+    for freq in freqs:
+        where, position = [], 0
+        for delta in values[i:i + freq]:
+            position += delta
+            where.append(position)
+        result.append(where)
+        i += freq
+    return result
+
+
+def parse_query(query):
+    """Query string -> (terms, prefixes, phrases)"""
+    terms, prefixes, phrases = [], [], []
+    for phrase, word in _QUERY.findall(query):
+        if phrase:
+            words = tokens(phrase)
+            if len(words) > 1:
+                phrases.append(words)
+            else:
+                terms.extend(words)
+        elif word.endswith("*") and tokens(word):
+            *whole, prefix = tokens(word)
+            terms.extend(whole)
+            prefixes.append(prefix)
+        else:
+            terms.extend(tokens(word))
+    return terms, prefixes, phrases
+
+
+class SearchIndex:
+    """SQLite-backed inverted index with BM25 ranking; see module docstring"""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(SCHEMA)
+        self._lengths = array("I", (length for (length,) in
+                                    self._conn.execute("SELECT length FROM docs ORDER BY id")))
+        self._total_length = sum(self._lengths)
+        self._segments = self._meta("segments")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self._lengths)
+
+    def _meta(self, key):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    # -- writing -------------------------------------------------------
+
+    def add(self, post):
+        """Index one post; False if it was already indexed"""
+        return self.add_many([post]) == 1
+
+    def add_many(self, posts):
+        """Index posts as one segment; returns how many were new"""
+        with self._lock:
+            keys = {}
+            for post in posts:
+                keys.setdefault(doc_key(post), post)
+            known = set()
+            key_list = list(keys)
+            for i in range(0, len(key_list), 500):
+                chunk = key_list[i:i + 500]
+                known.update(key for (key,) in self._conn.execute(
+                    f"SELECT key FROM docs WHERE key IN ({','.join('?' * len(chunk))})", chunk))
+
+            postings, docs = {}, []
+            first_doc = len(self._lengths) + 1
+            for key, post in keys.items():
+                if key in known:
+                    continue
+                doc = first_doc + len(docs)
+                words = tokens(post_text(post))
+                where = {}
+                for position, word in enumerate(words):
+                    where.setdefault(word, []).append(position)
+                for word, positions in where.items():
+                    postings.setdefault(word, []).append((doc, positions))
+                payload = {field: post.get(field) for field in ('title', 'url', 'source', 'created_utc', 'score')}
+                payload.update(url=payload['url'] or post.get('link'), source=key.split(":", 1)[0])
+                docs.append((doc, key, len(words), json.dumps(payload, ensure_ascii=False)))
+            if not docs:
+                return 0
+
+            with self._conn:
+                self._conn.executemany("INSERT INTO docs (id, key, length, post) VALUES (?, ?, ?, ?)", docs)
+                self._conn.executemany(
+                    "INSERT INTO postings (term, segment, df, last_doc, docs, positions) VALUES (?, ?, ?, ?, ?, ?)",
+                    ((term, first_doc, len(entries), entries[-1][0], *encode_postings(entries))
+                     for term, entries in postings.items()))
+                self._segments += 1
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('segments', ?)",
+                                   (self._segments,))
+            for _, _, length, _ in docs:
+                self._lengths.append(length)
+                self._total_length += length
+
+        if self._segments > MAX_SEGMENTS:
+            self.compact(vacuum=False)
+        return len(docs)
+
+    def compact(self, vacuum=True):
+        """Merge every term's segments into one (and give the freed pages back to the filesystem)"""
+        with self._lock, self._conn:
+            terms = [term for (term,) in self._conn.execute(
+                "SELECT term FROM postings GROUP BY term HAVING COUNT(*) > 1")]
+            for term in terms:
+                rows = self._conn.execute(
+                    "SELECT segment, df, last_doc, docs, positions FROM postings WHERE term = ? ORDER BY segment",
+                    (term,)).fetchall()
+                self._conn.execute("DELETE FROM postings WHERE term = ?", (term,))
+                self._conn.execute(
+                    "INSERT INTO postings (term, segment, df, last_doc, docs, positions) VALUES (?, ?, ?, ?, ?, ?)",
+                    (term, rows[0][0], sum(row[1] for row in rows), rows[-1][2],
+                     *merge_segments(row[2:] for row in rows)))
+            self._segments = 0
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('segments', 0)")
+        if vacuum:
+            with self._lock:
+                self._conn.execute("VACUUM")
+
+    # -- reading -------------------------------------------------------
+
+    def _postings(self, term, with_positions=False):
+        """{doc: tf} (or {doc: [positions]}) across all segments of term"""
+        result = {}
+        for docs_blob, positions_blob in self._conn.execute(
+                "SELECT docs, positions FROM postings WHERE term = ? ORDER BY segment", (term,)):
+            docs, freqs = decode_docs(docs_blob)
+            result.update(zip(docs, decode_positions(positions_blob, freqs) if with_positions else freqs))
+        return result
+
+    def expand(self, prefix, limit=MAX_EXPANSIONS):
+        """Most frequent terms starting with prefix"""
+        return [term for (term,) in self._conn.execute(
+            "SELECT term FROM postings WHERE term >= ? AND term < ? GROUP BY term ORDER BY SUM(df) DESC LIMIT ?",
+            (prefix, prefix + "\U0010ffff", limit))]
+
+    def _add_scores(self, scores, postings, only=None):
+        df = len(postings)
+        if not df:
+            return
+        count = len(self._lengths)
+        idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B)
+        per_length = K1 * B / ((self._total_length / count) or 1)
+        lengths = self._lengths
+        for doc, tf in postings.items():
+            if only is not None and doc not in only:
+                continue
+            if not isinstance(tf, int):
+                tf = len(tf)
+            scores[doc] = scores.get(doc, 0.0) + idf * tf * (K1 + 1) / (
+                tf + norm + per_length * lengths[doc - 1])
+
+    def search(self, query, limit=20):
+        """Top posts for query: [{'key', 'score', 'post'}], best first"""
+        terms, prefixes, phrases = parse_query(query)
+        if not len(self._lengths):
+            return []
+        with self._lock:
+            required = None
+            phrase_postings = []
+            for words in phrases:
+                lists = [self._postings(word, with_positions=True) for word in words]
+                docs = set(lists[0]).intersection(*lists[1:])
+                matched = set()
+                for doc in docs:
+                    later = [set(postings[doc]) for postings in lists[1:]]
+                    if any(all(start + i in where for i, where in enumerate(later, 1)) for start in lists[0][doc]):
+                        matched.add(doc)
+                required = matched if required is None else required & matched
+                phrase_postings.extend(lists)
+
+            scores = {}
+            for postings in phrase_postings:
+                self._add_scores(scores, postings, required)
+            for term in terms:
+                self._add_scores(scores, self._postings(term), required)
+            for prefix in prefixes:
+                for term in self.expand(prefix):
+                    self._add_scores(scores, self._postings(term), required)
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            if not top:
+                return []
+            rows = dict((doc, (key, post)) for doc, key, post in self._conn.execute(
+                f"SELECT id, key, post FROM docs WHERE id IN ({','.join('?' * len(top))})", [doc for doc, _ in top]))
+        return [{'key': rows[doc][0], 'score': round(score, 4), 'post': json.loads(rows[doc][1])}
+                for doc, score in top]
+
+    def stats(self):
+        terms, segments, size = self._conn.execute(
+            "SELECT COUNT(DISTINCT term), COUNT(*), SUM(LENGTH(docs) + LENGTH(positions)) FROM postings").fetchone()
+        return {'docs': len(self._lengths), 'terms': terms, 'segments': segments, 'postings_bytes': size or 0,
+                'file_bytes': os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+
+
+def iter_source(path, batch_size=5000):
+    """Batches of posts from a post store directory or a JSON / NDJSON file"""
+    if os.path.isdir(path):
+        batch = []
+        for post in PostStore(path).query():
+            batch.append(post)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+        return
+    posts = load_posts(path)
+    for i in range(0, len(posts), batch_size):
+        yield posts[i:i + batch_size]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 keyword index over collected posts")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="add posts from a post store or JSON / NDJSON file")
+    build.add_argument("posts")
+    build.add_argument("index", nargs="?", default=DEFAULT_INDEX_PATH)
+    search = sub.add_parser("search", help="ranked keyword query")
+    search.add_argument("query")
+    search.add_argument("index", nargs="?", default=DEFAULT_INDEX_PATH)
+    search.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    with SearchIndex(args.index) as index:
+        if args.command == "build":
+            start = time.perf_counter()
+            added = sum(index.add_many(batch) for batch in iter_source(args.posts))
+            index.compact()
+            stats = index.stats()
+            print(f"🔎 {added} posts added in {time.perf_counter() - start:.1f}s ({stats['docs']} indexed, "
+                  f"{stats['terms']} terms, {stats['file_bytes'] / 1e6:.1f}MB)")
+            return
+
+        start = time.perf_counter()
+        hits = index.search(args.query, limit=args.limit)
+        elapsed = time.perf_counter() - start
+        print(f"🔎 {len(hits)} hits for {args.query!r} in {elapsed * 1000:.1f}ms")
+        for hit in hits:
+            print(f"   {hit['score']:>7.2f}  [{hit['key']}] {(hit['post'].get('title') or '')[:70]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Local stand-in HTTP servers for benchmarking without hitting live APIs
+
+serve_hn() mimics the HackerNews Firebase API:
+- /v0/item/{id}.json
+- /v0/askstories.json, /v0/topstories.json, /v0/newstories.json
+- /v0/maxitem.json, /v0/updates.json
+
+serve_messages() mimics the Messages API (POST /v1/messages): it finds the
+"POST {id}:" headers in the prompt and answers with a JSON array of
+extraction results, taking longer for bigger batches like a real model.
+With "stream": true in the request the answer comes back as server-sent
+events (message_start, content_block_delta text pieces, message_stop).
+
+serve_replay() answers every POST with the next recorded SSE stream (raw
+bytes as captured, or built with message_stream()); a recording that does
+not end in message_stop is cut off mid-response, like a dropped connection.
+
+serve_rss() mimics Reddit's /r/{subreddit}/.rss feeds, including
+ETag/Last-Modified validators (304 on a matching conditional GET), slow
+feeds, HTML block pages and an optional rate limit (429, then a ban).
+
+Latency and error injection let benchmarks show how the fetchers behave
+against a slow or flaky upstream.
+"""
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ITEM_PATH = re.compile(r"^/v0/item/(\d+)\.json$")
+LIST_PATH = re.compile(r"^/v0/(\w+)\.json$")
+PROMPT_POST = re.compile(r"^POST (\S+):", re.MULTILINE)
+FEED_PATH = re.compile(r"^/r/(\w+)/\.rss$")
+LAST_MODIFIED = "Mon, 09 Feb 2026 10:30:00 GMT"
+BLOCK_PAGE = "<!doctype html><html><body>whoa there, pardner!</body></html>"
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Base handler: quiet logging plus JSON/bytes helpers"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_json(self, status, payload, headers=None):
+        self.send_body(status, json.dumps(payload), headers=headers)
+
+    def send_stream(self, events, delay=0.0):
+        """Send SSE events as a chunked body, pausing delay seconds between them
+
+        If the last event is not message_stop the body is left unterminated
+        and the connection dropped, so the client sees a truncated stream.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for event in events:
+            if delay:
+                time.sleep(delay)
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(event), event))
+            self.wfile.flush()
+        if events and events[-1].startswith(b"event: message_stop"):
+            self.wfile.write(b"0\r\n\r\n")
+        else:
+            self.close_connection = True
+
+
+class HNHandler(StandinHandler):
+    """Serves items and id lists from self.server.items / self.server.lists"""
+
+    def do_GET(self):
+        server = self.server
+        server.record(self.path)
+
+        if server.latency:
+            time.sleep(server.latency)
+        if server.stall_rate and random.random() < server.stall_rate:
+            time.sleep(server.stall_seconds)
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_json(503, {"error": "injected"})
+            return
+
+        match = ITEM_PATH.match(self.path)
+        if match:
+            item = server.items.get(int(match.group(1)))
+            self.send_json(200, item)
+            return
+
+        match = LIST_PATH.match(self.path)
+        if match and match.group(1) == "maxitem":
+            self.send_json(200, max(server.items) if server.items else 0)
+            return
+        if match and match.group(1) in server.lists:
+            self.send_json(200, server.lists[match.group(1)])
+            return
+
+        self.send_json(404, {"error": "not found"})
+
+
+class RSSHandler(StandinHandler):
+    """Serves self.server.feeds (subreddit -> XML bytes) with conditional GET"""
+
+    def do_GET(self):
+        server = self.server
+        server.record(self.path)
+
+        match = FEED_PATH.match(self.path)
+        subreddit = match.group(1) if match else None
+
+        delay = server.slow.get(subreddit, server.latency)
+        if delay:
+            time.sleep(delay)
+        verdict = server.admit()
+        if verdict == "throttled":
+            self.send_body(429, "Too Many Requests", content_type="text/plain", headers={"Retry-After": "1"})
+            return
+        if subreddit in server.blocked or verdict == "banned":
+            self.send_body(200, BLOCK_PAGE, content_type="text/html; charset=utf-8")
+            return
+        if subreddit not in server.feeds:
+            self.send_body(404, BLOCK_PAGE, content_type="text/html; charset=utf-8")
+            return
+
+        body = server.feeds[subreddit]
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        validators = {"ETag": etag, "Last-Modified": LAST_MODIFIED}
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            for name, value in validators.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_body(200, body, content_type="application/atom+xml; charset=UTF-8", headers=validators)
+
+
+def mock_extraction(post_id):
+    """Deterministic fake extraction result for a post id"""
+    if int(post_id) % 2:
+        return {
+            "post_id": int(post_id),
+            "has_pain_point": True,
+            "pain_point": f"Recurring workflow pain in post {post_id}",
+            "intensity": 70,
+            "specificity": 80,
+            "frequency": 60,
+            "composite_score": 70.0,
+            "supporting_quote": "I keep running into this every week",
+        }
+    return {"post_id": int(post_id), "has_pain_point": False, "reason": "No specific complaint"}
+
+
+class MessagesHandler(StandinHandler):
+    """Answers POST /v1/messages with mock extraction results"""
+
+    def read_request(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = request["messages"][0]["content"]
+        return request, prompt, PROMPT_POST.findall(prompt)
+
+    def inject_failure(self, post_ids):
+        """Send an injected error response if configured; returns True if sent"""
+        server = self.server
+        if server.fail_ids.intersection(post_ids):
+            self.send_json(500, {"type": "error", "error": {"type": "api_error", "message": "injected"}})
+            return True
+        if server.error_rate and random.random() < server.error_rate:
+            self.send_json(429, {"type": "error", "error": {"type": "rate_limit_error", "message": "injected"}},
+                           headers={"retry-after": "0"})
+            return True
+        return False
+
+    def do_POST(self):
+        server = self.server
+        server.record(self.path)
+        request, prompt, post_ids = self.read_request()
+
+        # latency is time to first token; per-post time is generation, which a
+        # streamed answer spreads over its events instead of paying up front
+        generation = server.per_post_latency * len(post_ids)
+        time.sleep(server.latency + (0 if request.get("stream") else generation))
+        if self.inject_failure(post_ids):
+            return
+
+        text = json.dumps([mock_extraction(post_id) for post_id in post_ids], indent=2)
+        if request.get("stream"):
+            events = message_stream(text, request.get("model"), server.delta_size, input_tokens=len(prompt) // 4)
+            self.send_stream(events, server.event_delay or generation / len(events))
+            return
+        self.send_json(200, {
+            "id": "msg_standin",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+        })
+
+
+class ReplayHandler(MessagesHandler):
+    """Answers each POST with the next recorded SSE stream"""
+
+    def do_POST(self):
+        server = self.server
+        server.record(self.path)
+        self.read_request()
+        with server._hits_lock:
+            events = server.recordings[server.replayed % len(server.recordings)]
+            server.replayed += 1
+        self.send_stream(events, server.event_delay)
+
+
+def sse_event(name, payload):
+    return f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode("utf-8")
+
+
+def message_stream(text, model=None, delta_size=16, stop_reason="end_turn", cut_at=None, input_tokens=0):
+    """Messages API SSE events streaming text in delta_size pieces
+
+    With cut_at (a character offset into text) the stream stops there,
+    without message_stop: a recording of a dropped response.
+    """
+    events = [
+        sse_event("message_start", {"type": "message_start", "message": {
+            "id": "msg_standin", "type": "message", "role": "assistant", "model": model, "content": [],
+            "stop_reason": None, "usage": {"input_tokens": input_tokens, "output_tokens": 0}}}),
+        sse_event("content_block_start", {"type": "content_block_start", "index": 0,
+                                          "content_block": {"type": "text", "text": ""}}),
+        sse_event("ping", {"type": "ping"}),
+    ]
+    end = len(text) if cut_at is None else cut_at
+    for start in range(0, end, delta_size):
+        piece = text[start:min(start + delta_size, end)]
+        events.append(sse_event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                        "delta": {"type": "text_delta", "text": piece}}))
+    if cut_at is not None:
+        return events
+    events += [
+        sse_event("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        sse_event("message_delta", {"type": "message_delta", "delta": {"stop_reason": stop_reason},
+                                    "usage": {"output_tokens": len(text) // 4}}),
+        sse_event("message_stop", {"type": "message_stop"}),
+    ]
+    return events
+
+
+def split_recording(raw):
+    """Split a captured SSE body (bytes) into events"""
+    return [event + b"\n\n" for event in raw.replace(b"\r\n", b"\n").split(b"\n\n") if event.strip()]
+
+
+class StandinServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that counts requests per path"""
+
+    daemon_threads = True
+    request_queue_size = 128  # listen backlog: burst connects (hedges, a breaker closing) shouldn't hit SYN retries
+
+    def __init__(self, handler, latency=0.0, error_rate=0.0):
+        super().__init__(("127.0.0.1", 0), handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.hits = {}
+        self._hits_lock = threading.Lock()
+        # Server-side rate limit: (requests per second, burst); ban_after straight 429s -> ban_seconds of block pages
+        self.rate_limit = None
+        self.ban_after = None
+        self.ban_seconds = 0.0
+        self.verdicts = {"ok": 0, "throttled": 0, "banned": 0}
+        self._bucket = None
+
+    def handle_error(self, request, client_address):
+        # clients hanging up mid-response (a hedge's loser, a deadline) are expected, not errors
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_hits(self):
+        return sum(self.hits.values())
+
+    def record(self, path):
+        with self._hits_lock:
+            self.hits[path] = self.hits.get(path, 0) + 1
+
+    def admit(self):
+        """Apply rate_limit to one request: "ok", "throttled" (429) or "banned" (block page)"""
+        if self.rate_limit is None:
+            return "ok"
+        rate, burst = self.rate_limit
+        with self._hits_lock:
+            now = time.monotonic()
+            if self._bucket is None:
+                self._bucket = {"tokens": burst, "updated": now, "strikes": 0, "banned_until": 0.0}
+            bucket = self._bucket
+            bucket["tokens"] = min(burst, bucket["tokens"] + (now - bucket["updated"]) * rate)
+            bucket["updated"] = now
+            if now < bucket["banned_until"]:
+                verdict = "banned"
+            elif bucket["tokens"] >= 1:
+                bucket["tokens"] -= 1
+                bucket["strikes"] = 0
+                verdict = "ok"
+            else:
+                bucket["strikes"] += 1
+                verdict = "throttled"
+                if self.ban_after and bucket["strikes"] >= self.ban_after:
+                    bucket["banned_until"] = now + self.ban_seconds
+                    bucket["strikes"] = 0
+            self.verdicts[verdict] += 1
+            return verdict
+
+
+@contextmanager
+def run_server(server):
+    """Run a StandinServer on a background thread for the duration of a block"""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def synthetic_hn_items(count, start_id=40000000, now=None):
+    """Generate count fake Ask HN stories keyed by id"""
+    now = int(now or time.time())
+    items = {}
+    for offset in range(count):
+        item_id = start_id + offset
+        items[item_id] = {
+            "id": item_id,
+            "type": "story",
+            "by": f"user{offset % 97}",
+            "time": now - offset * 600,
+            "title": f"Ask HN: Synthetic question #{offset}",
+            "text": "I&#x27;ve been struggling with this problem for weeks.<p>Any advice?",
+            "score": offset % 300,
+            "descendants": offset % 50,
+        }
+    return items
+
+
+def synthetic_hn_thread(story_id, comments, fanout=(60, 5, 4, 3, 3, 2), seed=0, now=None):
+    """Generate an Ask HN story with a tree of about comments replies, keyed by id
+
+    fanout[d] bounds the replies per item at depth d; some comments are
+    deleted or dead, as on HN. Returns (items, story_id).
+    """
+    rng = random.Random(seed)
+    now = int(now or time.time())
+    story = {"id": story_id, "type": "story", "by": "asker", "time": now - 86400, "score": 900,
+             "title": "Ask HN: What are you working on?", "text": "Curious what everyone is building.", "kids": []}
+    items = {story_id: story}
+    level, next_id = [story], story_id + 1
+    for depth, width in enumerate(fanout):
+        children = []
+        for parent in level:
+            for _ in range(rng.randint(0 if depth else width, width)):
+                if len(items) > comments:
+                    break
+                comment = {"id": next_id, "type": "comment", "by": f"user{next_id % 311}", "parent": parent["id"],
+                           "time": parent["time"] + rng.randint(60, 7200), "kids": [],
+                           "text": f"Reply {next_id}: exporting invoices by hand takes me hours every month.<p>"
+                                   "Would pay for something that does it for me."}
+                roll = rng.random()
+                if roll < 0.02:
+                    comment.update(deleted=True, text="")
+                elif roll < 0.03:
+                    comment["dead"] = True
+                parent["kids"].append(next_id)
+                items[next_id] = comment
+                children.append(comment)
+                next_id += 1
+        level = children
+    story["descendants"] = len(items) - 1
+    return items, story_id
+
+
+@contextmanager
+def serve_hn(items, lists=None, latency=0.0, error_rate=0.0, stall_rate=0.0, stall_seconds=2.0):
+    """Serve items (id -> dict) on a local HN stand-in; yields the server
+
+    stall_rate of requests (at random) hang for stall_seconds before
+    answering, the tail a hedged request is for. error_rate and the stall
+    settings can be changed on the server while it runs.
+    Use f"{server.base_url}/v0" as the fetchers' base_url.
+    """
+    server = StandinServer(HNHandler, latency=latency, error_rate=error_rate)
+    server.stall_rate = stall_rate
+    server.stall_seconds = stall_seconds
+    server.items = items
+    ids = sorted(items, reverse=True)
+    server.lists = lists if lists is not None else {
+        "askstories": ids,
+        "topstories": ids,
+        "newstories": ids,
+        "updates": {"items": [], "profiles": []},
+    }
+    with run_server(server):
+        yield server
+
+
+def synthetic_atom_feed(subreddit, count, start=0):
+    """Build a Reddit-style Atom feed with count entries (ids start..start+count)"""
+    parts = ['<?xml version="1.0" encoding="UTF-8"?>'
+             f'<feed xmlns="http://www.w3.org/2005/Atom"><title>r/{subreddit}</title>']
+    for i in range(start, start + count):
+        parts.append(
+            f'<entry><author><name>/u/founder{i % 97}</name></author>'
+            f'<content type="html">&lt;p&gt;Post {i} in r/{subreddit}: invoicing is painful.&lt;/p&gt;</content>'
+            f'<id>t3_{i:x}</id><link href="https://www.reddit.com/r/{subreddit}/comments/{i:x}/"/>'
+            f'<published>2026-02-09T10:30:00+00:00</published><title>Post {i}</title></entry>'
+        )
+    parts.append('</feed>')
+    return "".join(parts).encode("utf-8")
+
+
+@contextmanager
+def serve_rss(feeds, slow=None, blocked=(), latency=0.0, rate_limit=None, ban_after=None, ban_seconds=5.0):
+    """Serve feeds (subreddit -> XML bytes) on a local Reddit stand-in; yields the server
+
+    slow maps subreddit -> seconds of delay; blocked subreddits get an HTML
+    block page. rate_limit=(requests per second, burst) answers requests
+    over it with 429 + Retry-After, and after ban_after of those in a row
+    serves every feed as a block page for ban_seconds (server.verdicts
+    counts each outcome). Use server.base_url as the fetchers' base_url.
+    """
+    server = StandinServer(RSSHandler, latency=latency)
+    server.feeds = feeds
+    server.slow = slow or {}
+    server.blocked = set(blocked)
+    server.rate_limit = rate_limit
+    server.ban_after = ban_after
+    server.ban_seconds = ban_seconds
+    with run_server(server):
+        yield server
+
+
+@contextmanager
+def serve_messages(latency=0.0, per_post_latency=0.0, error_rate=0.0, fail_ids=(), delta_size=16, event_delay=0.0):
+    """Serve a mock Messages API; yields the server
+
+    fail_ids are post ids whose chunk always gets a 500 (to exercise
+    checkpoint reruns). Streamed answers come in delta_size-character
+    pieces, event_delay seconds apart. Use f"{server.base_url}/v1/messages"
+    as the URL.
+    """
+    server = StandinServer(MessagesHandler, latency=latency, error_rate=error_rate)
+    server.per_post_latency = per_post_latency
+    server.fail_ids = set(str(post_id) for post_id in fail_ids)
+    server.delta_size = delta_size
+    server.event_delay = event_delay
+    with run_server(server):
+        yield server
+
+
+@contextmanager
+def serve_replay(recordings, event_delay=0.0):
+    """Replay recorded SSE streams (event lists or raw captured bytes), one per POST, in order
+
+    Use f"{server.base_url}/v1/messages" as the URL.
+    """
+    server = StandinServer(ReplayHandler)
+    server.recordings = [split_recording(r) if isinstance(r, bytes) else r for r in recordings]
+    server.replayed = 0
+    server.event_delay = event_delay
+    with run_server(server):
+        yield server
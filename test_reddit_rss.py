@@ -4,9 +4,16 @@ Test script to verify Reddit RSS feeds work and contain usable data
 Tests Risk #2: RSS feed viability (need 15+ posts from last 7 days)
 """
 import requests
-from datetime import datetime, timedelta
+import time
+from itertools import islice
 import xml.etree.ElementTree as ET
-import json
+
+import ratelimit
+
+from feed_parser import iter_response_entries
+from html_text import html_to_text
+from records import Post, dump
+from timestamps import DAY, TimestampParser
 
 def test_reddit_rss(subreddit="Entrepreneur"):
     """Fetch and parse Reddit RSS feed"""
@@ -22,12 +29,16 @@ def test_reddit_rss(subreddit="Entrepreneur"):
     }
 
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        # Shared with every other fetcher on this machine, so repeated runs don't get us blocked
+        ratelimit.throttle(url)
+        response = requests.get(url, headers=headers, timeout=10, stream=True)
+        ratelimit.backoff(url, response.status_code, response.headers.get('Retry-After'))
         response.raise_for_status()
 
         # Check if we got XML (RSS) or HTML
         content_type = response.headers.get('Content-Type', '')
         if 'html' in content_type.lower():
+            ratelimit.backoff(url, delay=ratelimit.BLOCK_COOLDOWN)
             print(f"❌ FAILED: Got HTML instead of RSS")
             print(f"   Content-Type: {content_type}")
             print(f"   This means Reddit blocked the request or RSS endpoint changed")
@@ -37,65 +48,50 @@ def test_reddit_rss(subreddit="Entrepreneur"):
             print(f"   3. Use PRAW library with proper authentication")
             return None
 
-        # Parse RSS XML
-        root = ET.fromstring(response.content)
-
-        # Find all entries (posts)
-        # RSS 2.0 uses <item>, Atom uses <entry>
-        namespace = {'atom': 'http://www.w3.org/2005/Atom'}
-        entries = root.findall('.//atom:entry', namespace) or root.findall('.//item')
+        # Stream-parse the feed: RSS 2.0 <item> and Atom <entry> are both
+        # yielded as soon as they're complete, fields resolved in one pass
+        received = []
+        entries = list(islice(iter_response_entries(response, received=received), 25))  # Limit to 25 posts
+        response.close()
 
         if not entries:
             print(f"⚠️  Warning: RSS parsed but found 0 entries")
-            print(f"   Namespaces in XML: {root.tag}")
+            print(f"   Content-Type: {content_type}")
             return None
 
         print(f"✅ RSS feed fetched successfully")
-        print(f"📊 Found {len(entries)} posts\n")
+        print(f"📊 Parsed {len(entries)} posts\n")
 
         # Extract post data
         posts = []
-        seven_days_ago = datetime.now() - timedelta(days=7)
-
-        for i, entry in enumerate(entries[:25], 1):  # Limit to 25 posts
-            # Handle both RSS and Atom formats
-            title_elem = entry.find('.//atom:title', namespace) or entry.find('title')
-            link_elem = entry.find('.//atom:link', namespace) or entry.find('link')
-            published_elem = entry.find('.//atom:published', namespace) or entry.find('pubDate')
-            content_elem = entry.find('.//atom:content', namespace) or entry.find('description')
-            author_elem = entry.find('.//atom:author', namespace) or entry.find('author')
-
-            # Extract text
-            title = title_elem.text if title_elem is not None else "No title"
-            link = link_elem.get('href') if link_elem is not None and link_elem.get('href') else (link_elem.text if link_elem is not None else "No link")
-            published = published_elem.text if published_elem is not None else "Unknown date"
-            content = content_elem.text if content_elem is not None else ""
-            author = author_elem.text if author_elem is not None else "Unknown"
-
-            # Try to parse date
-            try:
-                # Try ISO format first (Atom)
-                post_date = datetime.fromisoformat(published.replace('Z', '+00:00').replace('+00:00', ''))
-            except:
-                try:
-                    # Try RFC 2822 format (RSS)
-                    from email.utils import parsedate_to_datetime
-                    post_date = parsedate_to_datetime(published)
-                except:
-                    post_date = None
-
-            posts.append({
-                'id': i,
-                'title': title,
-                'url': link,
-                'published': published,
-                'content': content[:200] + '...' if len(content) > 200 else content,
-                'author': author,
-                'is_recent': post_date and post_date >= seven_days_ago if post_date else None
-            })
+        timestamps = TimestampParser()
+        seven_days_ago = time.time() - 7 * DAY
+
+        for i, entry in enumerate(entries, 1):
+            title = entry.get('title') or "No title"
+            link = entry.get('link') or "No link"
+            published = entry.get('published') or "Unknown date"
+            content = html_to_text(entry.get('content', ''))
+            author = entry.get('author') or "Unknown"
+
+            # Atom (ISO 8601) or RSS (RFC 2822), normalized to a UTC epoch;
+            # the format that worked is tried first for the next entry
+            created = timestamps.parse(entry.get('published'), source=url)
+
+            posts.append(Post(
+                id=i,
+                title=title,
+                url=link,
+                published=published,
+                created_utc=created,
+                content=content[:200] + '...' if len(content) > 200 else content,
+                author=author,
+                source='reddit',
+                extra={'is_recent': created >= seven_days_ago if created is not None else None},
+            ))
 
         # Analyze results
-        recent_posts = [p for p in posts if p['is_recent'] is True]
+        recent_posts = [p for p in posts if p.get('is_recent') is True]
 
         print("=" * 70)
         print("📊 RISK #2 VALIDATION: RSS Feed Viability")
@@ -112,14 +108,13 @@ def test_reddit_rss(subreddit="Entrepreneur"):
         for p in posts[:5]:
             print(f"\n{p['id']}. {p['title']}")
             print(f"   Published: {p['published']}")
-            print(f"   Recent: {p['is_recent']}")
+            print(f"   Recent: {p.get('is_recent')}")
             print(f"   Content: {p['content'][:100]}...")
             print(f"   URL: {p['url'][:80]}...")
 
         # Save to JSON
         output_file = f"reddit_rss_{subreddit}_test.json"
-        with open(output_file, 'w') as f:
-            json.dump(posts, f, indent=2)
+        dump(posts, output_file, indent=2)
 
         print(f"\n💾 Saved {len(posts)} posts to {output_file}")
         print("\n" + "=" * 70)
@@ -144,12 +139,13 @@ def test_reddit_rss(subreddit="Entrepreneur"):
         print(f"   The response is not valid RSS/XML")
         # Save response for debugging
         with open('reddit_response_debug.txt', 'wb') as f:
-            f.write(response.content)
+            f.write(b''.join(received))
         print(f"   Saved response to reddit_response_debug.txt for inspection")
         return None
 
 if __name__ == "__main__":
     print("🧪 Reddit RSS Feed Test\n")
+    ratelimit.shared()
 
     # Test with r/Entrepreneur
     posts = test_reddit_rss("Entrepreneur")
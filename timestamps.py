@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Timestamp normalization: every post time becomes a UTC epoch int
+
+HN gives epoch seconds, Atom feeds ISO 8601 (with Z, an offset, or none),
+RSS 2.0 RFC 2822 dates. Stored and compared as UTC epoch ints, so nothing
+mixes naive and aware datetimes and nothing goes stale the way a saved
+"age in hours" does; ages are computed at query time (age_hours()).
+
+A TimestampParser remembers, per source (a feed URL, "hn", ...), which
+format last worked and tries it first, so a feed's entries cost one parse
+attempt each instead of walking the fallback chain. Values with no offset
+are taken as UTC. Unparseable values give None.
+
+    parser = TimestampParser()
+    created = parser.parse(entry.get('published'), source=feed_url)
+"""
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+def parse_epoch(value):
+    if isinstance(value, bool):
+        raise ValueError("not a timestamp")
+    if isinstance(value, (int, float)):
+        return int(value)
+    text = value.strip()
+    if not text.lstrip("-").replace(".", "", 1).isdigit():
+        raise ValueError(f"not epoch seconds: {value!r}")
+    return int(float(text))
+
+
+def _utc_epoch(parsed):
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def parse_iso8601(value):
+    return _utc_epoch(datetime.fromisoformat(value.strip()))
+
+
+def parse_rfc2822(value):
+    try:
+        return _utc_epoch(parsedate_to_datetime(value.strip()))
+    except (TypeError, IndexError) as e:  # parsedate_to_datetime's ways of saying no
+        raise ValueError(f"not an RFC 2822 date: {value!r}") from e
+
+
+PARSERS = {
+    "epoch": parse_epoch,
+    "iso8601": parse_iso8601,
+    "rfc2822": parse_rfc2822,
+}
+
+
+class TimestampParser:
+    """Parses timestamps to UTC epoch ints, caching the working format per source"""
+
+    def __init__(self):
+        self.formats = {}
+
+    def parse(self, value, source=None):
+        if value is None or value == "":
+            return None
+        if isinstance(value, datetime):
+            return _utc_epoch(value)
+        cached = self.formats.get(source)
+        order = [cached] + [name for name in PARSERS if name != cached] if cached else list(PARSERS)
+        for name in order:
+            try:
+                epoch = PARSERS[name](value)
+            except (ValueError, AttributeError, OverflowError):
+                continue
+            if name != cached:
+                self.formats[source] = name
+            return epoch
+        return None
+
+
+_default = TimestampParser()
+
+
+def to_epoch(value, source=None):
+    """UTC epoch seconds for any supported timestamp (None if unparseable)"""
+    return _default.parse(value, source)
+
+
+def iso_utc(epoch):
+    """ISO 8601 string in UTC for an epoch int (None passes through)"""
+    if epoch is None:
+        return None
+    return datetime.fromtimestamp(epoch, timezone.utc).isoformat()
+
+
+def day_of(epoch):
+    """UTC calendar day (YYYY-MM-DD) of an epoch int"""
+    return time.strftime("%Y-%m-%d", time.gmtime(epoch))
+
+
+def age_hours(epoch, now=None):
+    """Hours since epoch, measured now (None if epoch is None)"""
+    if epoch is None:
+        return None
+    return ((now or time.time()) - epoch) / HOUR
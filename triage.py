@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Cheap pre-filter deciding which posts are worth sending to LLM extraction
+
+A post is lowercased and split into words once (punctuation and non-ASCII
+characters separate words) and that list is intersected with the set of
+lexicon words, so the cost per post is one hash lookup per word no matter
+how many terms there are. Phrases are only searched for when all of their
+words turned up. Each distinct term that matches adds its weight to the
+post's score; negative weights mark clear non-pain formats (survey
+threads, launches, hiring).
+
+Terms ending in * stand for the word plus a common ending (ENDINGS:
+"frustrat*" -> frustrate, frustrated, frustrating, frustration, ...).
+Extend LEXICON, or pass your own to Triage().
+"""
+
+# term -> (category, weight)
+LEXICON = {
+    # Pain: explicit complaints
+    'problem*': ('pain', 2.0),
+    'issue*': ('pain', 1.5),
+    'struggl*': ('pain', 2.5),
+    'frustrat*': ('pain', 3.0),
+    'difficult*': ('pain', 1.5),
+    'hard': ('pain', 1.0),
+    'challeng*': ('pain', 1.0),
+    'pain*': ('pain', 2.0),
+    'annoy*': ('pain', 2.5),
+    'hate': ('pain', 2.0),
+    'broken': ('pain', 2.0),
+    'breaks': ('pain', 2.0),
+    'bug*': ('pain', 1.5),
+    'lag': ('pain', 1.5),
+    'slow': ('pain', 1.0),
+    'waste*': ('pain', 2.0),
+    'wasting': ('pain', 2.0),
+    'expensive': ('pain', 1.5),
+    'tedious': ('pain', 2.5),
+    'nightmare': ('pain', 3.0),
+    'worse': ('pain', 1.5),
+    'getting worse': ('pain', 1.0),
+    'stuck': ('pain', 2.0),
+    'disappoint*': ('pain', 2.0),
+    "can't": ('pain', 1.0),
+    'cannot': ('pain', 1.0),
+    'still': ('pain', 0.5),
+    'keeps': ('pain', 1.0),
+    'every time': ('pain', 1.5),
+    'manually': ('pain', 1.5),
+    # Questions: seeking solutions
+    'how do': ('question', 1.5),
+    'how can': ('question', 1.5),
+    'how to': ('question', 1.5),
+    'what do you use': ('question', 2.0),
+    'anyone know': ('question', 1.5),
+    'am i': ('question', 1.0),
+    'advice': ('question', 1.0),
+    'help': ('question', 1.0),
+    'alternative*': ('question', 1.5),
+    'recommend*': ('question', 1.0),
+    # Negative: formats that almost never carry an actionable pain point
+    'what are you working on': ('negative', -4.0),
+    'what are you building': ('negative', -3.0),
+    'who is hiring': ('negative', -4.0),
+    'show hn': ('negative', -2.0),
+    'i built': ('negative', -1.5),
+    'i wrote': ('negative', -1.0),
+    'launch*': ('negative', -1.0),
+}
+
+# Low on purpose: only skip posts with no pain/question signal at all
+DEFAULT_THRESHOLD = 1.0
+
+# Word endings a "prefix*" term is expanded with, so every lexicon entry
+# becomes a plain word (or phrase) to look up
+ENDINGS = ("", "s", "e", "es", "ed", "d", "ing", "ingly", "er", "ers", "y", "ies", "ly",
+           "ful", "fully", "ion", "ions", "ation", "ations", "ment", "ments", "ance", "atic")
+
+# Text -> bytes table: ASCII letters lowercased, digits and _ kept, other
+# ASCII (punctuation, apostrophes, whitespace) and each non-ASCII character
+# become one space. The lexicon is ASCII, so the result splits into the
+# words \\b would delimit.
+_WORD_BYTES = bytes(
+    (byte | 0x20 if chr(byte).isalpha() else byte) if byte < 128 and (chr(byte).isalnum() or byte == 0x5f) else 0x20
+    for byte in range(256)
+)
+_CONTINUATION_BYTES = bytes(range(0x80, 0xc0))  # dropped, so a UTF-8 character is one space
+
+
+def normalize(text):
+    """text as lowercase ASCII words separated by spaces"""
+    return text.encode().translate(_WORD_BYTES, _CONTINUATION_BYTES).decode('ascii')
+
+
+def expand(prefix):
+    """Words a "prefix*" term stands for: prefix plus each of ENDINGS,
+    also with a doubled last letter ("bug" -> "buggy") or a dropped
+    final e ("waste" -> "wasting")"""
+    stems = {prefix, prefix + prefix[-1]}
+    if prefix.endswith('e'):
+        stems.add(prefix[:-1])
+    return {stem + ending for stem in stems for ending in ENDINGS}
+
+
+class Triage:
+    """Weighted lexicon looked up against the set of words in a post
+
+    Single words and expanded prefix terms live in one dict, so a post
+    costs one split and one set intersection; a phrase is only searched
+    for once all of its words turned up in that intersection.
+    """
+
+    def __init__(self, lexicon=None, threshold=DEFAULT_THRESHOLD):
+        self.lexicon = {term.lower(): value for term, value in (LEXICON if lexicon is None else lexicon).items()}
+        self.threshold = threshold
+        self.words = {}    # word -> term
+        self.phrases = []  # (set of words, " joined words ", term)
+        for term in self.lexicon:
+            words = normalize(term.rstrip('*')).split()
+            if len(words) > 1:
+                self.phrases.append((frozenset(words), ' ' + ' '.join(words) + ' ', term))
+            elif term.endswith('*'):
+                for word in expand(words[0]):
+                    self.words.setdefault(word, term)
+            else:
+                self.words[words[0]] = term
+        self.vocabulary = frozenset(self.words).union(*(words for words, _, _ in self.phrases))
+        self.order = {term: i for i, term in enumerate(self.lexicon)}
+
+    def matches(self, text):
+        """Lexicon terms found in text, each once, in lexicon order"""
+        padded = ' ' + normalize(text) + ' '
+        present = self.vocabulary.intersection(padded.split())
+        found = {self.words[word] for word in present if word in self.words}
+        for words, phrase, term in self.phrases:
+            if words <= present and phrase in padded:
+                found.add(term)
+        return sorted(found, key=self.order.get)
+
+    def score(self, text):
+        """Score text; returns (score, {category: [matched terms]})"""
+        score = 0.0
+        hits = {}
+        for term in self.matches(text):
+            category, weight = self.lexicon[term]
+            score += weight
+            hits.setdefault(category, []).append(term)
+        return score, hits
+
+    def score_post(self, post):
+        return self.score(post.get('title', '') + '\n' + post.get('content', ''))
+
+    def worth_extracting(self, post):
+        """True unless the post is a clear negative"""
+        return self.score_post(post)[0] >= self.threshold
+
+    def split(self, posts):
+        """Partition posts into (send to extraction, skip)"""
+        keep, skip = [], []
+        for post in posts:
+            (keep if self.worth_extracting(post) else skip).append(post)
+        return keep, skip
+
+
+def precision_recall(triage, posts, results):
+    """Compare triage decisions with extraction labels (has_pain_point)
+
+    Returns a dict with precision, recall, kept and the confusion counts.
+    """
+    labels = {r['post_id']: bool(r.get('has_pain_point')) for r in results}
+    tp = fp = fn = tn = 0
+    for post in posts:
+        if post['id'] not in labels:
+            continue
+        predicted = triage.worth_extracting(post)
+        actual = labels[post['id']]
+        if predicted and actual:
+            tp += 1
+        elif predicted:
+            fp += 1
+        elif actual:
+            fn += 1
+        else:
+            tn += 1
+    return {
+        'tp': tp, 'fp': fp, 'fn': fn, 'tn': tn,
+        'kept': tp + fp,
+        'precision': tp / (tp + fp) if tp + fp else 0.0,
+        'recall': tp / (tp + fn) if tp + fn else 0.0,
+    }
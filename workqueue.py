@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Durable work queue for fetch and extraction jobs, shared by many workers
+
+Ingest and extraction used to run start to finish in one process, so the
+only way to go faster was to run the scripts more often. Work is now a
+queue of small jobs that any number of worker processes (on any number
+of machines, given a backend they can all reach) take from:
+- "fetch_item" ({"id": n}), "fetch_feed" ({"url": ...}) and
+  "extract_chunk" ({"posts": [...]}) jobs, each with a key that is
+  unique per kind, so enqueueing the same item twice is a no-op and a
+  job that already finished isn't run again
+- lease(): a worker takes jobs for visibility seconds. It extends the
+  lease (heartbeat) while it works; if it crashes the lease runs out
+  and another worker picks the job up
+- complete() stores the job's result; fail() retries it later with
+  backoff, and after max_attempts moves it to the dead letters (state
+  "dead") with its last error, where retry_dead() can re-arm it
+- completing or failing checks the lease is still the caller's, so a
+  worker that stalled past its lease can't overwrite the new owner
+
+WorkQueue is the interface; SQLiteQueue (one file, WAL, every state
+change a BEGIN IMMEDIATE transaction, path=None for in-memory) is the
+backend here. open_queue() picks a backend from a location such as
+"workqueue.sqlite3", "sqlite:///var/lib/ingest/q.sqlite3" or "memory:";
+another backend registers a scheme in BACKENDS.
+
+Worker runs handlers: handler(payloads) -> one result per payload, or a
+JobError (errors.py) in its place for a job that failed. The consumers are
+hn_fetch.item_handler, rss_fetch.feed_handler and
+ExtractionEngine.handle_chunks. Job outcomes are counted in
+workqueue_jobs_total, handler time per batch in workqueue_batch_seconds.
+
+    queue = open_queue()
+    queue.enqueue("fetch_item", [{"id": i} for i in ids], keys=ids)
+    Worker(queue, {"fetch_item": item_handler()}).run()
+    items = dict(queue.results("fetch_item"))
+
+Usage: python workqueue.py status | work [kind ...] | enqueue-hn [list] [limit] |
+       enqueue-feeds subreddit ... | retry-dead [kind]
+"""
+import os
+import random
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from itertools import count
+
+import metrics
+from errors import JobError
+from records import dumps, loads
+
+DEFAULT_PATH = "workqueue.sqlite3"
+KINDS = ("fetch_item", "fetch_feed", "extract_chunk")
+
+VISIBILITY = 60.0  # seconds a lease lasts without a heartbeat
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 2.0  # seconds before the first retry, doubling after
+
+JOBS = metrics.counter("workqueue_jobs_total", "Work queue jobs by kind and outcome (done, retried, dead, lost)")
+BATCH_SECONDS = metrics.histogram("workqueue_batch_seconds", "Handler time per leased batch, by kind")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at REAL NOT NULL,
+    lease_until REAL,
+    worker TEXT,
+    result TEXT,
+    error TEXT,
+    updated_at REAL NOT NULL,
+    UNIQUE (kind, key)
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (state, kind, available_at);
+"""
+
+
+class Job:
+    """One leased job; attempts identifies the lease (it goes up on every lease)"""
+
+    __slots__ = ('id', 'kind', 'key', 'payload', 'attempts', 'worker')
+
+    def __init__(self, id, kind, key, payload, attempts, worker):
+        self.id = id
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.attempts = attempts
+        self.worker = worker
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind!r}, {self.key!r}, attempt {self.attempts})"
+
+
+def retry_delay(attempts, backoff=RETRY_BACKOFF):
+    """Seconds before a job that has failed attempts times runs again (jittered exponential)"""
+    return backoff * (2 ** (attempts - 1)) * (0.5 + random.random())
+
+
+class WorkQueue:
+    """Backend interface; see module docstring (SQLiteQueue implements it)"""
+
+    def enqueue(self, kind, payloads, keys=None, requeue=False):
+        """Add jobs (key defaults to the payload's JSON); returns how many were new or re-armed
+
+        With requeue, jobs whose key is already done or dead are run again
+        (periodic work such as polling a feed); pending and leased ones
+        are left alone either way.
+        """
+        raise NotImplementedError
+
+    def lease(self, worker, kinds=None, limit=1, visibility=VISIBILITY):
+        """Take up to limit ready jobs (pending, or leased with the lease run out) for visibility seconds"""
+        raise NotImplementedError
+
+    def heartbeat(self, jobs, visibility=VISIBILITY):
+        """Extend the leases still held on jobs; returns how many were"""
+        raise NotImplementedError
+
+    def complete(self, job, result=None):
+        """Store job's result; False if the lease was lost (the job went to another worker)"""
+        raise NotImplementedError
+
+    def fail(self, job, error):
+        """Retry job later, or dead-letter it after max_attempts; returns the new state (None: lease lost)"""
+        raise NotImplementedError
+
+    def results(self, kind, keys=None):
+        """(key, result) for done jobs of kind"""
+        raise NotImplementedError
+
+    def dead_letters(self, kind=None):
+        """(kind, key, attempts, error) for every dead job"""
+        raise NotImplementedError
+
+    def retry_dead(self, kind=None):
+        """Re-arm dead jobs with a fresh set of attempts; returns how many"""
+        raise NotImplementedError
+
+    def purge(self, kind=None, states=("done",)):
+        """Delete finished jobs; returns how many"""
+        raise NotImplementedError
+
+    def counts(self, kinds=None):
+        """{kind: {state: n}}"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SQLiteQueue(WorkQueue):
+    """Jobs in one SQLite file, safe across threads and processes"""
+
+    def __init__(self, path=DEFAULT_PATH, max_attempts=MAX_ATTEMPTS, retry_backoff=RETRY_BACKOFF):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self._conn = sqlite3.connect(path or ":memory:", timeout=30, isolation_level=None,
+                                     check_same_thread=False)
+        if path:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        self._conn.close()
+
+    def _transaction(self, fn, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                value = fn(*args)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            return value
+
+    def enqueue(self, kind, payloads, keys=None, requeue=False):
+        payloads = list(payloads)
+        if keys is None:
+            keys = [dumps(payload) for payload in payloads]
+        rows = [(kind, str(key), dumps(payload)) for key, payload in zip(keys, payloads)]
+        now = time.time()
+        if requeue:
+            sql = ("INSERT INTO jobs (kind, key, payload, state, available_at, updated_at) "
+                   "VALUES (?, ?, ?, 'pending', ?, ?) "
+                   "ON CONFLICT (kind, key) DO UPDATE SET state = 'pending', attempts = 0, payload = excluded.payload, "
+                   "available_at = excluded.available_at, error = NULL, updated_at = excluded.updated_at "
+                   "WHERE state IN ('done', 'dead')")
+        else:
+            sql = ("INSERT OR IGNORE INTO jobs (kind, key, payload, state, available_at, updated_at) "
+                   "VALUES (?, ?, ?, 'pending', ?, ?)")
+
+        def insert():
+            before = self._conn.total_changes
+            self._conn.executemany(sql, [row + (now, now) for row in rows])
+            return self._conn.total_changes - before
+
+        return self._transaction(insert)
+
+    def lease(self, worker, kinds=None, limit=1, visibility=VISIBILITY):
+        kinds = list(kinds or KINDS)
+        marks = ",".join("?" * len(kinds))
+
+        def take():
+            now = time.time()
+            rows = self._conn.execute(
+                f"SELECT id, kind, key, payload, attempts FROM jobs WHERE kind IN ({marks}) AND "
+                "((state = 'pending' AND available_at <= ?) OR (state = 'leased' AND lease_until <= ?)) "
+                "ORDER BY available_at, id LIMIT ?", (*kinds, now, now, limit)).fetchall()
+            jobs = []
+            for job_id, kind, key, payload, attempts in rows:
+                if attempts >= self.max_attempts:
+                    # its last lease ran out too: the job keeps taking workers down with it
+                    self._conn.execute("UPDATE jobs SET state = 'dead', worker = NULL, updated_at = ?, "
+                                       "error = COALESCE(error || '; ', '') || 'lease expired' WHERE id = ?",
+                                       (now, job_id))
+                    JOBS.inc(kind=kind, outcome="dead")
+                    continue
+                self._conn.execute("UPDATE jobs SET state = 'leased', attempts = ?, worker = ?, lease_until = ?, "
+                                   "updated_at = ? WHERE id = ?",
+                                   (attempts + 1, worker, now + visibility, now, job_id))
+                jobs.append(Job(job_id, kind, key, loads(payload), attempts + 1, worker))
+            return jobs
+
+        return self._transaction(take)
+
+    def heartbeat(self, jobs, visibility=VISIBILITY):
+        if not jobs:
+            return 0
+
+        def extend():
+            now = time.time()
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "UPDATE jobs SET lease_until = ?, updated_at = ? "
+                "WHERE id = ? AND state = 'leased' AND worker = ? AND attempts = ?",
+                [(now + visibility, now, job.id, job.worker, job.attempts) for job in jobs])
+            return self._conn.total_changes - before
+
+        return self._transaction(extend)
+
+    def _finish(self, job, assignments, values):
+        cursor = self._conn.execute(
+            f"UPDATE jobs SET {assignments}, worker = NULL, lease_until = NULL, updated_at = ? "
+            "WHERE id = ? AND state = 'leased' AND worker = ? AND attempts = ?",
+            (*values, time.time(), job.id, job.worker, job.attempts))
+        return cursor.rowcount == 1
+
+    def complete(self, job, result=None):
+        text = dumps(result)
+        done = self._transaction(self._finish, job, "state = 'done', result = ?, error = NULL", (text,))
+        JOBS.inc(kind=job.kind, outcome="done" if done else "lost")
+        return done
+
+    def fail(self, job, error):
+        error = str(error)[:1000]
+        if job.attempts >= self.max_attempts:
+            state = "dead"
+            ok = self._transaction(self._finish, job, "state = 'dead', error = ?", (error,))
+        else:
+            state = "pending"
+            available_at = time.time() + retry_delay(job.attempts, self.retry_backoff)
+            ok = self._transaction(self._finish, job, "state = 'pending', error = ?, available_at = ?",
+                                   (error, available_at))
+        JOBS.inc(kind=job.kind, outcome=("dead" if state == "dead" else "retried") if ok else "lost")
+        return state if ok else None
+
+    def results(self, kind, keys=None):
+        with self._lock:
+            if keys is None:
+                rows = self._conn.execute("SELECT key, result FROM jobs WHERE kind = ? AND state = 'done' ORDER BY id",
+                                          (kind,)).fetchall()
+            else:
+                keys = [str(key) for key in keys]
+                rows = []
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    rows.extend(self._conn.execute(
+                        f"SELECT key, result FROM jobs WHERE kind = ? AND state = 'done' "
+                        f"AND key IN ({','.join('?' * len(batch))})", (kind, *batch)))
+        return [(key, loads(result)) for key, result in rows]
+
+    def dead_letters(self, kind=None):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT kind, key, attempts, error FROM jobs WHERE state = 'dead' AND (? IS NULL OR kind = ?) "
+                "ORDER BY kind, id", (kind, kind)).fetchall()
+
+    def retry_dead(self, kind=None):
+        def rearm():
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = 'pending', attempts = 0, available_at = ?, updated_at = ? "
+                "WHERE state = 'dead' AND (? IS NULL OR kind = ?)", (time.time(), time.time(), kind, kind))
+            return cursor.rowcount
+
+        return self._transaction(rearm)
+
+    def purge(self, kind=None, states=("done",)):
+        marks = ",".join("?" * len(states))
+
+        def delete():
+            cursor = self._conn.execute(f"DELETE FROM jobs WHERE state IN ({marks}) AND (? IS NULL OR kind = ?)",
+                                        (*states, kind, kind))
+            return cursor.rowcount
+
+        return self._transaction(delete)
+
+    def counts(self, kinds=None):
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, state, COUNT(*) FROM jobs GROUP BY kind, state").fetchall()
+        counts = {}
+        for kind, state, n in rows:
+            if kinds is None or kind in kinds:
+                counts.setdefault(kind, {})[state] = n
+        return counts
+
+
+BACKENDS = {
+    "sqlite": SQLiteQueue,
+    "memory": lambda location, **kwargs: SQLiteQueue(None, **kwargs),
+}
+
+
+def open_queue(location=DEFAULT_PATH, **kwargs):
+    """WorkQueue for a location: a path, "sqlite:///path", "memory:" or "<scheme>://..." in BACKENDS"""
+    scheme, sep, rest = location.partition(":")
+    if not sep or len(scheme) < 2:  # a plain path (or a Windows drive letter)
+        return SQLiteQueue(location, **kwargs)
+    backend = BACKENDS.get(scheme)
+    if backend is None:
+        raise ValueError(f"no work queue backend for {scheme!r} (have: {', '.join(sorted(BACKENDS))})")
+    return backend(rest[2:] if rest.startswith("//") else rest, **kwargs)
+
+
+_worker_ids = count(1)
+
+
+class Worker:
+    """Leases jobs for its handlers' kinds and runs them, heartbeating while it does
+
+    handlers maps kind -> handler(payloads) returning one result per
+    payload (a JobError instance for a payload that failed). A handler
+    that raises fails its whole batch.
+    """
+
+    def __init__(self, queue, handlers, worker_id=None, batch_size=32, visibility=VISIBILITY, idle_sleep=0.5):
+        self.queue = queue
+        self.handlers = dict(handlers)
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{next(_worker_ids)}"
+        self.batch_size = batch_size
+        self.visibility = visibility
+        self.idle_sleep = idle_sleep
+        self.counts = {"leased": 0, "done": 0, "retried": 0, "dead": 0, "lost": 0}
+        self._held = []
+        self._held_lock = threading.Lock()
+
+    def _heartbeat(self, stop):
+        while not stop.wait(self.visibility / 3):
+            with self._held_lock:
+                held = list(self._held)
+            self.queue.heartbeat(held, self.visibility)
+
+    def run_once(self):
+        """Lease one batch and run it; returns how many jobs were leased"""
+        jobs = self.queue.lease(self.worker_id, list(self.handlers), self.batch_size, self.visibility)
+        self.counts["leased"] += len(jobs)
+        with self._held_lock:
+            self._held = list(jobs)
+        by_kind = {}
+        for job in jobs:
+            by_kind.setdefault(job.kind, []).append(job)
+        for kind, batch in by_kind.items():
+            start = time.perf_counter()
+            try:
+                outcomes = list(self.handlers[kind]([job.payload for job in batch]))
+                if len(outcomes) != len(batch):
+                    raise JobError(f"handler returned {len(outcomes)} results for {len(batch)} jobs")
+            except Exception as e:
+                outcomes = [e] * len(batch)
+            BATCH_SECONDS.observe(time.perf_counter() - start, kind=kind)
+            for job, outcome in zip(batch, outcomes):
+                if isinstance(outcome, Exception):
+                    state = self.queue.fail(job, outcome)
+                    self.counts["lost" if state is None else "dead" if state == "dead" else "retried"] += 1
+                elif self.queue.complete(job, outcome):
+                    self.counts["done"] += 1
+                else:
+                    self.counts["lost"] += 1
+            with self._held_lock:
+                self._held = [job for job in self._held if job.kind != kind]
+        return len(jobs)
+
+    def run(self, stop=None, until_empty=True, max_jobs=None):
+        """Work until stop is set, or (until_empty) no job of these kinds is pending or leased"""
+        stop = stop or threading.Event()
+        beating = threading.Event()
+        heart = threading.Thread(target=self._heartbeat, args=(beating,), daemon=True)
+        heart.start()
+        try:
+            while not stop.is_set():
+                if max_jobs is not None and self.counts["leased"] >= max_jobs:
+                    break
+                if self.run_once():
+                    continue
+                if until_empty:
+                    open_jobs = sum(states.get("pending", 0) + states.get("leased", 0)
+                                    for states in self.queue.counts(self.handlers).values())
+                    if not open_jobs:
+                        break
+                stop.wait(self.idle_sleep)
+        finally:
+            beating.set()
+            heart.join()
+        return self.stats()
+
+    def stats(self):
+        return dict(self.counts, worker=self.worker_id)
+
+
+def default_handlers(kinds):
+    """Handlers for the CLI worker: HN items, feeds and (with ANTHROPIC_API_KEY) extraction"""
+    handlers = {}
+    if "fetch_item" in kinds:
+        from hn_fetch import item_handler
+        handlers["fetch_item"] = item_handler()
+    if "fetch_feed" in kinds:
+        from rss_fetch import FeedStateStore, feed_handler
+        handlers["fetch_feed"] = feed_handler(store=FeedStateStore())
+    if "extract_chunk" in kinds and os.environ.get("ANTHROPIC_API_KEY"):
+        from extract_cache import ExtractionCache
+        from extract_engine import ExtractionEngine
+        handlers["extract_chunk"] = ExtractionEngine(cache=ExtractionCache()).handle_chunks
+    return handlers
+
+
+def main():
+    import ratelimit
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "status"
+    args = sys.argv[2:]
+    with open_queue(os.environ.get("WORKQUEUE", DEFAULT_PATH)) as queue:
+        if command == "enqueue-hn":
+            from hn_fetch import fetch_story_ids
+            ratelimit.shared()
+            ids = fetch_story_ids(args[0] if args else "askstories")
+            ids = ids[:int(args[1])] if len(args) > 1 else ids
+            added = queue.enqueue("fetch_item", [{"id": item_id} for item_id in ids], keys=ids)
+            print(f"📥 {added} new fetch_item jobs ({len(ids) - added} already queued or done)")
+        elif command == "enqueue-feeds":
+            from rss_fetch import feed_url
+            urls = [feed_url(name) for name in args]
+            added = queue.enqueue("fetch_feed", [{"url": url} for url in urls], keys=urls, requeue=True)
+            print(f"📥 {added} fetch_feed jobs queued")
+        elif command == "work":
+            ratelimit.shared()
+            handlers = default_handlers(args or KINDS)
+            worker = Worker(queue, handlers)
+            print(f"👷 {worker.worker_id} working on {', '.join(handlers)}")
+            stats = worker.run()
+            print(f"✅ {stats['done']} done, {stats['retried']} to retry, {stats['dead']} dead-lettered, "
+                  f"{stats['lost']} lost leases")
+        elif command == "retry-dead":
+            print(f"🔁 {queue.retry_dead(args[0] if args else None)} dead jobs re-armed")
+        elif command == "status":
+            for kind, states in sorted(queue.counts().items()):
+                print(f"   {kind:<14} " + "  ".join(f"{state} {n}" for state, n in sorted(states.items())))
+            for kind, key, attempts, error in queue.dead_letters()[:20]:
+                print(f"   💀 {kind} {key} after {attempts} attempts: {error}")
+        else:
+            print(__doc__)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()